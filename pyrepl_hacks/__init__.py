@@ -9,13 +9,79 @@ This package provides utilities to enhance the Python REPL experience by adding:
 Main functions:
     bind: Bind keys to commands or create command decorators
     bind_to_insert: Bind keys to insert specific text
+    bind_snippet: Bind keys to insert text with tab stops
+    load_bindings: Bind keys from a TOML file (reloading it when it changes)
+    add_abbreviation: Expand an abbreviation whenever it's typed
+    load_snippets: Load named snippets for the expand-snippet command
     register_command: Register new commands for the REPL
     update_theme: Customize REPL syntax highlighting colors
+    register_theme: Register a named syntax highlighting theme
+    use_theme: Switch to a registered theme
+    enable_highlight_cache: Cache REPL syntax highlighting per line
+    configure_profiler: Configure the profile-last command
+    enable_timings: Record the time and memory used by each REPL input
+    timings: Show the recorded timings
+    enable_checker: Check the input for mistakes whenever typing pauses
+    enable_signature_hints: Show call signatures whenever "(" is typed
+    enable_completion_cache: Cache attribute names for faster Tab completion
+    enable_kill_ring: Bound the memory used by killed text
+    enable_undo: Record changes to the input for the undo and redo commands
+    enable_shadow_text: Keep a line-indexed copy of big inputs for faster commands
+    name_last_macro: Turn the last keyboard macro into a command you can bind
+    save_macros: Save named keyboard macros to a JSON file
+    load_macros: Load keyboard macros saved with save_macros
 """
 
 from . import commands
-from .bind_utils import bind, bind_to_insert
+from .abbrev_utils import add_abbreviation, remove_abbreviation
+from .bind_utils import bind, bind_snippet, bind_to_insert
+from .check_utils import disable_checker, enable_checker
 from .command_utils import register_command
-from .theme_utils import update_theme
+from .completion_utils import disable_completion_cache, enable_completion_cache
+from .help_utils import disable_signature_hints, enable_signature_hints
+from .highlight_utils import disable_highlight_cache, enable_highlight_cache
+from .keymap_utils import load_bindings
+from .kill_utils import disable_kill_ring, enable_kill_ring
+from .macro_utils import load_macros, name_last_macro, save_macros
+from .perf_utils import configure_profiler, disable_timings, enable_timings, timings
+from .shadow_utils import disable_shadow_text, enable_shadow_text
+from .snippet_utils import load_snippets
+from .theme_utils import load_themes, register_theme, update_theme, use_theme
+from .undo_utils import disable_undo, enable_undo
 
-__all__ = ["commands", "bind", "bind_to_insert", "register_command", "update_theme"]
+__all__ = [
+    "commands",
+    "bind",
+    "bind_to_insert",
+    "bind_snippet",
+    "load_bindings",
+    "add_abbreviation",
+    "remove_abbreviation",
+    "load_snippets",
+    "register_command",
+    "update_theme",
+    "register_theme",
+    "load_themes",
+    "use_theme",
+    "enable_highlight_cache",
+    "disable_highlight_cache",
+    "configure_profiler",
+    "enable_timings",
+    "disable_timings",
+    "timings",
+    "enable_checker",
+    "disable_checker",
+    "enable_signature_hints",
+    "disable_signature_hints",
+    "enable_completion_cache",
+    "disable_completion_cache",
+    "enable_kill_ring",
+    "disable_kill_ring",
+    "enable_undo",
+    "disable_undo",
+    "enable_shadow_text",
+    "disable_shadow_text",
+    "name_last_macro",
+    "save_macros",
+    "load_macros",
+]
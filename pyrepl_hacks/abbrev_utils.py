@@ -0,0 +1,148 @@
+"""Utilities for expanding abbreviations as you type.
+
+An abbreviation (like ``imnp``) is replaced by its expansion (like
+``import numpy as np``) when a character that can't be part of a word is
+typed right after it.
+
+Abbreviations are stored in a trie of their reversed characters, so
+checking for one means walking back from the cursor one character at a time
+and stopping as soon as no abbreviation ends with the characters seen.  The
+check never looks further back than the longest abbreviation and doesn't
+copy the buffer, so it costs next to nothing when nothing matches.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import Any
+
+from ._types import Command, HistoricalReader
+from .hook_utils import add_command_hook, remove_command_hook
+
+__all__ = ["AbbreviationTrie", "add_abbreviation", "remove_abbreviation"]
+
+_EXPANSION = ""  # Trie key holding the expansion (no character is empty)
+
+
+def _is_word_character(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class AbbreviationTrie:
+    """Abbreviations stored by their characters in reverse order."""
+
+    def __init__(self) -> None:
+        self._root: dict[str, Any] = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, abbreviation: str, expansion: str) -> None:
+        """Add (or replace) an abbreviation.
+
+        Raises:
+            ValueError: If the abbreviation isn't a single word
+        """
+        if not abbreviation or not all(map(_is_word_character, abbreviation)):
+            raise ValueError(f"Abbreviation must be a word: {abbreviation!r}")
+        node = self._root
+        for char in reversed(abbreviation):
+            node = node.setdefault(char, {})
+        self._count += _EXPANSION not in node
+        node[_EXPANSION] = expansion
+
+    def remove(self, abbreviation: str) -> None:
+        """Remove an abbreviation (if it exists)."""
+        if self._remove(self._root, abbreviation[::-1]) is not None:
+            self._count -= 1
+
+    def _remove(self, node: dict[str, Any], chars: str) -> str | None:
+        """Remove the expansion at the end of a path, pruning empty nodes."""
+        if not chars:
+            expansion: str | None = node.pop(_EXPANSION, None)
+            return expansion
+        child = node.get(chars[0])
+        if child is None:
+            return None
+        expansion = self._remove(child, chars[1:])
+        if not child:
+            del node[chars[0]]
+        return expansion
+
+    def match(self, characters: Sequence[str], end: int) -> tuple[int, str] | None:
+        """Find the abbreviation that ends at an index in a sequence.
+
+        Only whole words match: the abbreviation must be at the start of
+        the sequence or follow a non-word character.
+
+        Args:
+            characters: The characters to check (like a reader's buffer)
+            end: Index just past the last character of the abbreviation
+
+        Returns:
+            The abbreviation's start index and its expansion, or None
+
+        Examples:
+            >>> trie = AbbreviationTrie()
+            >>> trie.add("imnp", "import numpy as np")
+            >>> trie.match("x; imnp ", 7)
+            (3, 'import numpy as np')
+            >>> trie.match("ximnp ", 5) is None
+            True
+        """
+        node = self._root
+        index = end
+        while index > 0 and (child := node.get(characters[index - 1])) is not None:
+            node = child
+            index -= 1
+        if _EXPANSION not in node:
+            return None
+        if index > 0 and _is_word_character(characters[index - 1]):
+            return None
+        expansion: str = node[_EXPANSION]
+        return index, expansion
+
+
+_abbreviations = AbbreviationTrie()
+
+
+def _expand_abbreviation(reader: HistoricalReader, command: Command) -> None:
+    """Expand the abbreviation before a just-typed non-word character."""
+    if command.event_name != "self-insert" or reader.paste_mode:
+        return
+    boundary = reader.pos - 1
+    if boundary < 1 or _is_word_character(reader.buffer[boundary]):
+        return
+    match = _abbreviations.match(reader.buffer, boundary)
+    if match is None:
+        return
+    start, expansion = match
+    reader.buffer[start:boundary] = list(expansion)
+    reader.pos += len(expansion) - (boundary - start)
+    reader.last_refresh_cache.invalidated = True
+    reader.dirty = True
+
+
+def add_abbreviation(abbreviation: str, expansion: str) -> None:
+    """Expand an abbreviation whenever it's typed as a whole word.
+
+    The abbreviation is replaced when the next character typed can't be
+    part of a word (like a space, a dot, or a parenthesis).
+
+    Args:
+        abbreviation: Word to expand (letters, digits, and underscores)
+        expansion: Text to replace it with
+
+    Raises:
+        ValueError: If the abbreviation isn't a single word
+    """
+    _abbreviations.add(abbreviation, expansion)
+    add_command_hook(_expand_abbreviation)
+
+
+def remove_abbreviation(abbreviation: str) -> None:
+    """Stop expanding an abbreviation added with add_abbreviation."""
+    _abbreviations.remove(abbreviation)
+    if not len(_abbreviations):
+        remove_command_hook(_expand_abbreviation)
@@ -0,0 +1,94 @@
+"""Utilities for running REPL input in background threads."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from .exec_utils import compile_source
+
+__all__ = ["BackgroundJob", "run_in_background"]
+
+
+@dataclass(eq=False)
+class BackgroundJob:
+    """A block of code running (or finished running) in a background thread.
+
+    Attributes:
+        number: Job number (starting from 1)
+        source: The code being run
+        status: "running", "done", or "failed"
+        result: Value of the code's final expression (if it ends in one)
+        exception: The exception raised by the code (if it failed)
+    """
+
+    number: int
+    source: str
+    status: str = "running"
+    result: Any = None
+    exception: BaseException | None = None
+    started: float = field(default_factory=time.perf_counter)
+    finished: float | None = None
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds the job has been running (or took to run)."""
+        end = time.perf_counter() if self.finished is None else self.finished
+        return end - self.started
+
+    def __repr__(self) -> str:
+        first_line, *rest = self.source.strip().splitlines() or [""]
+        source = first_line + (" ..." if rest else "")
+        if self.status == "running":
+            state = f"running for {self.elapsed:.1f}s"
+        elif self.exception is not None:
+            state = f"failed after {self.elapsed:.1f}s ({self.exception!r})"
+        else:
+            state = f"done in {self.elapsed:.1f}s"
+        return f"<job {self.number} {state}: {source}>"
+
+
+def run_in_background(
+    source: str,
+    namespace: dict[str, Any],
+    on_finish: Callable[[BackgroundJob], None] | None = None,
+) -> BackgroundJob:
+    """Run source code in a daemon thread, recording it in namespace["_bg"].
+
+    Args:
+        source: Python code to run
+        namespace: Globals to run the code in
+        on_finish: Called (from the background thread) when the job finishes
+
+    Returns:
+        The started job
+
+    Raises:
+        SyntaxError: If the source code is invalid (nothing is started)
+    """
+    statements, expression = compile_source(source, "<background>")
+    jobs = namespace.setdefault("_bg", [])
+    job = BackgroundJob(number=len(jobs) + 1, source=source)
+    jobs.append(job)
+
+    def run() -> None:
+        try:
+            exec(statements, namespace)  # noqa: S102 - running the user's input
+            if expression is not None:
+                job.result = eval(expression, namespace)
+        except BaseException as error:  # noqa: BLE001 - stored on the job to show
+            job.exception = error
+            job.status = "failed"
+        else:
+            job.status = "done"
+        finally:
+            job.finished = time.perf_counter()
+            if on_finish is not None:
+                on_finish(job)
+
+    name = f"background job {job.number}"
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return job
@@ -20,8 +20,9 @@ from ._types import (
 )
 from .command_utils import register_command
 from .key_utils import slugify, to_keyspec
+from .snippet_utils import insert_snippet
 
-__all__ = ["bind", "bind_to_insert"]
+__all__ = ["bind", "bind_snippet", "bind_to_insert"]
 
 
 logger = logging.getLogger(__name__)
@@ -151,3 +152,26 @@ def bind_to_insert(keybinding: KeyBinding, text: str) -> None:
         reader.insert(text)
 
     bind(keybinding, slugify(keybinding), command_function)
+
+
+def bind_snippet(keybinding: KeyBinding, template: str) -> None:
+    """Bind a key combination to insert a snippet at the cursor.
+
+    Like bind_to_insert, but the text can contain tab stops: ``$1``, ``$2``,
+    and so on (or ``${1:default}`` with default text), visited in order
+    with the next-snippet-field command, and ``$0`` for the final cursor position.
+    The cursor starts at the first tab stop.
+
+    Args:
+        keybinding: Human-readable key combination (e.g., "Ctrl+X Ctrl+R")
+        template: Snippet text with tab stops, like 'print($1)$0'
+    """
+
+    def command_function(
+        reader: HistoricalReader,
+        event_name: str = "",
+        event: str = "",
+    ) -> None:
+        insert_snippet(reader, template)
+
+    bind(keybinding, slugify(keybinding), command_function)
@@ -0,0 +1,153 @@
+"""Utilities for editing the reader's buffer.
+
+The reader's buffer is a list of characters.  The helpers here find line
+boundaries by scanning the list from a position (so they cost the length of
+the line, not the buffer) and replace a range of the buffer in one splice.
+
+Commands that compute a new text for the whole input (like dedent) replace
+only the part that differs, so the buffer (and its shadow text, if that's
+enabled with shadow_utils) is edited with the smallest slice assignment.
+Splicing also keeps the mark (see region_utils) on its character.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+from ._types import HistoricalReader
+from .shadow_utils import get_shadow
+
+__all__ = ["diff_texts", "get_text", "line_end", "line_start", "replace_text", "splice"]
+
+
+def get_text(reader: HistoricalReader) -> str:
+    """Return the reader's input.
+
+    With the shadow text enabled, this is the shadow's cached text (the same
+    string until the buffer changes) rather than a new join of the buffer.
+    """
+    shadow = get_shadow(reader)
+    return reader.get_unicode() if shadow is None else shadow.text()
+
+
+def _common_length(old: str, new: str, limit: int, *, suffix: bool = False) -> int:
+    """Return the length of the common prefix (or suffix) of two strings.
+
+    Slices are compared with a binary search, so long common parts are
+    compared a block at a time rather than a character at a time.
+    """
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if suffix:
+            same = old[len(old) - middle :] == new[len(new) - middle :]
+        else:
+            same = old[:middle] == new[:middle]
+        if same:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def diff_texts(old: str, new: str) -> tuple[int, str, str] | None:
+    """Return the smallest single change that turns old into new.
+
+    Returns:
+        The offset of the change, the text removed, and the text inserted
+        (None if the texts are the same)
+
+    Examples:
+        >>> diff_texts("if x:\\n    y\\n", "if x:\\n    z = y\\n")
+        (10, '', 'z = ')
+        >>> diff_texts("abcd", "axd")
+        (1, 'bc', 'x')
+    """
+    if old == new:
+        return None
+    limit = min(len(old), len(new))
+    prefix = _common_length(old, new, limit)
+    suffix = _common_length(old, new, limit - prefix, suffix=True)
+    return prefix, old[prefix : len(old) - suffix], new[prefix : len(new) - suffix]
+
+
+def line_start(buffer: Sequence[str], pos: int) -> int:
+    """Return the index of the first character of the line containing pos.
+
+    Examples:
+        >>> line_start("ab\\ncd", 4)
+        3
+        >>> line_start("ab\\ncd", 2)
+        0
+    """
+    while pos > 0 and buffer[pos - 1] != "\n":
+        pos -= 1
+    return pos
+
+
+def line_end(buffer: Sequence[str], pos: int) -> int:
+    """Return the index of the newline ending the line containing pos.
+
+    Returns the length of the buffer for the last line.
+
+    Examples:
+        >>> line_end("ab\\ncd", 0)
+        2
+        >>> line_end("ab\\ncd", 3)
+        5
+    """
+    end = len(buffer)
+    while pos < end and buffer[pos] != "\n":
+        pos += 1
+    return pos
+
+
+def splice(
+    reader: HistoricalReader,
+    start: int,
+    end: int,
+    text: str,
+    pos: int | None = None,
+) -> None:
+    """Replace buffer[start:end] with text and redraw.
+
+    Args:
+        reader: The reader to edit
+        start: Start of the range to replace
+        end: End of the range to replace
+        text: Replacement text
+        pos: New cursor position (by default the cursor keeps its place
+             relative to the text after the range)
+    """
+    from .region_utils import shift_mark  # region_utils imports this module
+
+    old_length = len(reader.buffer)
+    reader.buffer[start:end] = list(text)
+    shift_mark(reader, start, end, len(text))
+    if pos is None:
+        pos = reader.pos
+        if pos >= end:
+            pos += len(reader.buffer) - old_length
+        elif pos > start:
+            pos = min(pos, start + len(text))
+    reader.pos = pos
+    reader.last_refresh_cache.invalidated = True
+    reader.dirty = True
+
+
+def replace_text(reader: HistoricalReader, text: str, pos: int | None = None) -> None:
+    """Replace the reader's input with text, splicing only the part that differs.
+
+    Args:
+        reader: The reader to edit
+        text: The new input
+        pos: New cursor position (by default as with splice)
+    """
+    difference = diff_texts(get_text(reader), text)
+    if difference is None:
+        if pos is not None:
+            reader.pos = pos
+        reader.dirty = True
+        return
+    offset, removed, inserted = difference
+    splice(reader, offset, offset + len(removed), inserted, pos=pos)
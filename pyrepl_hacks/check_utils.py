@@ -0,0 +1,188 @@
+"""Utilities for checking REPL input for mistakes while it's being typed.
+
+Checking happens in a background thread once typing pauses, so it never
+slows down key presses.  The result is shown under the prompt.
+"""
+
+from __future__ import annotations
+
+import ast
+import codeop
+import hashlib
+import queue
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Collection
+
+from ._types import HistoricalReader
+from .exec_utils import get_namespace
+from .hook_utils import add_idle_hook, remove_idle_hook
+
+__all__ = ["BufferChecker", "check_source", "disable_checker", "enable_checker"]
+
+# pyflakes warnings that are just noise for code typed at the REPL
+IGNORED_PYFLAKES_MESSAGES = {"UnusedImport", "UnusedVariable"}
+
+CheckKey = tuple[bytes, int]
+
+
+def check_source(
+    source: str,
+    names: Collection[str] = (),
+    *,
+    pyflakes: bool = True,
+) -> str | None:
+    """Return a description of the first problem in source code (if any).
+
+    Incomplete code (like a block that has no body yet) isn't a problem.
+    If pyflakes is installed, valid code is also checked with it.
+
+    Args:
+        source: Python code to check
+        names: Names already defined (not reported as undefined by pyflakes)
+        pyflakes: Whether to check valid code with pyflakes
+
+    Examples:
+        >>> check_source("x = (1,")
+        >>> check_source("x = 1 +* 2")
+        'SyntaxError: invalid syntax (line 1)'
+    """
+    try:
+        code = codeop.compile_command(source, "<input>", "exec")
+    except SyntaxError as error:
+        return f"SyntaxError: {error.msg} (line {error.lineno})"
+    except (ValueError, OverflowError) as error:
+        return f"{type(error).__name__}: {error}"
+    if code is None or not pyflakes:
+        return None
+    try:
+        from pyflakes.checker import Checker
+    except ImportError:
+        return None
+    checker = Checker(ast.parse(source), "<input>", builtins=set(names))
+    messages = [
+        message
+        for message in checker.messages
+        if type(message).__name__ not in IGNORED_PYFLAKES_MESSAGES
+    ]
+    if not messages:
+        return None
+    first = min(messages, key=lambda message: (message.lineno, message.col))
+    return f"{first.message % first.message_args} (line {first.lineno})"
+
+
+class BufferChecker:
+    """Check the input buffer in a background thread after a typing pause.
+
+    Instances are idle hooks (see add_idle_hook).  Results are cached by a
+    hash of the input, and results for inputs that have since changed are
+    never shown.
+    """
+
+    def __init__(
+        self,
+        delay: float = 0.5,
+        *,
+        pyflakes: bool = True,
+        cache_size: int = 256,
+    ) -> None:
+        self.delay = delay
+        self.pyflakes = pyflakes
+        self.cache_size = cache_size
+        self._text: str | None = None
+        self._changed = 0.0
+        self._key: CheckKey | None = None
+        self._names: frozenset[str] = frozenset()
+        self._requested = False
+        self._results: OrderedDict[CheckKey, str | None] = OrderedDict()
+        self._lock = threading.Lock()
+        self._requests: queue.SimpleQueue[
+            tuple[CheckKey, str, frozenset[str]] | None
+        ] = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+
+    def __call__(self, reader: HistoricalReader) -> None:
+        """Request a check or show the result for the current input."""
+        text = reader.get_unicode()
+        now = time.monotonic()
+        if text != self._text:
+            self._text, self._changed = text, now
+            self._key, self._requested = None, False
+            return
+        if not text.strip() or now - self._changed < self.delay:
+            return
+        if self._key is None:
+            self._names = frozenset(get_namespace())
+            digest = hashlib.sha256(text.encode()).digest()
+            self._key = (digest, hash(self._names))
+        with self._lock:
+            if self._key not in self._results:
+                if not self._requested:
+                    self._request(self._key, text, self._names)
+                    self._requested = True
+                return
+            self._results.move_to_end(self._key)
+            problem = self._results[self._key]
+        if problem and not reader.msg:
+            reader.msg = problem
+            reader.dirty = True
+
+    def _request(self, key: CheckKey, text: str, names: frozenset[str]) -> None:
+        """Queue a check, starting the checking thread if needed."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._work,
+                name="input checker",
+                daemon=True,
+            )
+            self._thread.start()
+        self._requests.put((key, text, names))
+
+    def _work(self) -> None:
+        """Check queued inputs (skipping to the newest one) until stopped."""
+        while (request := self._requests.get()) is not None:
+            while not self._requests.empty():
+                request = self._requests.get()
+                if request is None:
+                    return
+            key, text, names = request
+            problem = check_source(text, names, pyflakes=self.pyflakes)
+            with self._lock:
+                self._results[key] = problem
+                while len(self._results) > self.cache_size:
+                    self._results.popitem(last=False)
+
+    def stop(self) -> None:
+        """Stop the checking thread."""
+        if self._thread is not None:
+            self._requests.put(None)
+            self._thread = None
+
+
+_checker: BufferChecker | None = None
+
+
+def enable_checker(delay: float = 0.5, *, pyflakes: bool = True) -> None:
+    """Check the input for mistakes whenever typing pauses.
+
+    The first syntax error (or pyflakes warning, if pyflakes is installed)
+    is shown under the prompt before the input is run.
+
+    Args:
+        delay: Seconds to wait after the last change before checking
+        pyflakes: Whether to also check valid code with pyflakes
+    """
+    global _checker
+    disable_checker()
+    _checker = BufferChecker(delay, pyflakes=pyflakes)
+    add_idle_hook(_checker)
+
+
+def disable_checker() -> None:
+    """Stop checking the input."""
+    global _checker
+    if _checker is not None:
+        remove_idle_hook(_checker)
+        _checker.stop()
+        _checker = None
@@ -16,9 +16,14 @@ from ._types import (
     CommandHandler,
     CommandName,
     CommandRegistrar,
+    HistoricalReader,
 )
+from .fuzzy_utils import FuzzyIndex
 
-__all__ = ["register_command"]
+__all__ = ["get_command_index", "register_command"]
+
+# Fuzzy index of command names and docstrings (built on first use)
+_command_index: FuzzyIndex | None = None
 
 
 def under_to_kebab(name: str) -> CommandName:
@@ -102,10 +107,12 @@ def register_command(
         command_class = type(
             name,
             (Command,),
-            {"do": do},
+            {"do": do, "__doc__": function.__doc__},
         )
         reader = _get_reader()
         reader.commands[name] = command_class
+        if _command_index is not None:
+            _command_index.add(name, function.__doc__ or "")
 
         command_function = cast(CommandFunction, function)
         command_function.command_class = command_class
@@ -118,3 +125,17 @@ def register_command(
     else:
         # Parameterized decoration: @register_command("name")
         return decorator
+
+
+def get_command_index(reader: HistoricalReader) -> FuzzyIndex:
+    """Return a fuzzy index of the reader's command names and docstrings.
+
+    The index is built once and updated as commands are registered.
+    """
+    global _command_index
+    if _command_index is None:
+        _command_index = FuzzyIndex()
+    for name, command_class in reader.commands.items():
+        if name not in _command_index:
+            _command_index.add(name, command_class.__doc__ or "")
+    return _command_index
@@ -1,9 +1,61 @@
 import re
 import textwrap
+import threading
+import traceback
+from _pyrepl.simple_interact import _get_reader
 from typing import cast
 
 from ._types import Command, CommandFunction, HistoricalReader
-from .command_utils import register_command
+from .background_utils import BackgroundJob, run_in_background
+from .buffer_utils import get_text, replace_text
+from .command_utils import get_command_index, register_command
+from .exec_utils import (
+    fingerprint_statements,
+    get_namespace,
+    page,
+    run_source,
+    show_in_pager,
+    split_statements,
+    suspend_console,
+)
+from .help_utils import (
+    cached_help,
+    name_at,
+    render_help_in_background,
+    resolve_name,
+    signature_at,
+)
+from .hook_utils import call_soon
+from .import_utils import get_import_index, import_line
+from .macro_utils import LAST_MACRO, MacroCommand, start_recording, stop_recording
+from .minibuffer_utils import Picker, open_picker
+from .perf_utils import (
+    TimingCancelled,
+    TimingResult,
+    profile_source,
+    profiler_options,
+    time_in_background,
+    time_source,
+)
+from .region_utils import (
+    comment_lines,
+    dedent_lines,
+    get_mark,
+    indent_lines,
+    move_region,
+    region_lines,
+    transform_region,
+)
+from .region_utils import duplicate_region as _duplicate_region
+from .region_utils import exchange_point_and_mark as _exchange_point_and_mark
+from .region_utils import set_mark as _set_mark
+from .replace_utils import find_matches, query_replace, replace_matches
+from .snippet_utils import expand_snippet as _expand_snippet
+from .snippet_utils import get_snippet_library, next_field
+from .structure_utils import parse_structure
+from .theme_utils import next_theme
+from .token_utils import BRACKET_PAIRS, CLOSE_TO_OPEN, BracketIndex
+from .undo_utils import get_undo_history
 
 # _pyrepl.commands are also included later (see _add_pyrepl_commands)
 __all__ = [
@@ -13,14 +65,59 @@ __all__ = [
     "move_line_up",
     "previous_paragraph",
     "next_paragraph",
+    "cycle_theme",
+    "profile_last",
+    "timeit_buffer",
+    "timeit_paragraph",
+    "timeit_background",
+    "cancel_timeit",
+    "run_background",
+    "accept_paragraph",
+    "rerun_changed",
+    "show_help",
+    "show_signature",
+    "auto_import",
+    "command_palette",
+    "expand_snippet",
+    "next_snippet_field",
+    "kill_ring_browse",
+    "set_mark",
+    "exchange_point_and_mark",
+    "indent_region",
+    "dedent_region",
+    "toggle_comment",
+    "move_region_up",
+    "move_region_down",
+    "sort_lines",
+    "duplicate_region",
+    "jump_to_matching_bracket",
+    "select_inside_brackets",
+    "previous_statement",
+    "next_statement",
+    "jump_to_enclosing_block",
+    "select_block",
+    "start_macro",
+    "end_macro",
+    "query_replace_regexp",
+    "undo",
+    "redo",
 ]
 
+# Cancels the running background timeit-background run (if any)
+_timeit_cancelled: threading.Event | None = None
+
+# Fingerprints of the statements that rerun-changed has successfully run
+_rerun_fingerprints: list[str] = []
+
+# Bracket pairs in each reader's buffer (keyed by id, since readers use slots)
+_bracket_indexes: dict[int, BracketIndex] = {}
+
 
 @register_command  # type: ignore[call-overload]
 def move_to_indentation(reader: HistoricalReader) -> None:
     """Move to the start of indentation for the current line."""
     x, y = reader.pos2xy()
-    lines = reader.get_unicode().splitlines(keepends=True)
+    lines = get_text(reader).splitlines(keepends=True)
     line = lines[y]
     index = match.end() if (match := re.search(r"^[ \t]+", line)) else 0
     reader.pos = reader.bol() + index
@@ -30,14 +127,9 @@ def move_to_indentation(reader: HistoricalReader) -> None:
 def dedent(reader: HistoricalReader) -> None:
     """Dedent the current code block."""
     x, y = reader.pos2xy()
-    original_text = reader.get_unicode()
+    original_text = get_text(reader)
     dedented_text = textwrap.dedent(original_text)
 
-    # Dedent buffer and invalidate cache
-    reader.buffer[:] = list(dedented_text)
-    reader.last_refresh_cache.invalidated = True
-    reader.dirty = True
-
     # Reposition cursor correctly
     original_lines = original_text.splitlines()
     dedented_lines = dedented_text.splitlines()
@@ -45,14 +137,16 @@ def dedent(reader: HistoricalReader) -> None:
         len(old) - len(new)
         for old, new in zip(original_lines[: y + 1], dedented_lines, strict=False)
     )
-    reader.pos -= removed_characters
+
+    # Dedent buffer (splicing only the lines that changed)
+    replace_text(reader, dedented_text, pos=reader.pos - removed_characters)
 
 
 @register_command  # type: ignore[call-overload]
 def move_line_down(reader: HistoricalReader) -> None:
     """Move the current line down."""
     x, y = reader.pos2xy()
-    lines = reader.get_unicode().splitlines(keepends=True)
+    lines = get_text(reader).splitlines(keepends=True)
 
     # Can't move down if we're on the last line
     if y >= len(lines) - 1:
@@ -64,20 +158,16 @@ def move_line_down(reader: HistoricalReader) -> None:
     if not lines[y].endswith("\n"):
         lines[y] += "\n"
 
-    # Update buffer with swapped lines
-    reader.buffer[:] = list("".join(lines))
-    reader.last_refresh_cache.invalidated = True
-    reader.dirty = True
-
-    # Move cursor to same column in the moved line (one line up)
-    reader.pos += len(lines[y])
+    # Update buffer with swapped lines (and move cursor to same column in the
+    # moved line, one line down)
+    replace_text(reader, "".join(lines), pos=reader.pos + len(lines[y]))
 
 
 @register_command  # type: ignore[call-overload]
 def move_line_up(reader: HistoricalReader) -> None:
     """Move the current line up."""
     x, y = reader.pos2xy()
-    lines = reader.get_unicode().splitlines(keepends=True)
+    lines = get_text(reader).splitlines(keepends=True)
 
     # Can't move up if we're on the first line
     if y <= 0:
@@ -86,20 +176,16 @@ def move_line_up(reader: HistoricalReader) -> None:
     # Swap current line with previous line
     lines[y - 1], lines[y] = lines[y], lines[y - 1]
 
-    # Update buffer with swapped lines
-    reader.buffer[:] = list("".join(lines))
-    reader.last_refresh_cache.invalidated = True
-    reader.dirty = True
-
-    # Move cursor to same column in the moved line (one line up)
-    reader.pos -= len(lines[y])
+    # Update buffer with swapped lines (and move cursor to same column in the
+    # moved line, one line up)
+    replace_text(reader, "".join(lines), pos=reader.pos - len(lines[y]))
 
 
 @register_command  # type: ignore[call-overload]
 def previous_paragraph(reader: HistoricalReader) -> None:
     """Move cursor to the blank line before the current paragraph (like Vim { or Emacs M-{)."""
     x, y = reader.pos2xy()
-    lines = reader.get_unicode().splitlines(keepends=True)
+    lines = get_text(reader).splitlines(keepends=True)
 
     # If we're already on the first line, can't go further
     if y == 0:
@@ -134,7 +220,7 @@ def previous_paragraph(reader: HistoricalReader) -> None:
 def next_paragraph(reader: HistoricalReader) -> None:
     """Move cursor to the blank line after the current paragraph (like Vim } or Emacs M-})."""
     x, y = reader.pos2xy()
-    lines = reader.get_unicode().splitlines(keepends=True)
+    lines = get_text(reader).splitlines(keepends=True)
 
     # If we're already on the last line, can't go further
     if y >= len(lines) - 1:
@@ -161,6 +247,661 @@ def next_paragraph(reader: HistoricalReader) -> None:
         reader.pos = sum(len(line) for line in lines[:search_y])
 
 
+@register_command  # type: ignore[call-overload]
+def cycle_theme(reader: HistoricalReader) -> None:
+    """Switch to the next theme registered with register_theme."""
+    try:
+        name = next_theme()
+    except ValueError:
+        reader.error("no themes registered")
+        return
+    reader.msg = f"theme: {name}"
+    reader.last_refresh_cache.invalidated = True
+    reader.dirty = True
+
+
+@register_command  # type: ignore[call-overload]
+def profile_last(reader: HistoricalReader) -> None:
+    """Run the previous input under cProfile and show the report in a pager."""
+    if not reader.history:
+        reader.error("no previous input")
+        return
+    source = reader.history[-1]
+    with suspend_console(reader):
+        try:
+            report = profile_source(source, get_namespace(), **profiler_options)
+        except Exception:  # noqa: BLE001 - shown like the REPL shows errors
+            traceback.print_exc()
+        else:
+            page(report, "profile of previous input")
+
+
+def _paragraph_bounds(reader: HistoricalReader) -> tuple[int, int]:
+    """Return the start and end offsets of the paragraph under the cursor.
+
+    Paragraphs are separated by blank lines, just as with previous-paragraph
+    and next-paragraph.  If the cursor is on a blank line, the paragraph is
+    empty.
+    """
+    text = get_text(reader)
+    lines = text.splitlines(keepends=True)
+    y = text.count("\n", 0, reader.pos)
+    if y >= len(lines) or lines[y].strip() == "":
+        return reader.pos, reader.pos
+    first = last = y
+    while first > 0 and lines[first - 1].strip() != "":
+        first -= 1
+    while last < len(lines) - 1 and lines[last + 1].strip() != "":
+        last += 1
+    start = sum(len(line) for line in lines[:first])
+    end = start + sum(len(line) for line in lines[first : last + 1])
+    return start, end
+
+
+def _show_timing(reader: HistoricalReader, outcome: TimingResult | Exception) -> None:
+    """Show a timing result (or the error that stopped it) under the prompt."""
+    if isinstance(outcome, TimingCancelled):
+        reader.msg = "timing cancelled"
+    elif isinstance(outcome, Exception):
+        reader.error(f"{type(outcome).__name__}: {outcome}")
+        return
+    else:
+        reader.msg = str(outcome)
+    reader.dirty = True
+
+
+def _timeit(reader: HistoricalReader, source: str) -> None:
+    """Time source code and show the statistics under the prompt."""
+    if not source.strip():
+        reader.error("nothing to time")
+        return
+    with suspend_console(reader):
+        try:
+            result = time_source(source, get_namespace())
+        except Exception:  # noqa: BLE001 - shown like the REPL shows errors
+            traceback.print_exc()
+            return
+    _show_timing(reader, result)
+
+
+@register_command  # type: ignore[call-overload]
+def timeit_buffer(reader: HistoricalReader) -> None:
+    """Time the current input with timeit (the input is kept for re-timing)."""
+    _timeit(reader, get_text(reader))
+
+
+@register_command  # type: ignore[call-overload]
+def timeit_paragraph(reader: HistoricalReader) -> None:
+    """Time the paragraph under the cursor with timeit."""
+    start, end = _paragraph_bounds(reader)
+    _timeit(reader, "".join(reader.buffer[start:end]))
+
+
+@register_command  # type: ignore[call-overload]
+def timeit_background(reader: HistoricalReader) -> None:
+    """Time the current input with timeit in a background thread."""
+    global _timeit_cancelled
+    source = get_text(reader)
+    if not source.strip():
+        reader.error("nothing to time")
+        return
+    if _timeit_cancelled is not None:
+        reader.error("already timing (use cancel-timeit to stop)")
+        return
+
+    def finished(outcome: TimingResult | Exception) -> None:
+        global _timeit_cancelled
+        _timeit_cancelled = None
+        call_soon(lambda reader: _show_timing(reader, outcome))
+
+    _timeit_cancelled = time_in_background(source, get_namespace(), finished)
+    reader.msg = "timing in background..."
+    reader.dirty = True
+
+
+@register_command  # type: ignore[call-overload]
+def cancel_timeit(reader: HistoricalReader) -> None:
+    """Cancel the timing started by timeit-background."""
+    # Read the event once, since the timing thread resets it when it finishes
+    cancelled = _timeit_cancelled
+    if cancelled is None:
+        reader.error("not timing")
+        return
+    cancelled.set()
+    reader.msg = "cancelling timing..."
+    reader.dirty = True
+
+
+def _show_finished_job(reader: HistoricalReader, job: BackgroundJob) -> None:
+    """Show that a background job finished under the prompt."""
+    if job.exception is not None:
+        error = f"{type(job.exception).__name__}: {job.exception}"
+        reader.msg = f"[bg] job {job.number} failed: {error}"
+    else:
+        reader.msg = f"[bg] job {job.number} done in {job.elapsed:.1f}s"
+    reader.dirty = True
+
+
+def _add_to_history(reader: HistoricalReader, source: str) -> None:
+    """Add source to the history (before the input being edited).
+
+    The history index moves past the new entry, so up and down move between
+    it and the input.  Unsaved edits to history entries are dropped, since
+    the reader writes them back by index when the input is accepted.
+    """
+    reader.history.append(source)
+    reader.historyi = len(reader.history)
+    reader.transient_history.clear()
+
+
+@register_command  # type: ignore[call-overload]
+def run_background(reader: HistoricalReader) -> None:
+    """Run the current input in a background thread (results go in _bg)."""
+    source = get_text(reader)
+    if not source.strip():
+        reader.error("nothing to run")
+        return
+    try:
+        job = run_in_background(
+            source,
+            get_namespace(),
+            on_finish=lambda job: call_soon(lambda r: _show_finished_job(r, job)),
+        )
+    except SyntaxError as error:
+        reader.error(f"SyntaxError: {error.msg} (line {error.lineno})")
+        return
+
+    _add_to_history(reader, source)
+    reader.buffer[:] = []
+    reader.pos = 0
+    reader.last_refresh_cache.invalidated = True
+    reader.msg = f"[bg] job {job.number} started (see _bg[{job.number - 1}])"
+    reader.dirty = True
+
+
+@register_command  # type: ignore[call-overload]
+def accept_paragraph(reader: HistoricalReader) -> None:
+    """Run just the paragraph under the cursor (the input is kept for editing)."""
+    start, end = _paragraph_bounds(reader)
+    source = "".join(reader.buffer[start:end])
+    if not source.strip():
+        reader.error("nothing to run")
+        return
+    _add_to_history(reader, source)
+    reader.console.finish()  # Output goes below the input
+    with suspend_console(reader):
+        run_source(source, get_namespace(), "<paragraph>")
+
+
+@register_command  # type: ignore[call-overload]
+def rerun_changed(reader: HistoricalReader) -> None:
+    """Run the input, skipping statements that are unchanged since the last run.
+
+    Statements are run from the first one that changed (or that follows a
+    changed statement) onward, and the input is kept for further editing.
+    """
+    source = get_text(reader)
+    try:
+        statements = split_statements(source)
+    except SyntaxError as error:
+        reader.error(f"SyntaxError: {error.msg} (line {error.lineno})")
+        return
+    if not statements:
+        reader.error("nothing to run")
+        return
+    fingerprints = fingerprint_statements([code for _, code in statements])
+    skipped = 0
+    for old, new in zip(_rerun_fingerprints, fingerprints, strict=False):
+        if old != new:
+            break
+        skipped += 1
+    if skipped == len(statements):
+        reader.msg = "nothing changed"
+        reader.dirty = True
+        return
+
+    _add_to_history(reader, source)
+    reader.console.finish()  # Output goes below the input
+    ran = 0
+    with suspend_console(reader):
+        for line, code in statements[skipped:]:
+            last = skipped + ran == len(statements) - 1
+            # Pad with newlines so that line numbers in tracebacks match
+            padded = "\n" * (line - 1) + code
+            if not run_source(padded, get_namespace(), "<input>", display=last):
+                break
+            ran += 1
+    _rerun_fingerprints[:] = fingerprints[: skipped + ran]
+    reader.msg = f"skipped {skipped}, ran {ran} of {len(statements)} statements"
+    reader.dirty = True
+
+
+@register_command  # type: ignore[call-overload]
+def show_help(reader: HistoricalReader) -> None:
+    """Show help on the (dotted) name under the cursor in the pager."""
+    name = name_at(get_text(reader), reader.pos)
+    if name is None:
+        reader.error("no name under cursor")
+        return
+    try:
+        obj = resolve_name(name, get_namespace())
+    except Exception as error:  # noqa: BLE001 - attribute lookups run user code
+        reader.error(f"{type(error).__name__}: {error}")
+        return
+    title = f"help on {name}"
+    if (text := cached_help(obj)) is not None:
+        show_in_pager(reader, text, title)
+        return
+
+    def rendered(outcome: str | Exception) -> None:
+        if isinstance(outcome, Exception):
+            error = f"{type(outcome).__name__}: {outcome}"
+            call_soon(lambda reader: reader.error(error))
+        else:
+            call_soon(lambda reader: show_in_pager(reader, outcome, title))
+
+    render_help_in_background(obj, rendered)
+    reader.msg = f"rendering help on {name}..."
+    reader.dirty = True
+
+
+@register_command  # type: ignore[call-overload]
+def show_signature(reader: HistoricalReader) -> None:
+    """Show the signature of the call the cursor is inside of."""
+    hint = signature_at(get_text(reader), reader.pos, get_namespace())
+    if hint is None:
+        reader.error("no signature found")
+        return
+    reader.msg = hint
+    reader.dirty = True
+
+
+@register_command  # type: ignore[call-overload]
+def auto_import(reader: HistoricalReader) -> None:
+    """Add an import for the undefined name under the cursor to the top."""
+    name = name_at(get_text(reader), reader.pos)
+    if name is None:
+        reader.error("no name under cursor")
+        return
+    name = name.partition(".")[0]
+    try:
+        resolve_name(name, get_namespace())
+    except NameError:
+        pass
+    else:
+        reader.error(f"{name} is already defined")
+        return
+    index = get_import_index()
+    if not index.ready.is_set():
+        reader.msg = "building import index (try again in a moment)..."
+        reader.dirty = True
+        return
+    modules = index.modules_for(name)
+    if not modules:
+        reader.error(f"no module found for {name}")
+        return
+    line = import_line(name, modules[0])
+    if line in get_text(reader).splitlines():
+        reader.error(f"{name} is already imported")
+        return
+    reader.buffer[0:0] = list(line + "\n")
+    reader.pos += len(line) + 1
+    reader.last_refresh_cache.invalidated = True
+    others = ", ".join(modules[1:4])
+    reader.msg = line + (f" (also in {others})" if others else "")
+    reader.dirty = True
+
+
+def _command_label(name: str, command_class: type[Command]) -> str:
+    """Return a command's name with the first line of its docstring."""
+    summary = (command_class.__doc__ or "").strip().partition("\n")[0]
+    return f"{name}  {summary}" if summary else name
+
+
+def _run_picked_command(reader: HistoricalReader, name: str) -> Command | None:
+    """Run a command picked from the command palette."""
+    command = reader.commands[name](reader, name, [])
+    try:
+        command.do()
+    except Exception as error:  # noqa: BLE001 - a command can't crash the REPL
+        reader.error(f"{name} failed: {error}")
+        return None
+    return command
+
+
+@register_command  # type: ignore[call-overload]
+def command_palette(reader: HistoricalReader) -> None:
+    """Pick a command to run by fuzzy searching names and docstrings."""
+    index = get_command_index(reader)
+
+    def search(query: str) -> list[tuple[str, str]]:
+        return [
+            (_command_label(name, reader.commands[name]), name)
+            for name in index.search(query)
+            if name in reader.commands
+        ]
+
+    open_picker(reader, Picker("command: ", search, _run_picked_command))
+
+
+@register_command  # type: ignore[call-overload]
+def expand_snippet(reader: HistoricalReader) -> None:
+    """Expand the snippet named before the cursor (or go to the next field)."""
+    try:
+        expanded = _expand_snippet(reader, get_snippet_library())
+    except (OSError, TypeError, ValueError) as error:  # TOMLDecodeError is a ValueError
+        reader.error(f"can't load snippets: {error}")
+        return
+    if expanded is None and not next_field(reader):
+        reader.error("no snippet here")
+
+
+@register_command  # type: ignore[call-overload]
+def next_snippet_field(reader: HistoricalReader) -> None:
+    """Move to the next tab stop of the latest snippet."""
+    if not next_field(reader):
+        reader.error("no more snippet fields")
+
+
+def _kill_label(text: str, width: int = 60) -> str:
+    """Return a one-line preview of killed text."""
+    first_line, *rest = text.splitlines() or [""]
+    preview = (
+        first_line if len(first_line) <= width else first_line[: width - 3] + "..."
+    )
+    return preview + (f"  (+{len(rest)} lines)" if rest else "")
+
+
+def _yank_from_ring(reader: HistoricalReader, index: int) -> None:
+    """Insert a kill and make it the newest one (so yank inserts it again)."""
+    kill = reader.kill_ring.pop(index)
+    reader.kill_ring.append(kill)
+    reader.insert(kill)
+
+
+@register_command  # type: ignore[call-overload]
+def kill_ring_browse(reader: HistoricalReader) -> None:
+    """Pick a previously killed text to insert at the cursor."""
+    if not reader.kill_ring:
+        reader.error("nothing to yank")
+        return
+    texts = ["".join(kill) for kill in reader.kill_ring]
+
+    def search(query: str) -> list[tuple[str, int]]:
+        query = query.lower()
+        return [
+            (_kill_label(texts[index]), index)
+            for index in reversed(range(len(texts)))
+            if query in texts[index].lower()
+        ]
+
+    open_picker(reader, Picker("yank: ", search, _yank_from_ring))
+
+
+@register_command  # type: ignore[call-overload]
+def set_mark(reader: HistoricalReader) -> None:
+    """Set the mark at the cursor (the region is between the mark and cursor)."""
+    _set_mark(reader)
+    reader.msg = "mark set"
+    reader.dirty = True
+
+
+@register_command  # type: ignore[call-overload]
+def exchange_point_and_mark(reader: HistoricalReader) -> None:
+    """Swap the cursor and the mark."""
+    if not _exchange_point_and_mark(reader):
+        reader.error("no mark set")
+
+
+@register_command  # type: ignore[call-overload]
+def indent_region(reader: HistoricalReader) -> None:
+    """Indent the lines in the region."""
+    transform_region(reader, indent_lines)
+
+
+@register_command  # type: ignore[call-overload]
+def dedent_region(reader: HistoricalReader) -> None:
+    """Dedent the lines in the region."""
+    transform_region(reader, dedent_lines)
+
+
+@register_command  # type: ignore[call-overload]
+def toggle_comment(reader: HistoricalReader) -> None:
+    """Comment out the lines in the region (or uncomment them)."""
+    transform_region(reader, comment_lines)
+
+
+@register_command  # type: ignore[call-overload]
+def move_region_up(reader: HistoricalReader) -> None:
+    """Move the lines in the region up one line."""
+    if not move_region(reader, -1):
+        reader.error("no line above")
+
+
+@register_command  # type: ignore[call-overload]
+def move_region_down(reader: HistoricalReader) -> None:
+    """Move the lines in the region down one line."""
+    if not move_region(reader, 1):
+        reader.error("no line below")
+
+
+@register_command  # type: ignore[call-overload]
+def sort_lines(reader: HistoricalReader) -> None:
+    """Sort the lines in the region."""
+    transform_region(reader, sorted)
+
+
+@register_command  # type: ignore[call-overload]
+def duplicate_region(reader: HistoricalReader) -> None:
+    """Insert a copy of the lines in the region below them."""
+    _duplicate_region(reader)
+
+
+def _bracket_index(reader: HistoricalReader) -> BracketIndex:
+    """Return the reader's bracket index, updated for the current input."""
+    index = _bracket_indexes.setdefault(id(reader), BracketIndex())
+    index.update(get_text(reader))
+    return index
+
+
+@register_command  # type: ignore[call-overload]
+def jump_to_matching_bracket(reader: HistoricalReader) -> None:
+    """Jump to the bracket matching the one at (or just before) the cursor."""
+    buffer, pos = reader.buffer, reader.pos
+    if pos < len(buffer) and buffer[pos] in BRACKET_PAIRS | CLOSE_TO_OPEN:
+        bracket = pos
+    elif pos > 0 and buffer[pos - 1] in CLOSE_TO_OPEN:
+        bracket = pos - 1
+    else:
+        reader.error("no bracket here")
+        return
+    match = _bracket_index(reader).match(bracket)
+    if match is None:
+        reader.error("no matching bracket")
+        return
+    reader.pos = match
+    reader.dirty = True
+
+
+@register_command  # type: ignore[call-overload]
+def select_inside_brackets(reader: HistoricalReader) -> None:
+    """Set the mark and cursor around the inside of the enclosing brackets.
+
+    Running it again selects the inside of the next brackets out.
+    """
+    mark = get_mark(reader)
+    for opening, closing in _bracket_index(reader).enclosing(reader.pos):
+        if (mark, reader.pos) != (opening + 1, closing):
+            _set_mark(reader, opening + 1)
+            reader.pos = closing
+            reader.dirty = True
+            return
+    reader.error("not inside brackets")
+
+
+@register_command  # type: ignore[call-overload]
+def previous_statement(reader: HistoricalReader) -> None:
+    """Move cursor to the start of the current (or previous) top-level statement."""
+    structure = parse_structure(get_text(reader))
+    starts = [structure.offsets[first] for first, _ in structure.statements]
+    before = [start for start in starts if start < reader.pos]
+    if not before:
+        reader.pos = 0
+        reader.error("start of buffer")
+        return
+    reader.pos = before[-1]
+    reader.dirty = True
+
+
+@register_command  # type: ignore[call-overload]
+def next_statement(reader: HistoricalReader) -> None:
+    """Move cursor to the start of the next top-level statement."""
+    structure = parse_structure(get_text(reader))
+    starts = [structure.offsets[first] for first, _ in structure.statements]
+    after = [start for start in starts if start > reader.pos]
+    if not after:
+        reader.pos = len(reader.buffer)
+        reader.error("end of buffer")
+        return
+    reader.pos = after[0]
+    reader.dirty = True
+
+
+@register_command  # type: ignore[call-overload]
+def jump_to_enclosing_block(reader: HistoricalReader) -> None:
+    """Move cursor to the header of the block (def, class, for, etc.) around it."""
+    structure = parse_structure(get_text(reader))
+    line = structure.line_at(reader.pos)
+    for block in structure.blocks_at(line):
+        if block.header < line:
+            start = structure.offsets[block.header]
+            header = reader.buffer[start : structure.line_end(block.header)]
+            reader.pos = start + len(header) - len("".join(header).lstrip())
+            reader.dirty = True
+            return
+    reader.error("not in a block")
+
+
+@register_command  # type: ignore[call-overload]
+def select_block(reader: HistoricalReader) -> None:
+    """Set the mark and cursor around the lines of the block under the cursor.
+
+    Running it again selects the next block out.
+    """
+    structure = parse_structure(get_text(reader))
+    bounds = [
+        (structure.offsets[block.start], structure.line_end(block.end))
+        for block in structure.blocks_at(structure.line_at(reader.pos))
+    ]
+    selection = (get_mark(reader), reader.pos)
+    index = bounds.index(selection) + 1 if selection in bounds else 0
+    if index >= len(bounds):
+        reader.error("not in a block")
+        return
+    start, reader.pos = bounds[index]
+    _set_mark(reader, start)
+    reader.dirty = True
+
+
+@register_command  # type: ignore[call-overload]
+def start_macro(reader: HistoricalReader) -> None:
+    """Start recording a keyboard macro (run it with call-macro)."""
+    start_recording(reader)
+    reader.msg = "recording macro..."
+    reader.dirty = True
+
+
+@register_command  # type: ignore[call-overload]
+def end_macro(reader: HistoricalReader) -> None:
+    """Stop recording the keyboard macro started with start-macro."""
+    macro = stop_recording(reader)
+    if macro is None:
+        reader.error("not recording a macro")
+        return
+    reader.msg = f"macro recorded ({len(macro.steps)} commands)"
+    reader.dirty = True
+
+
+# A class rather than a function, so a macro that accepts the input finishes it
+_get_reader().commands[LAST_MACRO] = MacroCommand
+
+
+def _plural(count: int, noun: str) -> str:
+    return f"{count} {noun}" if count == 1 else f"{count} {noun}es"
+
+
+@register_command  # type: ignore[call-overload]
+def query_replace_regexp(reader: HistoricalReader) -> None:
+    """Replace matches of a regular expression in the input (or the region).
+
+    With the mark set in this input, only the lines in the region are
+    searched (a mark from an earlier input is dropped with it).  The
+    replacement can refer to groups (like \\1).  Matches can all be
+    replaced at once, or stepped through one at a time.
+    """
+    text = get_text(reader)
+    start, end = (0, len(text)) if get_mark(reader) is None else region_lines(reader)
+
+    def matches(pattern: str) -> tuple[re.Match[str], ...]:
+        try:
+            return find_matches(pattern, text, start, end)
+        except re.error:
+            return ()
+
+    def search_pattern(query: str) -> list[tuple[str, str]]:
+        found = matches(query) if query else ()
+        return [(_plural(len(found), "match"), query)] if found else []
+
+    def pick_pattern(reader: HistoricalReader, pattern: str) -> None:
+        found = matches(pattern)
+
+        def search_replacement(query: str) -> list[tuple[str, tuple[str, bool]]]:
+            try:
+                example = f"{found[0].group()!r} -> {found[0].expand(query)!r}"
+            except (re.error, IndexError):
+                return []
+            return [
+                (f"replace {_plural(len(found), 'match')} ({example})", (query, False)),
+                ("step through the matches", (query, True)),
+            ]
+
+        def pick_replacement(
+            reader: HistoricalReader,
+            choice: tuple[str, bool],
+        ) -> None:
+            replacement, step = choice
+            if step:
+                query_replace(reader, found, replacement)
+            else:
+                replace_matches(reader, found, replacement)
+                reader.msg = f"replaced {_plural(len(found), 'match')}"
+
+        prompt = f"replace {pattern} with: "
+        open_picker(reader, Picker(prompt, search_replacement, pick_replacement))
+
+    open_picker(reader, Picker("replace regexp: ", search_pattern, pick_pattern))
+
+
+@register_command  # type: ignore[call-overload]
+def undo(reader: HistoricalReader) -> None:
+    """Undo the last change to the input (after enable_undo)."""
+    history = get_undo_history(reader)
+    if history is None:
+        reader.error("undo isn't enabled")
+    elif not history.undo(reader):
+        reader.error("nothing to undo")
+
+
+@register_command  # type: ignore[call-overload]
+def redo(reader: HistoricalReader) -> None:
+    """Redo the last change undone with undo."""
+    history = get_undo_history(reader)
+    if history is None:
+        reader.error("undo isn't enabled")
+    elif not history.redo(reader):
+        reader.error("nothing to redo")
+
+
 def _add_pyrepl_commands() -> None:
     """Create simple command functions for all _pyrepl commands also."""
     import _pyrepl.commands
@@ -0,0 +1,298 @@
+"""Utilities for faster attribute completion on objects with many attributes.
+
+The standard completer calls dir() on the object and filters every
+attribute name on each Tab press.  The completer here keeps a sorted list of
+attribute names per object (found with bisect) and computes the list in a
+background thread, so a slow dir() can't stall the REPL for longer than a
+small time budget.
+"""
+
+from __future__ import annotations
+
+import bisect
+import inspect
+import re
+import rlcompleter
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any
+
+from ._types import HistoricalReader
+from .exec_utils import get_namespace
+from .hook_utils import call_soon
+
+__all__ = [
+    "AttributeCache",
+    "CachedCompleter",
+    "disable_completion_cache",
+    "enable_completion_cache",
+]
+
+ATTRIBUTE_EXPRESSION_RE = re.compile(r"(\w+(\.\w+)*)\.(\w*)")
+# Only add "(" to callables when there are few matches (it calls getattr)
+MAX_DECORATED_MATCHES = 200
+
+# A weak reference to the object, its version token, when it was cached,
+# and its names
+CacheEntry = tuple["weakref.ref[Any]", object, float, list[str]]
+
+
+def _class_members(klass: type) -> set[str]:
+    """Return the attribute names of a class and its bases."""
+    members = set(dir(klass))
+    for base in getattr(klass, "__bases__", ()):
+        members |= _class_members(base)
+    return members
+
+
+def _attribute_names(obj: object) -> list[str]:
+    """Return the sorted attribute names to complete (like rlcompleter)."""
+    words = set(dir(obj))
+    words.discard("__builtins__")
+    if hasattr(obj, "__class__"):
+        words.add("__class__")
+        words |= _class_members(obj.__class__)
+    return sorted(words)
+
+
+def _call_suffix(value: object) -> str:
+    """Return "(" for callables, or "()" if they take no arguments."""
+    if not callable(value):
+        return ""
+    try:
+        return "(" if inspect.signature(value).parameters else "()"
+    except (TypeError, ValueError):
+        return "("
+
+
+def _version(obj: object) -> tuple[type, int | None]:
+    """Return a cheap token that changes when attributes are added or removed."""
+    try:
+        size = len(vars(obj))
+    except TypeError:
+        size = None
+    return type(obj), size
+
+
+def _cache_target(obj: object) -> object | None:
+    """Return what an object's names are cached under (None if they can't be).
+
+    Names are cached under the object itself if it can be weakly referenced.
+    Objects that can't be and have no instance attributes (like ints and
+    lists) have the same names as every instance of their type, so they're
+    cached under the type.
+    """
+    try:
+        weakref.ref(obj)
+    except TypeError:
+        return None if hasattr(obj, "__dict__") else type(obj)
+    return obj
+
+
+class AttributeCache:
+    """Sorted attribute names of recently completed objects.
+
+    Entries are keyed by object identity and only hold weak references, so
+    a cached object can still be garbage collected.  They're invalidated
+    when the object's type or number of instance attributes changes, or
+    when they're older than max_age seconds.
+
+    Args:
+        budget: Seconds to wait for a slow dir() before giving up on this
+                Tab press (the names keep being computed in the background)
+        max_age: Seconds before cached names are computed again
+        maxsize: Maximum number of objects to cache names for
+    """
+
+    def __init__(
+        self,
+        budget: float = 0.05,
+        max_age: float = 60.0,
+        maxsize: int = 128,
+    ) -> None:
+        self.budget = budget
+        self.max_age = max_age
+        self.maxsize = maxsize
+        self._entries: OrderedDict[int, CacheEntry] = OrderedDict()
+        self._pending: dict[int, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, obj: object, target: object) -> list[str] | None:
+        """Return the cached names for an object, if they're still valid."""
+        with self._lock:
+            entry = self._entries.get(id(target))
+            if entry is None:
+                return None
+            reference, version, created, names = entry
+            if (
+                reference() is not target
+                or version != _version(obj)
+                or time.monotonic() - created > self.max_age
+            ):
+                del self._entries[id(target)]
+                return None
+            self._entries.move_to_end(id(target))
+            return names
+
+    def _fill(self, obj: object, target: object, done: threading.Event) -> None:
+        """Compute the names for an object and cache them."""
+        try:
+            names = _attribute_names(obj)
+        except Exception:  # noqa: BLE001 - dir() can run any __dir__
+            names = []
+        entry = (weakref.ref(target), _version(obj), time.monotonic(), names)
+        with self._lock:
+            self._entries[id(target)] = entry
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            del self._pending[id(target)]
+        done.set()
+
+    def names(self, obj: object) -> list[str] | None:
+        """Return the sorted attribute names of an object.
+
+        Returns None if computing them takes longer than the time budget.
+        They'll be cached once they're ready.
+        """
+        target = _cache_target(obj)
+        if target is None:  # Rare, so just compute them
+            try:
+                return _attribute_names(obj)
+            except Exception:  # noqa: BLE001 - dir() can run any __dir__
+                return []
+        if (names := self._cached(obj, target)) is not None:
+            return names
+        with self._lock:
+            done = self._pending.get(id(target))
+            if done is None:
+                done = self._pending[id(target)] = threading.Event()
+                thread = threading.Thread(
+                    target=self._fill,
+                    args=(obj, target, done),
+                    name="attribute names",
+                    daemon=True,
+                )
+                thread.start()
+        if not done.wait(self.budget):
+            return None
+        with self._lock:
+            entry = self._entries.get(id(target))
+        return entry[3] if entry is not None and entry[0]() is target else None
+
+    def clear(self) -> None:
+        """Forget all cached names."""
+        with self._lock:
+            self._entries.clear()
+
+
+def _prefixed(words: list[str], prefix: str) -> list[str]:
+    """Return the words starting with a prefix (words must be sorted).
+
+    Examples:
+        >>> _prefixed(["append", "clear", "copy", "count"], "co")
+        ['copy', 'count']
+    """
+    start = bisect.bisect_left(words, prefix)
+    end = bisect.bisect_left(words, prefix + "\U0010ffff", start)
+    return words[start:end]
+
+
+class CachedCompleter(rlcompleter.Completer):
+    """An rlcompleter.Completer that caches attribute names per object."""
+
+    namespace: dict[str, Any]
+
+    def __init__(
+        self,
+        namespace: dict[str, Any] | None = None,
+        cache: AttributeCache | None = None,
+    ) -> None:
+        super().__init__(namespace)
+        self.cache = AttributeCache() if cache is None else cache
+
+    def attr_matches(self, text: str) -> list[str]:
+        """Compute matches for text of the form NAME.NAME...[NAME]."""
+        match = ATTRIBUTE_EXPRESSION_RE.match(text)
+        if not match:
+            return []
+        expression, attribute = match.group(1, 3)
+        try:
+            obj = eval(expression, self.namespace)
+        except Exception:  # noqa: BLE001 - completion can't raise into the REPL
+            return []
+        words = self.cache.names(obj)
+        if words is None:
+            call_soon(_show_computing_message)
+            return []
+        candidates = _prefixed(words, attribute)
+        # Hide private names unless the prefix asks for them (as rlcompleter
+        # does), falling back to them if there's nothing else
+        if attribute in ("", "_"):
+            private = attribute + "_"
+            public = [word for word in candidates if not word.startswith(private)]
+            if public:
+                candidates = public
+            elif attribute == "":
+                dunder = [word for word in candidates if not word.startswith("__")]
+                candidates = dunder or candidates
+        if len(candidates) > MAX_DECORATED_MATCHES:
+            return [f"{expression}.{word}" for word in candidates]
+        matches = []
+        object_type = type(obj)
+        for word in candidates:
+            completion = f"{expression}.{word}"
+            if isinstance(getattr(object_type, word, None), property):
+                matches.append(completion)
+            elif (value := getattr(obj, word, None)) is not None:
+                matches.append(completion + _call_suffix(value))
+            else:
+                matches.append(completion)
+        return matches
+
+
+def _show_computing_message(reader: HistoricalReader) -> None:
+    """Explain why Tab didn't complete anything."""
+    reader.msg = "computing completions (press Tab again)..."
+    reader.dirty = True
+
+
+# The REPL's own completer, saved while the cached completer is installed
+_original_completer: list[Any] = []
+
+
+def enable_completion_cache(budget: float = 0.05, max_age: float = 60.0) -> None:
+    """Use a completer that caches each object's sorted attribute names.
+
+    The completer is installed once the REPL starts waiting for input (the
+    REPL sets up its own completer after running the startup file).
+
+    Args:
+        budget: Seconds a Tab press waits for a slow dir() before giving up
+                (the names keep being computed in the background)
+        max_age: Seconds before an object's cached names are recomputed
+    """
+    cache = AttributeCache(budget=budget, max_age=max_age)
+
+    def install(reader: HistoricalReader) -> None:
+        from _pyrepl.readline import _wrapper
+
+        if not _original_completer:
+            _original_completer.append(_wrapper.config.readline_completer)
+        completer = CachedCompleter(get_namespace(), cache)
+        _wrapper.config.readline_completer = completer.complete
+
+    call_soon(install)
+
+
+def disable_completion_cache() -> None:
+    """Go back to the REPL's standard completer."""
+
+    def uninstall(reader: HistoricalReader) -> None:
+        from _pyrepl.readline import _wrapper
+
+        if _original_completer:
+            _wrapper.config.readline_completer = _original_completer.pop()
+
+    call_soon(uninstall)
@@ -0,0 +1,163 @@
+"""Utilities for commands that run code or write to the terminal.
+
+REPL commands run while the console is in raw mode, so anything that prints
+output (running user code, showing a pager) needs to temporarily hand the
+terminal back first.
+"""
+
+from __future__ import annotations
+
+import ast
+import hashlib
+import sys
+import traceback
+from collections.abc import Iterator
+from contextlib import contextmanager
+from types import CodeType
+from typing import Any
+
+from ._types import HistoricalReader
+
+__all__ = [
+    "compile_source",
+    "fingerprint_statements",
+    "get_namespace",
+    "page",
+    "run_source",
+    "show_in_pager",
+    "split_statements",
+    "suspend_console",
+]
+
+
+def get_namespace() -> dict[str, Any]:
+    """Return the namespace that REPL input is executed in."""
+    return vars(sys.modules["__main__"])
+
+
+def compile_source(source: str, filename: str) -> tuple[CodeType, CodeType | None]:
+    """Compile source code, splitting off a final expression (if there is one).
+
+    Args:
+        source: Python code to compile
+        filename: Filename to use in tracebacks
+
+    Returns:
+        A code object for the statements (to exec) and a code object for the
+        final expression (to eval), or None if the code doesn't end in one
+
+    Raises:
+        SyntaxError: If the source code is invalid
+    """
+    tree = ast.parse(source, filename)
+    expression = None
+    if tree.body and isinstance(last := tree.body[-1], ast.Expr):
+        tree.body.pop()
+        expression = compile(ast.Expression(last.value), filename, "eval")
+    return compile(tree, filename, "exec"), expression
+
+
+def split_statements(source: str) -> list[tuple[int, str]]:
+    """Split source code into its top-level statements.
+
+    Each statement includes its decorators and any statements sharing its
+    lines (as in ``x = 1; y = 2``).
+
+    Returns:
+        The line number each statement starts on and its source code
+
+    Raises:
+        SyntaxError: If the source code is invalid
+
+    Examples:
+        >>> split_statements("x = 1\\n\\ndef f():\\n    return x\\n")
+        [(1, 'x = 1\\n'), (3, 'def f():\\n    return x\\n')]
+    """
+    lines = source.splitlines(keepends=True)
+    spans: list[list[int]] = []
+    for node in ast.parse(source).body:
+        decorators = getattr(node, "decorator_list", [])
+        start = min([node.lineno, *(d.lineno for d in decorators)])
+        end = node.end_lineno or node.lineno
+        if spans and start <= spans[-1][1]:
+            spans[-1][1] = max(end, spans[-1][1])
+        else:
+            spans.append([start, end])
+    return [(start, "".join(lines[start - 1 : end])) for start, end in spans]
+
+
+def fingerprint_statements(statements: list[str]) -> list[str]:
+    """Fingerprint each statement along with all the statements before it.
+
+    A statement's fingerprint changes if it changes or if any statement
+    before it changes, so matching fingerprints mean the code up to that
+    point is the same.  Leading and trailing whitespace is ignored.
+    """
+    fingerprints = []
+    digest = hashlib.sha256()
+    for statement in statements:
+        digest.update(statement.strip().encode() + b"\0")
+        fingerprints.append(digest.copy().hexdigest())
+    return fingerprints
+
+
+def run_source(
+    source: str,
+    namespace: dict[str, Any],
+    filename: str,
+    *,
+    display: bool = True,
+) -> bool:
+    """Run source code like the REPL does (the console must be suspended).
+
+    The value of a final expression is shown with sys.displayhook (which
+    also stores it in _) and exceptions are printed instead of raised.
+
+    Args:
+        source: Python code to run
+        namespace: Globals to run the code in
+        filename: Filename to use in tracebacks
+        display: Whether to show the value of a final expression
+
+    Returns:
+        True if the code ran without raising an exception
+    """
+    try:
+        statements, expression = compile_source(source, filename)
+        exec(statements, namespace)  # noqa: S102 - running the user's input
+        if expression is not None:
+            value = eval(expression, namespace)
+            if display:
+                sys.displayhook(value)
+    except Exception:  # noqa: BLE001 - printed like the REPL prints errors
+        traceback.print_exc()
+        return False
+    return True
+
+
+@contextmanager
+def suspend_console(reader: HistoricalReader) -> Iterator[None]:
+    """Restore the terminal to its normal mode for the duration of the block.
+
+    The input buffer is left untouched and fully redrawn afterward.
+    """
+    reader.console.restore()
+    try:
+        yield
+    finally:
+        reader.console.prepare()
+        reader.last_refresh_cache.invalidated = True
+        reader.dirty = True
+
+
+def page(text: str, title: str = "") -> None:
+    """Show text in the REPL's pager (the console must be suspended)."""
+    from _pyrepl.pager import get_pager
+
+    get_pager()(text, title)
+
+
+def show_in_pager(reader: HistoricalReader, text: str, title: str = "") -> None:
+    """Show text in the REPL's pager without changing the input buffer."""
+    with suspend_console(reader):
+        page(text, title)
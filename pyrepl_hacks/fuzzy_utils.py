@@ -0,0 +1,99 @@
+"""Utilities for fuzzy (subsequence) matching, as used by pickers.
+
+A query matches text if its characters appear in the text in order, like
+"mld" matching "move-line-down".  Matches at the start of words and runs of
+consecutive characters score higher.
+"""
+
+from __future__ import annotations
+
+from typing import NamedTuple
+
+__all__ = ["FuzzyIndex", "fuzzy_score"]
+
+WORD_SEPARATORS = frozenset(" -_.()")
+
+
+def fuzzy_score(query: str, text: str) -> int | None:
+    """Score how well a (lowercase) query matches text, or None if it doesn't.
+
+    Examples:
+        >>> fuzzy_score("mld", "move-line-down")
+        13
+        >>> fuzzy_score("mld", "molded")
+        7
+        >>> fuzzy_score("xyz", "move-line-down") is None
+        True
+    """
+    score = 0
+    index = -1
+    previous = -2
+    for char in query:
+        index = text.find(char, index + 1)
+        if index == -1:
+            return None
+        if index == 0 or text[index - 1] in WORD_SEPARATORS:
+            score += 5  # Start of a word
+        if index == previous + 1:
+            score += 3  # Consecutive characters
+        elif previous >= 0:
+            score -= 1  # Gap since the previous character
+        previous = index
+    return score
+
+
+class _Entry(NamedTuple):
+    key: str
+    name: str  # Lowercase key
+    description: str  # Lowercase description
+    characters: frozenset[str]
+
+
+class FuzzyIndex:
+    """Keys (with optional descriptions) that can be searched fuzzily.
+
+    Matches in keys rank above matches in descriptions.  Each entry's
+    characters are precomputed to quickly rule out entries, and a query
+    that extends the previous query only searches the previous matches, so
+    searching stays fast while a query is typed.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[str, _Entry] = {}
+        self._last_query: str | None = None
+        self._last_matches: list[_Entry] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+    def add(self, key: str, description: str = "") -> None:
+        """Add (or replace) a key and its description."""
+        name, description = key.lower(), " ".join(description.lower().split())
+        characters = frozenset(name + description)
+        self._entries[key] = _Entry(key, name, description, characters)
+        self._last_query = None
+
+    def search(self, query: str) -> list[str]:
+        """Return the keys matching a query, best match first."""
+        query = "".join(query.lower().split())
+        if self._last_query is not None and query.startswith(self._last_query):
+            candidates = self._last_matches
+        else:
+            candidates = list(self._entries.values())
+        needed = set(query)
+        scored = []
+        matches = []
+        for entry in candidates:
+            if not needed <= entry.characters:
+                continue
+            if (score := fuzzy_score(query, entry.name)) is not None:
+                score += 100
+            elif (score := fuzzy_score(query, entry.description)) is None:
+                continue
+            scored.append((-score, len(entry.key), entry.key))
+            matches.append(entry)
+        self._last_query, self._last_matches = query, matches
+        return [key for *_, key in sorted(scored)]
@@ -0,0 +1,275 @@
+"""Utilities for showing help and signatures for objects in the REPL."""
+
+from __future__ import annotations
+
+import builtins
+import inspect
+import pydoc
+import re
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+from collections.abc import Callable
+from types import MethodType
+from typing import Any
+
+from ._types import Command, HistoricalReader
+from .exec_utils import get_namespace
+from .hook_utils import add_command_hook, remove_command_hook
+from .token_utils import open_brackets
+
+__all__ = [
+    "cached_help",
+    "called_name_at",
+    "disable_signature_hints",
+    "enable_signature_hints",
+    "format_signature",
+    "name_at",
+    "render_help",
+    "render_help_in_background",
+    "resolve_name",
+    "signature_at",
+]
+
+DOTTED_NAME_RE = re.compile(r"[^\W\d]\w*(?:\.[^\W\d]\w*)*")
+# A dotted name at the end of the text (not an attribute of an expression)
+CALLED_NAME_RE = re.compile(rf"(?<![\w.]){DOTTED_NAME_RE.pattern}$")
+
+# Rendered help by object id: (weak reference, module version, help text)
+_help_cache: OrderedDict[int, tuple[weakref.ref[Any], object, str]] = OrderedDict()
+_help_cache_lock = threading.Lock()
+HELP_CACHE_SIZE = 64
+
+# Signatures by object id: (weak reference, signature)
+_signature_cache: OrderedDict[int, tuple[weakref.ref[Any], inspect.Signature]] = (
+    OrderedDict()
+)
+SIGNATURE_CACHE_SIZE = 256
+
+
+def name_at(text: str, pos: int) -> str | None:
+    """Return the dotted name at (or just before) a position in text.
+
+    Only the part of the name up to the end of the word under the cursor is
+    returned, so the cursor picks which attribute of a long name to use.
+
+    Examples:
+        >>> name_at("print(os.path.join)", 11)
+        'os.path'
+        >>> name_at("x = 1", 3) is None
+        True
+    """
+    line_start = text.rfind("\n", 0, pos) + 1
+    line_end = text.find("\n", pos)
+    line = text[line_start : len(text) if line_end == -1 else line_end]
+    column = pos - line_start
+    for match in DOTTED_NAME_RE.finditer(line):
+        if match.start() <= column <= match.end():
+            word_end = line.find(".", column)
+            if word_end == -1 or word_end > match.end():
+                word_end = match.end()
+            return line[match.start() : word_end]
+    return None
+
+
+def called_name_at(text: str, pos: int) -> str | None:
+    """Return the dotted name of the call the cursor is inside of (if any).
+
+    Examples:
+        >>> called_name_at("print(os.path.join(a, b), c)", 22)
+        'os.path.join'
+        >>> called_name_at("print(os.path.join(a, b), c)", 27)
+        'print'
+        >>> called_name_at("items[0]", 7) is None
+        True
+        >>> called_name_at("load().fit(", 11) is None
+        True
+    """
+    for offset, char in reversed(open_brackets(text, pos)):
+        if char != "(":
+            return None
+        line_start = text.rfind("\n", 0, offset) + 1
+        name = CALLED_NAME_RE.search(text, line_start, offset)
+        return None if name is None else name.group()
+    return None
+
+
+def resolve_name(name: str, namespace: dict[str, Any]) -> object:
+    """Look up a dotted name in a namespace (falling back to builtins).
+
+    Raises:
+        NameError: If the first part of the name isn't defined
+        AttributeError: If one of the attributes doesn't exist
+    """
+    first, *attributes = name.split(".")
+    if first in namespace:
+        obj = namespace[first]
+    elif hasattr(builtins, first):
+        obj = getattr(builtins, first)
+    else:
+        raise NameError(f"name {first!r} is not defined")
+    for attribute in attributes:
+        obj = getattr(obj, attribute)
+    return obj
+
+
+def _module_version(obj: object) -> object:
+    """Return the version of the module an object comes from (if known)."""
+    module_name = getattr(obj, "__module__", None) or getattr(obj, "__name__", None)
+    if not isinstance(module_name, str):
+        return None
+    module = sys.modules.get(module_name.partition(".")[0])
+    return getattr(module, "__version__", None)
+
+
+def _help_target(obj: object) -> object | None:
+    """Return what an object's help is cached under (None if it can't be).
+
+    pydoc documents an instance by its type, so instances that can't be
+    weakly referenced (like ints and lists) share their type's entry unless
+    they have instance attributes.
+    """
+    try:
+        weakref.ref(obj)
+    except TypeError:
+        return None if hasattr(obj, "__dict__") else type(obj)
+    return obj
+
+
+def cached_help(obj: object) -> str | None:
+    """Return the help rendered for an object earlier (None if not cached)."""
+    target, version = _help_target(obj), _module_version(obj)
+    if target is None:
+        return None
+    with _help_cache_lock:
+        if (cached := _help_cache.get(id(target))) is not None:
+            reference, cached_version, text = cached
+            if reference() is target and cached_version == version:
+                _help_cache.move_to_end(id(target))
+                return text
+    return None
+
+
+def render_help(obj: object) -> str:
+    """Return pydoc's plain text help for an object.
+
+    Help is cached by object identity and by the version of the object's
+    package, so upgrading and reloading a package shows fresh help.  The
+    cache only holds weak references, so it doesn't keep objects alive.
+    """
+    if (text := cached_help(obj)) is not None:
+        return text
+    text = pydoc.plain(pydoc.render_doc(obj))
+    if (target := _help_target(obj)) is None:
+        return text
+    with _help_cache_lock:
+        _help_cache[id(target)] = (weakref.ref(target), _module_version(obj), text)
+        while len(_help_cache) > HELP_CACHE_SIZE:
+            _help_cache.popitem(last=False)
+    return text
+
+
+def render_help_in_background(
+    obj: object,
+    callback: Callable[[str | Exception], None],
+) -> None:
+    """Render help for an object in a background thread.
+
+    Args:
+        obj: Object to render help for
+        callback: Called (from the background thread) with the help text
+                  or with the exception raised while rendering it
+    """
+
+    def run() -> None:
+        try:
+            text = render_help(obj)
+        except Exception as error:  # noqa: BLE001 - passed to the callback to show
+            callback(error)
+        else:
+            callback(text)
+
+    threading.Thread(target=run, name="render help", daemon=True).start()
+
+
+def _cached_signature(obj: Callable[..., Any]) -> inspect.Signature:
+    """Return an object's signature, caching it by the object's identity.
+
+    A bound method's signature is derived from its function's (as inspect
+    does), so the instance it's bound to isn't cached.
+    """
+    if isinstance(obj, MethodType):
+        signature = _cached_signature(obj.__func__)
+        parameters = list(signature.parameters.values())
+        if parameters and parameters[0].kind in (
+            inspect.Parameter.POSITIONAL_ONLY,
+            inspect.Parameter.POSITIONAL_OR_KEYWORD,
+        ):
+            return signature.replace(parameters=parameters[1:])
+        return inspect.signature(obj)
+    try:
+        reference = weakref.ref(obj)
+    except TypeError:  # Like builtin functions and methods
+        return inspect.signature(obj)
+    if (cached := _signature_cache.get(id(obj))) is not None and cached[0]() is obj:
+        _signature_cache.move_to_end(id(obj))
+        return cached[1]
+    signature = inspect.signature(obj)
+    _signature_cache[id(obj)] = (reference, signature)
+    while len(_signature_cache) > SIGNATURE_CACHE_SIZE:
+        _signature_cache.popitem(last=False)
+    return signature
+
+
+def format_signature(obj: object, name: str) -> str | None:
+    """Return the name followed by the object's call signature (if it has one).
+
+    Signatures are cached (in a bounded LRU cache keyed by object identity
+    that only holds weak references) since inspect.signature can be slow
+    for wrapped functions.  Objects that can't be weakly referenced are
+    inspected every time.
+
+    Examples:
+        >>> format_signature(divmod, "divmod")
+        'divmod(x, y, /)'
+    """
+    if not callable(obj):
+        return None
+    try:
+        signature = _cached_signature(obj)
+    except (TypeError, ValueError):
+        return None
+    return f"{name}{signature}"
+
+
+def signature_at(text: str, pos: int, namespace: dict[str, Any]) -> str | None:
+    """Return the signature of the call the cursor is inside of (if known)."""
+    name = called_name_at(text, pos)
+    if name is None:
+        return None
+    try:
+        obj = resolve_name(name, namespace)
+    except Exception:  # noqa: BLE001 - attribute lookups run user code
+        return None
+    return format_signature(obj, name)
+
+
+def _show_signature_hint(reader: HistoricalReader, command: Command) -> None:
+    """Show the signature of the called object after "(" is typed."""
+    if command.event_name != "self-insert" or not "".join(command.event).endswith("("):
+        return
+    hint = signature_at(reader.get_unicode(), reader.pos, get_namespace())
+    if hint is not None:
+        reader.msg = hint
+        reader.dirty = True
+
+
+def enable_signature_hints() -> None:
+    """Show the signature of the called object whenever "(" is typed."""
+    add_command_hook(_show_signature_hint)
+
+
+def disable_signature_hints() -> None:
+    """Stop showing signatures when "(" is typed."""
+    remove_command_hook(_show_signature_hint)
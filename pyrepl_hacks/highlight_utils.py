@@ -0,0 +1,113 @@
+"""Cached, line-by-line syntax highlighting for the Python 3.14 REPL.
+
+The Python 3.14 REPL re-tokenizes the whole input buffer on every redraw.
+This module can replace that colorizer with one that caches highlighting
+per line, keyed by the line's text and the tokenizer state at its start.
+Only edited lines (and lines whose starting state changed, like lines after
+a newly opened triple-quoted string) are re-tokenized.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Iterator
+from functools import lru_cache
+from typing import Any
+
+from .token_utils import START_STATE, LineState, find_string_end, scan_line
+
+__all__ = ["LineHighlighter", "disable_highlight_cache", "enable_highlight_cache"]
+
+# (start, end, tag) with an inclusive end, like _pyrepl.utils.ColorSpan
+HighlightSpan = tuple[int, int, str]
+Colorizer = Callable[[str], Iterable[HighlightSpan]]
+
+_original_gen_colors: Callable[[str], Iterator[Any]] | None = None
+
+
+class LineHighlighter:
+    """Highlight a buffer line-by-line, caching the spans for each line.
+
+    Args:
+        colorize: Function that returns (start, end, tag) spans for a string
+                  of Python code that starts outside of any string
+        maxsize: Maximum number of lines to keep highlighting cached for
+                 (least recently used lines are evicted first)
+    """
+
+    def __init__(self, colorize: Colorizer, maxsize: int = 1024) -> None:
+        self.colorize = colorize
+        self._highlight_line = lru_cache(maxsize=maxsize)(self._highlight)
+
+    def _highlight(self, line: str, state: LineState) -> tuple[HighlightSpan, ...]:
+        """Return the highlighted spans for one line starting in the given state."""
+        spans = []
+        offset = 0
+        if state.quote:
+            offset = find_string_end(line, 0, state.quote)
+            if offset == -1:
+                return ((0, len(line) - 1, "string"),) if line else ()
+            spans.append((0, offset - 1, "string"))
+
+        # Re-open any unclosed brackets so the tokenizer sees valid code
+        prefix = state.brackets
+        shift = offset - len(prefix)
+        for start, end, tag in self.colorize(prefix + line[offset:]):
+            if end >= len(prefix):
+                spans.append((max(start, len(prefix)) + shift, end + shift, tag))
+        return tuple(spans)
+
+    def __call__(self, buffer: str) -> Iterator[HighlightSpan]:
+        """Yield (start, end, tag) spans for the given buffer."""
+        offset = 0
+        state = START_STATE
+        for line in buffer.split("\n"):
+            for start, end, tag in self._highlight_line(line, state):
+                yield start + offset, end + offset, tag
+            state = scan_line(line, state).end_state
+            offset += len(line) + 1
+
+    def cache_clear(self) -> None:
+        """Forget all cached line highlighting."""
+        self._highlight_line.cache_clear()
+
+
+def enable_highlight_cache(maxsize: int = 1024) -> None:
+    """Make the REPL cache syntax highlighting per line.
+
+    This is opt-in and requires Python 3.14 (which added syntax
+    highlighting to the REPL).  On earlier versions an ImportError is raised.
+
+    Args:
+        maxsize: Maximum number of highlighted lines to cache
+
+    Examples:
+        >>> enable_highlight_cache(maxsize=4096)
+    """
+    import _pyrepl.reader
+    from _pyrepl.utils import ColorSpan, Span, gen_colors
+
+    global _original_gen_colors
+    if _original_gen_colors is None:
+        _original_gen_colors = gen_colors
+
+    def colorize(source: str) -> Iterator[HighlightSpan]:
+        for color in gen_colors(source):
+            yield color.span.start, color.span.end, color.tag
+
+    highlighter = LineHighlighter(colorize, maxsize)
+
+    def cached_gen_colors(buffer: str) -> Iterator[ColorSpan]:
+        for start, end, tag in highlighter(buffer):
+            yield ColorSpan(Span(start, end), tag)
+
+    _pyrepl.reader.gen_colors = cached_gen_colors
+
+
+def disable_highlight_cache() -> None:
+    """Restore the REPL's default (uncached) syntax highlighting."""
+    global _original_gen_colors
+    if _original_gen_colors is not None:
+        import _pyrepl.reader
+
+        _pyrepl.reader.gen_colors = _original_gen_colors
+        _original_gen_colors = None
@@ -0,0 +1,217 @@
+"""Utilities for hooking into the reader's event loop.
+
+While waiting for input, the reader calls its run_hooks method roughly every
+100 milliseconds.  The hook installed here uses that to run callbacks that
+were scheduled from other threads, so background work can safely update the
+input buffer or the message shown under the prompt.  Idle hooks added with
+add_idle_hook are also called there, on the reader's thread.
+
+Input hooks added with add_input_hook are called whenever the reader starts
+a new input, which is the one place to clean up after an input that Ctrl+C
+interrupted (KeyboardInterrupt skips every command).
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+from _pyrepl.simple_interact import _get_reader
+from collections.abc import Callable
+
+from ._types import Command, HistoricalReader
+
+__all__ = [
+    "add_command_hook",
+    "add_idle_hook",
+    "add_input_hook",
+    "call_soon",
+    "remove_command_hook",
+    "remove_idle_hook",
+    "remove_input_hook",
+]
+
+ReaderCallback = Callable[[HistoricalReader], None]
+CommandHook = Callable[[HistoricalReader, Command], None]
+
+_pending: queue.SimpleQueue[ReaderCallback] = queue.SimpleQueue()
+_install_lock = threading.Lock()
+_installed = False
+_idle_hooks: list[ReaderCallback] = []
+_command_hooks_installed = False
+_command_hooks: list[CommandHook] = []
+_input_hooks_installed = False
+_input_hooks: list[ReaderCallback] = []
+
+
+def _run_pending(reader: HistoricalReader) -> None:
+    """Run every scheduled callback."""
+    while True:
+        try:
+            callback = _pending.get_nowait()
+        except queue.Empty:
+            break
+        try:
+            callback(reader)
+        except Exception as error:  # noqa: BLE001 - a callback can't crash the REPL
+            reader.error(f"{type(error).__name__}: {error}")
+
+
+def _run_idle_hooks(reader: HistoricalReader) -> None:
+    """Call every idle hook, removing any that raise an exception."""
+    for hook in _idle_hooks.copy():  # A copy, since hooks can be removed
+        try:
+            hook(reader)
+        except Exception as error:  # noqa: BLE001 - a hook can't crash the REPL
+            remove_idle_hook(hook)
+            reader.error(f"{type(error).__name__}: {error}")
+
+
+def _install() -> None:
+    """Wrap the reader's run_hooks method to also run scheduled callbacks."""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        reader_class = type(_get_reader())
+        original_run_hooks = reader_class.run_hooks
+
+        def run_hooks(self: HistoricalReader) -> None:
+            original_run_hooks(self)
+            if not _idle_hooks and _pending.empty():
+                return
+            # The screen is already dirty if the reader just cleared its
+            # message, which it doesn't redraw until the next key press, so
+            # only redraw now if a hook or callback changed something
+            was_dirty, self.dirty = self.dirty, False
+            _run_idle_hooks(self)
+            _run_pending(self)
+            if self.dirty:
+                self.refresh()
+            else:
+                self.dirty = was_dirty
+
+        reader_class.run_hooks = run_hooks
+        _installed = True
+
+
+def call_soon(callback: ReaderCallback) -> None:
+    """Schedule a callback to run on the reader's thread.
+
+    This is safe to call from any thread.  The callback is called with the
+    reader the next time the REPL is idle while waiting for input.
+
+    Args:
+        callback: Function accepting the reader
+    """
+    _install()
+    _pending.put(callback)
+
+
+def add_idle_hook(hook: ReaderCallback) -> None:
+    """Call a function on the reader's thread every time the reader is idle.
+
+    Hooks are called before waiting for each key press and then roughly
+    every 100 milliseconds until the next one, so they should be quick and
+    hand slow work off to another thread.  A hook that raises an exception
+    is removed and its error is shown.
+
+    Args:
+        hook: Function accepting the reader
+    """
+    _install()
+    if hook not in _idle_hooks:
+        _idle_hooks.append(hook)
+
+
+def remove_idle_hook(hook: ReaderCallback) -> None:
+    """Stop calling a function added with add_idle_hook."""
+    if hook in _idle_hooks:
+        _idle_hooks.remove(hook)
+
+
+def _install_command_hooks() -> None:
+    """Wrap the reader's after_command method to also call command hooks."""
+    global _command_hooks_installed
+    with _install_lock:
+        if _command_hooks_installed:
+            return
+        reader_class = type(_get_reader())
+        original_after_command = reader_class.after_command
+
+        def after_command(self: HistoricalReader, command: Command) -> None:
+            original_after_command(self, command)
+            for hook in _command_hooks.copy():  # A copy, since hooks can be removed
+                try:
+                    hook(self, command)
+                except Exception as error:  # noqa: BLE001 - a hook can't crash the REPL
+                    remove_command_hook(hook)
+                    self.error(f"{type(error).__name__}: {error}")
+
+        reader_class.after_command = after_command
+        _command_hooks_installed = True
+
+
+def add_command_hook(hook: CommandHook) -> None:
+    """Call a function after every command the reader runs.
+
+    The hook is called with the reader and the command that just ran (its
+    event_name attribute is the command's name) before the screen is
+    redrawn.  Hooks run on every key press, so they should be quick.  A
+    hook that raises an exception is removed and its error is shown.
+
+    Args:
+        hook: Function accepting the reader and the command
+    """
+    _install_command_hooks()
+    if hook not in _command_hooks:
+        _command_hooks.append(hook)
+
+
+def remove_command_hook(hook: CommandHook) -> None:
+    """Stop calling a function added with add_command_hook."""
+    if hook in _command_hooks:
+        _command_hooks.remove(hook)
+
+
+def _install_input_hooks() -> None:
+    """Wrap the reader's prepare method to also call input hooks."""
+    global _input_hooks_installed
+    with _install_lock:
+        if _input_hooks_installed:
+            return
+        reader_class = type(_get_reader())
+        original_prepare = reader_class.prepare
+
+        def prepare(self: HistoricalReader) -> None:
+            for hook in _input_hooks.copy():  # A copy, since hooks can be removed
+                try:
+                    hook(self)
+                except Exception as error:  # noqa: BLE001 - a hook can't crash the REPL
+                    remove_input_hook(hook)
+                    self.error(f"{type(error).__name__}: {error}")
+            original_prepare(self)
+
+        reader_class.prepare = prepare
+        _input_hooks_installed = True
+
+
+def add_input_hook(hook: ReaderCallback) -> None:
+    """Call a function whenever the reader starts a new input.
+
+    The hook is called with the reader before it clears the buffer for the
+    new input, whether the last input was accepted or interrupted with
+    Ctrl+C.  A hook that raises an exception is removed and its error is
+    shown.
+
+    Args:
+        hook: Function accepting the reader
+    """
+    _install_input_hooks()
+    if hook not in _input_hooks:
+        _input_hooks.append(hook)
+
+
+def remove_input_hook(hook: ReaderCallback) -> None:
+    """Stop calling a function added with add_input_hook."""
+    if hook in _input_hooks:
+        _input_hooks.remove(hook)
@@ -0,0 +1,336 @@
+"""Utilities for finding which module to import a name from.
+
+The index maps module names and the public top-level names they define to
+the modules that provide them.  Building it means parsing every top-level
+module on sys.path, so it's built in a background thread and persisted to a
+cache file.  Each sys.path entry is stored with its modification time (and
+each module with its file's), so only changed modules are parsed again.
+"""
+
+from __future__ import annotations
+
+import ast
+import importlib
+import json
+import os
+import pkgutil
+import sys
+import threading
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any
+
+__all__ = [
+    "ImportIndex",
+    "default_cache_path",
+    "get_import_index",
+    "import_line",
+    "public_names",
+]
+
+CACHE_VERSION = 1
+MAX_SOURCE_SIZE = 1_000_000  # Don't parse enormous (probably generated) files
+
+
+def default_cache_path() -> Path:
+    """Return the file the import index is saved to."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "pyrepl-hacks" / "import-index.json"
+
+
+def _module_origin(info: pkgutil.ModuleInfo) -> str | None:
+    """Return the file a top-level module is loaded from (if it has one)."""
+    try:
+        spec = info.module_finder.find_spec(info.name, None)
+    except Exception:  # noqa: BLE001 - finders can run third-party code
+        return None
+    return None if spec is None else spec.origin
+
+
+def _static_all(node: ast.stmt) -> list[str] | None:
+    """Return the names in an ``__all__ = [...]`` assignment (if it is one)."""
+    if not isinstance(node, ast.Assign | ast.AugAssign | ast.AnnAssign):
+        return None
+    targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+    if not any(isinstance(t, ast.Name) and t.id == "__all__" for t in targets):
+        return None
+    if not isinstance(node.value, ast.List | ast.Tuple):
+        return None
+    return [
+        element.value
+        for element in node.value.elts
+        if isinstance(element, ast.Constant) and isinstance(element.value, str)
+    ]
+
+
+def _top_level_statements(body: list[ast.stmt]) -> Iterator[ast.stmt]:
+    """Yield module-level statements, including those in if/try blocks."""
+    for node in body:
+        if isinstance(node, ast.If | ast.Try):
+            yield from _top_level_statements(node.body + node.orelse)
+        else:
+            yield node
+
+
+def _star_import_source(node: ast.stmt, package: Path | None) -> Path | None:
+    """Return the file a ``from .module import *`` statement imports from."""
+    if (
+        package is None
+        or not isinstance(node, ast.ImportFrom)
+        or node.level != 1
+        or node.module is None
+        or [alias.name for alias in node.names] != ["*"]
+    ):
+        return None
+    for path in [package / f"{node.module}.py", package / node.module / "__init__.py"]:
+        if path.is_file():
+            return path
+    return None
+
+
+def public_names(source: str, package: Path | None = None) -> list[str]:
+    """Return the public names defined at the top level of a module's source.
+
+    The module's ``__all__`` is used if it's a literal list or tuple.
+    Otherwise public functions, classes, and assigned names are used, along
+    with the names star-imported from sibling modules in the package
+    directory (if one is given).
+
+    Examples:
+        >>> public_names("import os\\ndef f(): pass\\nclass _C: pass\\nX = 1")
+        ['X', 'f']
+        >>> public_names("from ._impl import *\\n__all__ = ['g']")
+        ['g']
+    """
+    names: set[str] = set()
+    exported: list[str] | None = None
+    for node in _top_level_statements(ast.parse(source).body):
+        if (static_all := _static_all(node)) is not None:
+            exported = (exported or []) + static_all
+        elif isinstance(node, ast.FunctionDef | ast.AsyncFunctionDef | ast.ClassDef):
+            names.add(node.name)
+        elif isinstance(node, ast.Assign):
+            names.update(t.id for t in node.targets if isinstance(t, ast.Name))
+        elif isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+            names.add(node.target.id)
+        elif (path := _star_import_source(node, package)) is not None:
+            names.update(public_names(path.read_text(encoding="utf-8")))
+    if exported is not None:
+        names = set(exported)
+    return sorted(name for name in names if not name.startswith("_"))
+
+
+def _mtime(path: str | Path) -> float | None:
+    """Return a file's modification time (or None if it doesn't exist)."""
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def _module_names(name: str, origin: str | None) -> list[str]:
+    """Return the public names defined by a top-level module.
+
+    Python modules are parsed (not imported).  Standard library extension
+    modules have no source to parse, so they're imported instead.
+    """
+    if origin is None:
+        return []
+    try:
+        if origin.endswith(".py"):
+            if os.path.getsize(origin) > MAX_SOURCE_SIZE:
+                return []
+            path = Path(origin)
+            package = path.parent if path.name == "__init__.py" else None
+            return public_names(path.read_text(encoding="utf-8"), package)
+        if name in sys.stdlib_module_names:
+            return _imported_names(name)
+    except Exception:  # noqa: BLE001 - a broken module is left out of the index
+        return []
+    return []
+
+
+def _imported_names(name: str) -> list[str]:
+    """Return the public names of a module by importing it."""
+    module = importlib.import_module(name)
+    names = getattr(module, "__all__", None) or vars(module)
+    return sorted(name for name in names if not name.startswith("_"))
+
+
+def _scan_entry(entry: str, old: dict[str, Any] | None) -> dict[str, Any]:
+    """Index the top-level modules in one sys.path directory.
+
+    Modules whose files haven't changed since the old record are reused.
+    """
+    old_modules = old["modules"] if old else {}
+    modules: dict[str, Any] = {}
+    for info in pkgutil.iter_modules([entry]):
+        name = info.name
+        if name.startswith("_") or not name.isidentifier():
+            continue
+        origin = _module_origin(info)
+        mtime = None if origin is None else _mtime(origin)
+        previous = old_modules.get(name)
+        if previous is not None and previous["mtime"] == mtime:
+            modules[name] = previous
+        else:
+            modules[name] = {"mtime": mtime, "names": _module_names(name, origin)}
+    return {"mtime": _mtime(entry), "modules": modules}
+
+
+def _valid_record(record: Any) -> bool:
+    """Return whether a cached record of a sys.path entry is well formed."""
+    if not isinstance(record, dict) or "mtime" not in record:
+        return False
+    modules = record.get("modules")
+    return isinstance(modules, dict) and all(
+        isinstance(module, dict)
+        and "mtime" in module
+        and isinstance(module.get("names"), list)
+        and all(isinstance(name, str) for name in module["names"])
+        for module in modules.values()
+    )
+
+
+class ImportIndex:
+    """An index of the modules that importable names can be imported from.
+
+    Attributes:
+        ready: Set once the index has been built (or loaded and updated)
+    """
+
+    def __init__(
+        self,
+        paths: Iterable[str] | None = None,
+        cache_path: Path | None = None,
+    ) -> None:
+        self.paths = list(sys.path if paths is None else paths)
+        self.cache_path = default_cache_path() if cache_path is None else cache_path
+        self.ready = threading.Event()
+        self._names: dict[str, list[str]] = {}
+        self._lock = threading.Lock()
+        self._building = False
+
+    def build(self) -> None:
+        """Build the index, reusing (and then updating) the cache file."""
+        cached = self._load_cache()
+        entries = {}
+        for entry in dict.fromkeys(os.path.abspath(path or ".") for path in self.paths):
+            if not os.path.isdir(entry):
+                continue
+            old = cached.get(entry)
+            if old is not None and old["mtime"] == _mtime(entry):
+                entries[entry] = old
+            else:
+                entries[entry] = _scan_entry(entry, old)
+        self._names = self._invert(entries)
+        if any(cached.get(entry) is not record for entry, record in entries.items()):
+            self._save_cache({**cached, **entries})
+        self.ready.set()
+
+    def build_in_background(self) -> None:
+        """Build the index in a daemon thread (if it isn't built already)."""
+        with self._lock:
+            if self._building or self.ready.is_set():
+                return
+            self._building = True
+        threading.Thread(
+            target=self._build_and_reset,
+            name="import index",
+            daemon=True,
+        ).start()
+
+    def _build_and_reset(self) -> None:
+        """Build the index, allowing another build if this one fails."""
+        try:
+            self.build()
+        finally:
+            with self._lock:
+                self._building = False
+
+    @staticmethod
+    def _invert(entries: dict[str, Any]) -> dict[str, list[str]]:
+        """Map each name to the modules providing it (earlier entries first)."""
+        names: dict[str, list[str]] = {}
+        for module_name in sys.builtin_module_names:
+            if not module_name.startswith("_"):
+                for name in [module_name, *_imported_names(module_name)]:
+                    names.setdefault(name, []).append(module_name)
+        for record in entries.values():
+            for module_name, module in record["modules"].items():
+                names.setdefault(module_name, []).append(module_name)
+                for name in module["names"]:
+                    names.setdefault(name, []).append(module_name)
+        return names
+
+    def _load_cache(self) -> dict[str, Any]:
+        """Return the per-entry records saved in the cache file.
+
+        A missing or malformed cache file is treated as an empty cache.
+        """
+        try:
+            data = json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+            return {}
+        entries = data.get("entries", {})
+        if not isinstance(entries, dict) or not all(
+            _valid_record(record) for record in entries.values()
+        ):
+            return {}
+        return entries
+
+    def _save_cache(self, entries: dict[str, Any]) -> None:
+        """Save per-entry records to the cache file (replacing it atomically)."""
+        data = {"version": CACHE_VERSION, "entries": entries}
+        temporary = self.cache_path.with_suffix(".tmp")
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            temporary.write_text(json.dumps(data), encoding="utf-8")
+            temporary.replace(self.cache_path)
+        except OSError:
+            pass
+
+    def modules_for(self, name: str) -> list[str]:
+        """Return the modules a name can be imported from, best match first.
+
+        A module with the same name comes first, then modules whose names
+        contain the name (like pathlib for Path), then standard library
+        modules, then other modules (shorter module names first).
+        """
+        modules = dict.fromkeys(self._names.get(name, []))
+        lowered = name.lower()
+        return sorted(
+            modules,
+            key=lambda module: (
+                module != name,
+                lowered not in module,
+                module not in sys.stdlib_module_names,
+                len(module),
+            ),
+        )
+
+
+def import_line(name: str, module: str) -> str:
+    """Return the line that imports a name from a module.
+
+    Examples:
+        >>> import_line("defaultdict", "collections")
+        'from collections import defaultdict'
+        >>> import_line("json", "json")
+        'import json'
+    """
+    return f"import {name}" if name == module else f"from {module} import {name}"
+
+
+_index: ImportIndex | None = None
+
+
+def get_import_index() -> ImportIndex:
+    """Return the import index, starting to build it on first use."""
+    global _index
+    if _index is None:
+        _index = ImportIndex()
+    _index.build_in_background()
+    return _index
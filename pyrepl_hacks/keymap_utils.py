@@ -0,0 +1,247 @@
+"""Utilities for loading key bindings from a file (and reloading them).
+
+A bindings file is a TOML file with up to three tables:
+
+    [bind]
+    "Alt+M" = "move-to-indentation"
+    "Shift+Tab" = "dedent"
+
+    [insert]
+    "Ctrl+N" = "[2, 1, 3, 4, 7, 11, 18, 29]"
+
+    [snippet]
+    "Ctrl+X Ctrl+R" = 'subprocess.run("$1", shell=True)$0'
+
+The [bind] table binds keys to commands (like bind), the [insert] table
+binds keys to insert text (like bind_to_insert), and the [snippet] table
+binds keys to insert snippets (like bind_snippet).
+
+When the file changes, only the bindings that were added, removed, or
+changed are applied: they're diffed against the bindings loaded before,
+and the reader's new keymap and key translator are swapped in together on
+the reader's thread.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import tomllib
+from _pyrepl.input import KeymapTranslator
+from _pyrepl.simple_interact import _get_reader
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from ._types import CommandName, HistoricalReader, KeySpec
+from .command_utils import register_command
+from .hook_utils import call_soon
+from .key_utils import slugify, to_keyspec
+from .snippet_utils import insert_snippet
+
+__all__ = ["BindingsFile", "load_bindings", "read_bindings"]
+
+TEXT_TABLES = ("insert", "snippet")
+
+
+class Bindings(NamedTuple):
+    """The bindings in a bindings file.
+
+    Attributes:
+        keys: The command each key is bound to
+        texts: The kind ("insert" or "snippet") and text of each command
+               that inserts text
+    """
+
+    keys: dict[KeySpec, CommandName]
+    texts: dict[CommandName, tuple[str, str]]
+
+
+def read_bindings(path: str | Path) -> Bindings:
+    """Read the key bindings in a TOML bindings file.
+
+    Raises:
+        OSError: If the file can't be read
+        tomllib.TOMLDecodeError: If the file isn't valid TOML
+        ValueError: If the file has an unknown table or an invalid key
+        TypeError: If a binding isn't a string
+    """
+    with Path(path).expanduser().open("rb") as bindings_file:
+        config: dict[str, Any] = tomllib.load(bindings_file)
+    keys: dict[KeySpec, CommandName] = {}
+    texts: dict[CommandName, tuple[str, str]] = {}
+    for table, entries in config.items():
+        if table != "bind" and table not in TEXT_TABLES:
+            raise ValueError(f"Unknown bindings table: [{table}]")
+        for keybinding, value in entries.items():
+            if not isinstance(value, str):
+                raise TypeError(f"Binding for {keybinding} must be a string")
+            if table == "bind":
+                keys[to_keyspec(keybinding)] = value
+            else:
+                name = slugify(keybinding)
+                keys[to_keyspec(keybinding)] = name
+                texts[name] = (table, value)
+    return Bindings(keys, texts)
+
+
+def _register_text_command(name: CommandName, kind: str, text: str) -> None:
+    """Register a command that inserts text (or a snippet)."""
+
+    def command_function(reader: HistoricalReader) -> None:
+        if kind == "snippet":
+            insert_snippet(reader, text)
+        else:
+            reader.insert(text)
+
+    command_function.__name__ = name
+    command_function.__doc__ = f"Insert {text!r}."
+    register_command(name)(command_function)  # type: ignore[arg-type]
+
+
+class BindingsFile:
+    """Key bindings loaded from a file, which can be watched for changes.
+
+    Args:
+        path: Path to the TOML bindings file
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path).expanduser()
+        self.bindings = Bindings({}, {})
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def apply(self, reader: HistoricalReader, bindings: Bindings) -> tuple[int, int]:
+        """Replace the bindings applied before with new bindings.
+
+        Every binding is checked before anything changes.  Only commands
+        for new or changed insert and snippet bindings are registered.  The
+        new keymap is computed from the reader's current
+        keymap by removing the bindings that went away and adding the new
+        ones, then the keymap and its translator are swapped in together.
+
+        Must be called on the reader's thread (see call_soon).
+
+        Returns:
+            The number of bindings added (or changed) and removed
+
+        Raises:
+            ValueError: If a binding refers to an unknown command
+        """
+        old = self.bindings
+        known = set(reader.commands) | set(bindings.texts)
+        unknown = sorted(set(bindings.keys.values()) - known)
+        if unknown:
+            raise ValueError(f"Unknown commands: {', '.join(unknown)}")
+        for name, (kind, text) in bindings.texts.items():
+            if old.texts.get(name) != (kind, text):
+                _register_text_command(name, kind, text)
+
+        removed = [
+            (spec, command)
+            for spec, command in old.keys.items()
+            if bindings.keys.get(spec) != command
+        ]
+        added = [
+            (spec, command)
+            for spec, command in bindings.keys.items()
+            if old.keys.get(spec) != command
+        ]
+        if removed or added:
+            keymap = list(reader.keymap)
+            for entry in removed:
+                # Remove only the latest entry for the key, so a binding it
+                # overrode (like a default binding) applies again
+                for index in range(len(keymap) - 1, -1, -1):
+                    if keymap[index] == entry:
+                        del keymap[index]
+                        break
+            keymap += added
+            translator = KeymapTranslator(
+                tuple(keymap),
+                invalid_cls="invalid-key",
+                character_cls="self-insert",
+            )
+            reader.keymap = tuple(keymap)
+            if reader.input_trans_stack:  # Incremental search (or a picker) is active
+                reader.input_trans_stack[0] = translator
+            else:
+                reader.input_trans = translator
+        self.bindings = bindings
+        return len(added), len(removed)
+
+    def reload(self, reader: HistoricalReader) -> None:
+        """Read the file again and apply the changes (on the reader's thread)."""
+        added, removed = self.apply(reader, read_bindings(self.path))
+        if added or removed:
+            reader.msg = f"{self.path.name}: {added} bindings added, {removed} removed"
+            reader.dirty = True
+
+    def _signature(self) -> tuple[int, int] | None:
+        """Return the file's modification time and size (None if missing)."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _poll(self, interval: float, signature: tuple[int, int] | None) -> None:
+        while not self._stop.wait(interval):
+            if (current := self._signature()) != signature:
+                signature = current
+                if current is not None:
+                    call_soon(self.reload)
+
+    def watch(self, interval: float = 1.0) -> None:
+        """Reload the bindings whenever the file changes.
+
+        A daemon thread checks the file's modification time every interval
+        seconds.  Errors in the changed file are shown under the prompt and
+        the bindings loaded before stay active.
+
+        Args:
+            interval: Seconds between checks
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._poll,
+            args=(interval, self._signature()),
+            name=f"watch {self.path.name}",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop watching the file for changes."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def load_bindings(
+    path: str | Path,
+    watch: bool = False,
+    interval: float = 1.0,
+) -> BindingsFile:
+    """Apply the key bindings in a TOML bindings file.
+
+    Args:
+        path: Path to the TOML bindings file
+        watch: Whether to reload the bindings whenever the file changes
+        interval: Seconds between checks for changes (if watching)
+
+    Returns:
+        The loaded bindings file (call its stop method to stop watching)
+
+    Raises:
+        ValueError: If the file has an invalid table, key, or command name
+        TypeError: If a binding isn't a string
+    """
+    bindings_file = BindingsFile(path)
+    bindings_file.apply(_get_reader(), read_bindings(bindings_file.path))
+    if watch:
+        bindings_file.watch(interval)
+    return bindings_file
@@ -0,0 +1,176 @@
+"""Utilities for a bounded kill ring.
+
+The reader's kill ring (used by kill-line, kill-word, yank, yank-pop, and
+friends) is a plain list that keeps every kill forever, each as a list of
+one-character strings.  The kill ring here is a drop-in replacement that
+stores kills as strings (compressing big ones), doesn't store the same text
+twice, and evicts the oldest kills once they use more than a memory budget.
+"""
+
+from __future__ import annotations
+
+import sys
+import zlib
+from _pyrepl.simple_interact import _get_reader
+from collections import deque
+from collections.abc import Iterable, MutableSequence
+from typing import NamedTuple, overload
+
+__all__ = ["KillRing", "disable_kill_ring", "enable_kill_ring"]
+
+COMPRESS_THRESHOLD = 64 * 1024  # Compress kills bigger than this (bytes)
+
+
+class _Kill(NamedTuple):
+    """A stored kill (compressed if it's big)."""
+
+    data: str | bytes
+    length: int
+    hash: int
+    size: int  # Bytes used by data
+
+    @classmethod
+    def from_text(cls, text: str) -> _Kill:
+        data: str | bytes = text
+        if sys.getsizeof(text) > COMPRESS_THRESHOLD:
+            data = zlib.compress(text.encode("utf-8", "surrogatepass"), 1)
+        return cls(data, len(text), hash(text), sys.getsizeof(data))
+
+    @property
+    def text(self) -> str:
+        if isinstance(self.data, bytes):
+            return zlib.decompress(self.data).decode("utf-8", "surrogatepass")
+        return self.data
+
+
+class KillRing(MutableSequence[list[str]]):
+    """A kill ring with a memory budget, usable as the reader's kill_ring.
+
+    Items are lists of characters (as the reader's commands expect), but
+    each kill is stored as a string in a deque.  Killing text that's
+    already in the ring moves it to the newest position instead of storing
+    it again.  The oldest kills are evicted when there are more than
+    max_entries kills or they use more than max_bytes of memory (the newest
+    kill is always kept).
+
+    Args:
+        kills: Initial kills, oldest first
+        max_bytes: Memory budget for the stored kills
+        max_entries: Maximum number of kills to keep
+    """
+
+    def __init__(
+        self,
+        kills: Iterable[Iterable[str]] = (),
+        max_bytes: int = 1024 * 1024,
+        max_entries: int = 60,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._kills: deque[_Kill] = deque()
+        self._size = 0
+        for kill in kills:
+            self.append(list(kill))
+
+    @property
+    def size(self) -> int:
+        """Return the bytes used by the stored kills."""
+        return self._size
+
+    def resize(self, max_bytes: int, max_entries: int) -> None:
+        """Change the ring's limits, evicting the oldest kills past them."""
+        self.max_bytes, self.max_entries = max_bytes, max_entries
+        self._evict()
+
+    def texts(self) -> list[str]:
+        """Return the killed texts, newest first."""
+        return [kill.text for kill in reversed(self._kills)]
+
+    def __len__(self) -> int:
+        return len(self._kills)
+
+    @overload
+    def __getitem__(self, index: int) -> list[str]: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[list[str]]: ...
+
+    def __getitem__(self, index: int | slice) -> list[str] | list[list[str]]:
+        if isinstance(index, slice):
+            return [list(kill.text) for kill in list(self._kills)[index]]
+        return list(self._kills[index].text)
+
+    @overload
+    def __setitem__(self, index: int, value: Iterable[str]) -> None: ...
+
+    @overload
+    def __setitem__(self, index: slice, value: Iterable[Iterable[str]]) -> None: ...
+
+    def __setitem__(
+        self,
+        index: int | slice,
+        value: Iterable[str] | Iterable[Iterable[str]],
+    ) -> None:
+        if isinstance(index, slice):
+            raise TypeError("KillRing doesn't support slice assignment")
+        kill = _Kill.from_text("".join(value))  # type: ignore[arg-type]
+        self._size += kill.size - self._kills[index].size
+        self._kills[index] = kill
+        self._evict()
+
+    def __delitem__(self, index: int | slice) -> None:
+        if isinstance(index, slice):
+            raise TypeError("KillRing doesn't support slice deletion")
+        self._size -= self._kills[index].size
+        del self._kills[index]
+
+    def insert(self, index: int, value: Iterable[str]) -> None:
+        """Insert a kill (moving it if the same text is already stored)."""
+        text = "".join(value)
+        key = (hash(text), len(text))
+        if index < 0:
+            index = max(0, index + len(self._kills))
+        for position, other in enumerate(self._kills):
+            if (other.hash, other.length) == key and other.text == text:
+                kill = other  # Reuse the stored (maybe compressed) copy
+                del self[position]
+                index -= position < index
+                break
+        else:
+            kill = _Kill.from_text(text)
+        self._kills.insert(index, kill)
+        self._size += kill.size
+        self._evict()
+
+    def _evict(self) -> None:
+        """Drop the oldest kills until the ring is within its budget."""
+        while len(self._kills) > 1 and (
+            len(self._kills) > self.max_entries or self._size > self.max_bytes
+        ):
+            self._size -= self._kills.popleft().size
+
+
+def enable_kill_ring(max_bytes: int = 1024 * 1024, max_entries: int = 60) -> None:
+    """Replace the reader's kill ring with a bounded one.
+
+    Kills (from kill-line, kill-word, and the other kill commands) are
+    stored as strings, repeated kills of the same text are stored once, and
+    the oldest kills are evicted once they use more than max_bytes.
+
+    Args:
+        max_bytes: Memory budget for the kill ring
+        max_entries: Maximum number of kills to keep
+    """
+    reader = _get_reader()
+    kills = reader.kill_ring
+    if isinstance(kills, KillRing):
+        kills.resize(max_bytes, max_entries)
+    else:
+        reader.kill_ring = KillRing(kills, max_bytes, max_entries)
+
+
+def disable_kill_ring() -> None:
+    """Go back to the reader's standard (unbounded) kill ring."""
+    reader = _get_reader()
+    if isinstance(reader.kill_ring, KillRing):
+        reader.kill_ring = list(reader.kill_ring)
@@ -0,0 +1,226 @@
+"""Utilities for recording keyboard macros and replaying them.
+
+While a macro is being recorded, a command hook saves the name and event of
+every command the reader runs.  Replaying a macro runs the same commands
+directly (without waiting for key presses), so the screen is redrawn once
+after the whole macro instead of after every command, even when the macro
+is run many times in a row.  The screen layout is still recomputed after
+each command that changes it, since motions like up and down use it.
+
+Macros can be given names, which registers each as a command (so it can be
+bound to a key with bind), and named macros can be saved to a JSON file and
+loaded again later.
+"""
+
+from __future__ import annotations
+
+import json
+from _pyrepl.commands import invalid_command
+from _pyrepl.simple_interact import _get_reader
+from pathlib import Path
+from typing import NamedTuple
+
+from ._types import Command, CommandName, HistoricalReader
+from .hook_utils import add_command_hook
+
+__all__ = [
+    "Macro",
+    "MacroCommand",
+    "load_macros",
+    "name_last_macro",
+    "save_macros",
+    "start_recording",
+    "stop_recording",
+]
+
+LAST_MACRO = "call-macro"
+
+# Commands that control recording (and so are never recorded)
+_CONTROL_COMMANDS = {"start-macro", "end-macro", LAST_MACRO}
+
+# Steps recorded so far for each recording reader (keyed by id)
+_recordings: dict[int, list[tuple[CommandName | type[Command], str]]] = {}
+
+# Readers replaying a macro (whose commands aren't recorded again)
+_replaying: set[int] = set()
+
+# Macros by the name of the command that runs them
+_macros: dict[CommandName, Macro] = {}
+
+
+class Macro(NamedTuple):
+    """A recorded sequence of commands.
+
+    Attributes:
+        steps: The name (or class, for unnamed commands like those used by
+               pickers) and event characters of each command
+    """
+
+    steps: tuple[tuple[CommandName | type[Command], str], ...]
+
+    def unknown_commands(self, reader: HistoricalReader) -> list[CommandName]:
+        """Return the names of steps that aren't commands of the reader."""
+        return sorted(
+            {
+                name
+                for name, _ in self.steps
+                if isinstance(name, str) and name not in reader.commands
+            },
+        )
+
+    def run(self, reader: HistoricalReader, times: int = 1) -> bool:
+        """Run the macro's commands (without redrawing in between).
+
+        Args:
+            reader: The reader to run the commands in
+            times: How many times to run the whole macro
+
+        Returns:
+            True if a command finished the input (so the rest were skipped)
+        """
+        _replaying.add(id(reader))
+        try:
+            for _ in range(times):
+                for event_name, event in self.steps:
+                    if isinstance(event_name, str):
+                        command_type = reader.commands.get(event_name, invalid_command)
+                    else:
+                        command_type = event_name
+                    command = command_type(reader, event_name, list(event))
+                    command.do()
+                    reader.after_command(command)
+                    if reader.dirty:  # Lay out the screen without drawing it
+                        reader.screen = reader.calc_screen()
+                    reader.last_command = command_type
+                    if command.finish:
+                        return True
+        finally:
+            _replaying.discard(id(reader))
+        return False
+
+
+class MacroCommand(Command):  # type: ignore[misc]
+    """Run a macro (as many times as the numeric argument says)."""
+
+    macro_name: CommandName = LAST_MACRO
+
+    def do(self) -> None:
+        reader = self.reader
+        if self.macro_name == LAST_MACRO and id(reader) in _recordings:
+            reader.error("can't call the last macro while recording")
+            return
+        macro = _macros.get(self.macro_name)
+        if macro is None:
+            reader.error("no macro recorded")
+            return
+        if unknown := macro.unknown_commands(reader):
+            reader.error(f"unknown commands in macro: {', '.join(unknown)}")
+            return
+        times = reader.get_arg()
+        reader.arg = None  # The argument is for the macro, not its first command
+        try:
+            self.finish = macro.run(reader, times)
+        except Exception as error:  # noqa: BLE001 - report it, don't crash the REPL
+            reader.error(f"macro failed: {type(error).__name__}: {error}")
+
+
+def _register_macro(reader: HistoricalReader, name: CommandName, macro: Macro) -> None:
+    """Store a macro and register a command that runs it."""
+    _macros[name] = macro
+    if name != LAST_MACRO:
+        reader.commands[name] = type(
+            name,
+            (MacroCommand,),
+            {"macro_name": name, "__doc__": f"Run the {name} keyboard macro."},
+        )
+
+
+def _record(reader: HistoricalReader, command: Command) -> None:
+    """Record a command that just ran (if the reader is recording)."""
+    steps = _recordings.get(id(reader))
+    if (
+        steps is None
+        or id(reader) in _replaying
+        or command.event_name in _CONTROL_COMMANDS
+    ):
+        return
+    steps.append((command.event_name, "".join(command.event)))
+
+
+def start_recording(reader: HistoricalReader) -> None:
+    """Start recording commands (throwing away any unfinished recording)."""
+    add_command_hook(_record)
+    _recordings[id(reader)] = []
+
+
+def stop_recording(reader: HistoricalReader) -> Macro | None:
+    """Stop recording and make the recording the last macro.
+
+    Returns:
+        The recorded macro (None if the reader wasn't recording)
+    """
+    steps = _recordings.pop(id(reader), None)
+    if steps is None:
+        return None
+    macro = Macro(tuple(steps))
+    _macros[LAST_MACRO] = macro
+    return macro
+
+
+def name_last_macro(name: CommandName) -> None:
+    """Register the last recorded macro as a command (to bind it to a key).
+
+    Raises:
+        ValueError: If no macro has been recorded or the name is taken by a
+                    command that doesn't run a macro
+    """
+    reader = _get_reader()
+    if LAST_MACRO not in _macros:
+        raise ValueError("No macro has been recorded")
+    existing = reader.commands.get(name)
+    if existing is not None and not issubclass(existing, MacroCommand):
+        raise ValueError(f"{name} is already a command")
+    _register_macro(reader, name, _macros[LAST_MACRO])
+
+
+def save_macros(path: str | Path) -> None:
+    """Save the named macros to a JSON file.
+
+    Raises:
+        ValueError: If a macro uses a command that has no name (like the
+                    keys used inside a picker)
+    """
+    data = {}
+    for name, macro in _macros.items():
+        if name == LAST_MACRO:
+            continue
+        if not all(isinstance(event_name, str) for event_name, _ in macro.steps):
+            raise ValueError(f"Macro {name} uses commands that can't be saved")
+        data[name] = [list(step) for step in macro.steps]
+    Path(path).expanduser().write_text(json.dumps(data, indent=2) + "\n")
+
+
+def load_macros(path: str | Path) -> None:
+    """Load macros saved with save_macros (registering each as a command).
+
+    Raises:
+        OSError: If the file can't be read
+        ValueError: If a macro in the file isn't a list of [command, event] pairs
+        TypeError: If the file doesn't contain a JSON object
+    """
+    data = json.loads(Path(path).expanduser().read_text())
+    if not isinstance(data, dict):
+        raise TypeError("Macros file must contain a JSON object")
+    macros = {}
+    for name, steps in data.items():
+        if not isinstance(steps, list) or not all(
+            isinstance(step, list)
+            and len(step) == 2
+            and all(isinstance(part, str) for part in step)
+            for step in steps
+        ):
+            raise ValueError(f"Macro {name} must be a list of [command, event] pairs")
+        macros[name] = Macro(tuple((command, event) for command, event in steps))
+    reader = _get_reader()
+    for name, macro in macros.items():
+        _register_macro(reader, name, macro)
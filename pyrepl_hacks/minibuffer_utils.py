@@ -0,0 +1,199 @@
+"""Utilities for interactive pickers shown under the input.
+
+A picker takes over the keyboard (like incremental history search does):
+typed characters edit its query, Up/Down (or Ctrl+P/Ctrl+N) move the
+selection, Enter picks the selected item, and Ctrl+G or Escape cancels.
+The query and the matching items are shown in the message area under the
+input, and the input itself is left alone.  Ctrl+C interrupts the input
+without running a command, so a picker left open that way is closed when
+the next input starts.
+"""
+
+from __future__ import annotations
+
+from _pyrepl.input import KeymapTranslator
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from typing import Any
+
+from ._types import Command, HistoricalReader
+from .hook_utils import add_input_hook
+
+__all__ = ["Picker", "open_picker"]
+
+# The picker each reader has open (keyed by id, since readers use slots)
+_pickers: dict[int, Picker] = {}
+
+
+class Picker:
+    """An incremental picker over items found by a search function.
+
+    Args:
+        prompt: Text shown before the query
+        search: Returns the (label, value) pairs matching a query
+        on_pick: Called with the reader and the picked value.  It may
+                 return the command it ran (so accept-like commands can
+                 finish the input)
+        height: Maximum number of items to show at once
+    """
+
+    def __init__(
+        self,
+        prompt: str,
+        search: Callable[[str], list[tuple[str, Any]]],
+        on_pick: Callable[[HistoricalReader, Any], Command | None],
+        height: int = 10,
+    ) -> None:
+        self.prompt = prompt
+        self.search = search
+        self.on_pick = on_pick
+        self.height = height
+        self.query = ""
+        self.selected = 0
+        self.items = search("")
+
+    def set_query(self, query: str) -> None:
+        """Change the query and search again."""
+        self.query = query
+        self.items = self.search(query)
+        self.selected = 0
+
+    def move(self, offset: int) -> None:
+        """Move the selection (wrapping around)."""
+        if self.items:
+            self.selected = (self.selected + offset) % len(self.items)
+
+    def render(self) -> str:
+        """Return the picker's text (for the message area)."""
+        lines = [f"{self.prompt}{self.query}"]
+        start = max(0, self.selected - self.height + 1)
+        for index, (label, _) in enumerate(
+            self.items[start : start + self.height],
+            start=start,
+        ):
+            marker = ">" if index == self.selected else " "
+            lines.append(f"{marker} {label}")
+        hidden = len(self.items) - min(len(self.items), self.height)
+        if not self.items:
+            lines.append("  (no matches)")
+        elif hidden:
+            lines.append(f"  ({hidden} more)")
+        return "\n".join(lines)
+
+
+def _show(reader: HistoricalReader, picker: Picker) -> None:
+    reader.msg = picker.render()
+    reader.dirty = True
+
+
+def _close(reader: HistoricalReader) -> Picker | None:
+    """Stop handling keys for the reader's picker."""
+    picker = _pickers.pop(id(reader), None)
+    if picker is not None:
+        reader.pop_input_trans()
+        reader.msg = ""
+        reader.dirty = True
+    return picker
+
+
+def _close_interrupted(reader: HistoricalReader) -> None:
+    """Close a picker left open when its input was interrupted."""
+    _close(reader)
+
+
+class _PickerCommand(Command, ABC):  # type: ignore[misc]
+    """A command that acts on the reader's open picker."""
+
+    def do(self) -> None:
+        picker = _pickers.get(id(self.reader))
+        if picker is None:  # Shouldn't happen, but never trap the keyboard
+            self.reader.pop_input_trans()
+            return
+        self.act(picker)
+
+    @abstractmethod
+    def act(self, picker: Picker) -> None:
+        """Act on the picker."""
+
+
+class picker_add_character(_PickerCommand):
+    def act(self, picker: Picker) -> None:
+        picker.set_query(picker.query + self.event[-1])
+        _show(self.reader, picker)
+
+
+class picker_backspace(_PickerCommand):
+    def act(self, picker: Picker) -> None:
+        picker.set_query(picker.query[:-1])
+        _show(self.reader, picker)
+
+
+class picker_previous(_PickerCommand):
+    def act(self, picker: Picker) -> None:
+        picker.move(-1)
+        _show(self.reader, picker)
+
+
+class picker_next(_PickerCommand):
+    def act(self, picker: Picker) -> None:
+        picker.move(1)
+        _show(self.reader, picker)
+
+
+class picker_accept(_PickerCommand):
+    def act(self, picker: Picker) -> None:
+        if not picker.items:
+            self.reader.error("no matches")
+            return
+        _close(self.reader)
+        _, value = picker.items[picker.selected]
+        command = picker.on_pick(self.reader, value)
+        if command is not None:
+            self.finish = command.finish
+
+
+class picker_cancel(_PickerCommand):
+    def act(self, picker: Picker) -> None:
+        _close(self.reader)
+
+
+PICKER_KEYMAP: tuple[tuple[str, type[Command]], ...] = (
+    *(
+        (char, picker_add_character)
+        for char in map(chr, range(32, 127))
+        if char != "\\"
+    ),
+    ("\\\\", picker_add_character),
+    ("\\<backspace>", picker_backspace),
+    ("\\<up>", picker_previous),
+    ("\\<down>", picker_next),
+    (r"\C-p", picker_previous),
+    (r"\C-n", picker_next),
+    ("\\<tab>", picker_next),
+    ("\\r", picker_accept),
+    ("\\n", picker_accept),
+    (r"\C-g", picker_cancel),
+    ("\\<escape>", picker_cancel),
+)
+
+_translator: KeymapTranslator | None = None
+
+
+def open_picker(reader: HistoricalReader, picker: Picker) -> None:
+    """Show a picker and send keys to it until something is picked.
+
+    Any key the picker doesn't handle closes it.
+    """
+    global _translator
+    if _translator is None:
+        _translator = KeymapTranslator(
+            PICKER_KEYMAP,
+            invalid_cls=picker_cancel,
+            character_cls=picker_add_character,
+        )
+    if id(reader) in _pickers:
+        _close(reader)
+    add_input_hook(_close_interrupted)
+    _pickers[id(reader)] = picker
+    reader.push_input_trans(_translator)
+    _show(reader, picker)
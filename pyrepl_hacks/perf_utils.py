@@ -0,0 +1,330 @@
+"""Utilities for profiling and timing code from the REPL."""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import pstats
+import statistics
+import sys
+import threading
+import time
+import timeit
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, NamedTuple
+
+__all__ = [
+    "StatementTiming",
+    "TimingCancelled",
+    "TimingResult",
+    "TimingTable",
+    "configure_profiler",
+    "disable_timings",
+    "enable_timings",
+    "profile_source",
+    "time_in_background",
+    "time_source",
+    "timings",
+]
+
+profiler_options: dict[str, Any] = {
+    "sort": "cumulative",
+    "limit": 30,
+    "save_path": None,
+}
+
+
+def configure_profiler(
+    *,
+    sort: str = "cumulative",
+    limit: int = 30,
+    save_path: str | Path | None = None,
+) -> None:
+    """Configure how the profile-last command profiles code.
+
+    Args:
+        sort: pstats sort key for the report (e.g. "cumulative", "tottime")
+        limit: Maximum number of functions to show in the report
+        save_path: File to save the raw profile data to for later analysis
+                   (with pstats or snakeviz), or None to not save it
+    """
+    profiler_options.update(sort=sort, limit=limit, save_path=save_path)
+
+
+def profile_source(
+    source: str,
+    namespace: dict[str, Any],
+    *,
+    sort: str = "cumulative",
+    limit: int = 30,
+    save_path: str | Path | None = None,
+) -> str:
+    """Execute source code under cProfile and return a report of the results.
+
+    Args:
+        source: Python code to execute
+        namespace: Globals to execute the code in
+        sort: pstats sort key for the report
+        limit: Maximum number of functions to show in the report
+        save_path: File to save the raw profile data to, if any
+
+    Returns:
+        The pstats report, sorted by the given key
+    """
+    code = compile(source, "<profile>", "exec")
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        exec(code, namespace)  # noqa: S102 - profiling the user's own code
+    finally:
+        profiler.disable()
+    if save_path is not None:
+        profiler.dump_stats(Path(save_path).expanduser())
+    report = io.StringIO()
+    stats = pstats.Stats(profiler, stream=report)
+    stats.sort_stats(sort).print_stats(limit)
+    return report.getvalue()
+
+
+class TimingCancelled(Exception):
+    """Raised when a timing run is cancelled."""
+
+
+class TimingResult(NamedTuple):
+    """Per-loop timing statistics from repeated timeit runs (in seconds)."""
+
+    loops: int
+    repeat: int
+    mean: float
+    stdev: float
+    best: float
+
+    def __str__(self) -> str:
+        return (
+            f"{format_time(self.mean)} ± {format_time(self.stdev)} per loop "
+            f"(mean ± std. dev. of {self.repeat} runs, {self.loops:,} loops each), "
+            f"best: {format_time(self.best)}"
+        )
+
+
+def format_time(seconds: float) -> str:
+    """Format a duration with an appropriate unit (like timeit's CLI does).
+
+    Examples:
+        >>> format_time(0.000_001_5)
+        '1.5 µs'
+        >>> format_time(2.25)
+        '2.25 s'
+    """
+    for unit, scale in [("s", 1.0), ("ms", 1e-3), ("µs", 1e-6)]:
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+def time_source(
+    source: str,
+    namespace: dict[str, Any],
+    *,
+    repeat: int = 5,
+    cancelled: threading.Event | None = None,
+) -> TimingResult:
+    """Time source code with timeit, picking the number of loops automatically.
+
+    The number of loops is chosen with Timer.autorange and then the timing
+    is repeated to compute statistics.
+
+    Args:
+        source: Python code to time
+        namespace: Globals to run the code in
+        repeat: Number of times to repeat the timing
+        cancelled: Event that stops the timing (between runs) when set
+
+    Returns:
+        Per-loop timing statistics
+
+    Raises:
+        TimingCancelled: If the cancelled event was set
+    """
+
+    def check_cancelled(*args: object) -> None:
+        if cancelled is not None and cancelled.is_set():
+            raise TimingCancelled
+
+    timer = timeit.Timer(source, globals=namespace)
+    loops, _ = timer.autorange(check_cancelled)
+    times = []
+    for _ in range(repeat):
+        check_cancelled()
+        times.append(timer.timeit(loops) / loops)
+    return TimingResult(
+        loops=loops,
+        repeat=repeat,
+        mean=statistics.fmean(times),
+        stdev=statistics.stdev(times) if repeat > 1 else 0.0,
+        best=min(times),
+    )
+
+
+def time_in_background(
+    source: str,
+    namespace: dict[str, Any],
+    callback: Callable[[TimingResult | Exception], None],
+    *,
+    repeat: int = 5,
+) -> threading.Event:
+    """Time source code in a background thread.
+
+    Args:
+        source: Python code to time
+        namespace: Globals to run the code in
+        callback: Called (from the background thread) with the TimingResult
+                  or with the exception that stopped the timing
+        repeat: Number of times to repeat the timing
+
+    Returns:
+        An event that cancels the timing when set
+    """
+    cancelled = threading.Event()
+
+    def run() -> None:
+        try:
+            result = time_source(source, namespace, repeat=repeat, cancelled=cancelled)
+        except Exception as error:  # noqa: BLE001 - passed to the callback to show
+            callback(error)
+        else:
+            callback(result)
+
+    threading.Thread(target=run, name="timeit", daemon=True).start()
+    return cancelled
+
+
+class StatementTiming(NamedTuple):
+    """Resources used while running one REPL input."""
+
+    source: str
+    wall: float
+    cpu: float
+    peak_memory: int | None
+
+    def summary(self) -> str:
+        """Return a short summary of the timing (for the prompt)."""
+        parts = [format_time(self.wall), f"cpu {format_time(self.cpu)}"]
+        if self.peak_memory is not None:
+            parts.append(format_size(self.peak_memory))
+        return ", ".join(parts)
+
+
+class TimingTable(list[StatementTiming]):
+    """The timings of every input run while timings were enabled."""
+
+    def __repr__(self) -> str:
+        rows = [("#", "wall", "cpu", "peak memory", "input")]
+        for number, timing in enumerate(self, start=1):
+            memory = timing.peak_memory
+            first_line, *rest = timing.source.strip().splitlines() or [""]
+            rows.append(
+                (
+                    str(number),
+                    format_time(timing.wall),
+                    format_time(timing.cpu),
+                    "-" if memory is None else format_size(memory),
+                    first_line[:40] + (" ..." if rest or len(first_line) > 40 else ""),
+                ),
+            )
+        widths = [max(len(row[column]) for row in rows) for column in range(4)]
+        lines = []
+        for *cells, source in rows:
+            columns = [
+                cell.rjust(width) for cell, width in zip(cells, widths, strict=True)
+            ]
+            lines.append("  ".join([*columns, source]))
+        return "\n".join(lines)
+
+
+def format_size(size: int) -> str:
+    """Format a number of bytes with an appropriate binary unit.
+
+    Examples:
+        >>> format_size(512)
+        '512 B'
+        >>> format_size(3 * 1024 * 1024)
+        '3 MiB'
+    """
+    amount = float(size)
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if amount < 1024 or unit == "GiB":
+            break
+        amount /= 1024
+    return f"{amount:.3g} {unit}"
+
+
+_timings = TimingTable()
+_original_runsource: Callable[..., bool] | None = None
+_original_ps1: object = None
+
+
+def timings() -> TimingTable:
+    """Return the timings of every input run while timings were enabled."""
+    return _timings
+
+
+def enable_timings(*, memory: bool = True, prompt: bool = True) -> None:
+    """Record the wall time, CPU time, and peak memory of each REPL input.
+
+    The timings are available from the timings function.  Nothing is
+    recorded (and nothing is slowed down) unless this has been called.
+
+    Args:
+        memory: Whether to trace peak memory use with tracemalloc (tracing
+                slows down memory-heavy code)
+        prompt: Whether to show the last input's timing in the prompt
+    """
+    from _pyrepl.console import InteractiveColoredConsole
+
+    global _original_runsource, _original_ps1
+    if _original_runsource is None:
+        _original_runsource = InteractiveColoredConsole.runsource
+        _original_ps1 = getattr(sys, "ps1", ">>> ")
+    original_runsource = _original_runsource
+
+    def runsource(
+        self: InteractiveColoredConsole,
+        source: str,
+        filename: str = "<input>",
+        symbol: str = "single",
+    ) -> bool:
+        tracing = memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        elif memory:
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            more = original_runsource(self, source, filename, symbol)
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            peak = tracemalloc.get_traced_memory()[1] if memory else None
+            if tracing:
+                tracemalloc.stop()
+        if not more:  # Incomplete input wasn't actually run
+            timing = StatementTiming(source, wall, cpu, peak)
+            _timings.append(timing)
+            if prompt:
+                sys.ps1 = f"[{timing.summary()}] {_original_ps1}"
+        return more
+
+    InteractiveColoredConsole.runsource = runsource
+
+
+def disable_timings() -> None:
+    """Stop recording timings (the recorded timings are kept)."""
+    global _original_runsource
+    if _original_runsource is not None:
+        from _pyrepl.console import InteractiveColoredConsole
+
+        InteractiveColoredConsole.runsource = _original_runsource
+        sys.ps1 = _original_ps1
+        _original_runsource = None
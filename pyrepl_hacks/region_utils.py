@@ -0,0 +1,285 @@
+"""Utilities for the mark and the region of lines between it and the cursor.
+
+The region covers every line from the line with the cursor to the line with
+the mark (a line where the region ends at column 0 isn't included).  With
+no mark set, the region is the cursor's line.
+
+The mark belongs to one input: it's dropped when the reader starts a new
+input, and it stays on its character when text before it is spliced (or
+typed or deleted at the cursor).
+
+Region edits read only the lines in the region, transform them in one
+pass, and write them back in one splice, so they cost the size of the
+region rather than the size of the buffer.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+
+from ._types import Command, HistoricalReader
+from .buffer_utils import line_end, line_start, splice
+from .hook_utils import add_command_hook, add_input_hook
+
+__all__ = [
+    "comment_lines",
+    "dedent_lines",
+    "duplicate_region",
+    "exchange_point_and_mark",
+    "get_mark",
+    "indent_lines",
+    "move_region",
+    "region_lines",
+    "set_mark",
+    "shift_mark",
+    "transform_region",
+]
+
+INDENT = "    "
+
+# The mark for each reader (keyed by id, since readers use slots) and the
+# length of the buffer when the mark was last set or shifted
+_marks: dict[int, tuple[int, int]] = {}
+
+
+def _clear_mark(reader: HistoricalReader) -> None:
+    """Drop the mark when the reader starts a new input."""
+    _marks.pop(id(reader), None)
+
+
+def _follow_edits(reader: HistoricalReader, command: Command) -> None:
+    """Shift the mark by a change to the buffer's length that wasn't spliced.
+
+    The reader's own commands insert text before the cursor and delete text
+    after it, so that's where the change is taken to be.
+    """
+    marked = _marks.get(id(reader))
+    if marked is None:
+        return
+    change = len(reader.buffer) - marked[1]
+    if change > 0:
+        shift_mark(reader, reader.pos - change, reader.pos - change, change)
+    elif change < 0:
+        shift_mark(reader, reader.pos, reader.pos - change, 0)
+
+
+def set_mark(reader: HistoricalReader, pos: int | None = None) -> None:
+    """Set the mark (at the cursor by default) for the current input."""
+    _marks[id(reader)] = (reader.pos if pos is None else pos, len(reader.buffer))
+    add_command_hook(_follow_edits)
+    add_input_hook(_clear_mark)
+
+
+def get_mark(reader: HistoricalReader) -> int | None:
+    """Return the mark (kept within the buffer), or None if it isn't set."""
+    marked = _marks.get(id(reader))
+    return None if marked is None else min(marked[0], len(reader.buffer))
+
+
+def shift_mark(reader: HistoricalReader, start: int, end: int, length: int) -> None:
+    """Keep the mark on its character after buffer[start:end] was replaced.
+
+    A mark inside the replaced range moves to its start.
+
+    Args:
+        reader: The edited reader
+        start: Start of the replaced range
+        end: End of the replaced range
+        length: Length of the text that replaced it
+    """
+    marked = _marks.get(id(reader))
+    if marked is None:
+        return
+    mark = marked[0]
+    if mark >= end and mark > start:
+        mark += length - (end - start)
+    elif mark > start:
+        mark = start
+    _marks[id(reader)] = (mark, len(reader.buffer))
+
+
+def exchange_point_and_mark(reader: HistoricalReader) -> bool:
+    """Swap the cursor and the mark.
+
+    Returns:
+        False if the mark isn't set
+    """
+    mark = get_mark(reader)
+    if mark is None:
+        return False
+    set_mark(reader)
+    reader.pos = mark
+    reader.dirty = True
+    return True
+
+
+def region_lines(reader: HistoricalReader) -> tuple[int, int]:
+    """Return the start and end of the lines in the region.
+
+    The end is the index of the newline after the last line (or the length
+    of the buffer).
+    """
+    mark = get_mark(reader)
+    low, high = sorted((reader.pos, reader.pos if mark is None else mark))
+    if high > low and reader.buffer[high - 1] == "\n":
+        high -= 1  # The region ends at the start of a line
+    return line_start(reader.buffer, low), line_end(reader.buffer, high)
+
+
+def _position(lines: list[str], offset: int) -> tuple[int, int]:
+    """Convert an offset into joined lines to a (row, column) pair."""
+    row = 0
+    while row < len(lines) - 1 and offset > len(lines[row]):
+        offset -= len(lines[row]) + 1
+        row += 1
+    return row, offset
+
+
+def _offset(lines: list[str], row: int, column: int) -> int:
+    """Convert a (row, column) pair to an offset into joined lines."""
+    return sum(len(line) + 1 for line in lines[:row]) + column
+
+
+def _set_positions(
+    reader: HistoricalReader,
+    start: int,
+    old: list[str],
+    new: list[str],
+    mark: int | None,
+    row_offset: int = 0,
+) -> None:
+    """Keep the cursor and mark on their lines after the region changed.
+
+    Must be called with the cursor and mark where they were before the
+    change.
+
+    Columns shift by the change in each line's length (so the cursor stays
+    on the same character when lines are indented or commented).
+    """
+    positions = [reader.pos] if mark is None else [reader.pos, mark]
+    for index, position in enumerate(positions):
+        row, column = _position(old, position - start)
+        new_row = min(row + row_offset, len(new) - 1)
+        column += len(new[new_row]) - len(old[row])
+        positions[index] = start + _offset(
+            new,
+            new_row,
+            max(0, min(column, len(new[new_row]))),
+        )
+    reader.pos = positions[0]
+    if mark is not None:
+        set_mark(reader, positions[1])
+
+
+def transform_region(
+    reader: HistoricalReader,
+    transform: Callable[[list[str]], list[str]],
+) -> None:
+    """Replace the region's lines with transformed lines (in one splice).
+
+    The transform must return as many lines as it's given.
+    """
+    start, end = region_lines(reader)
+    old = "".join(reader.buffer[start:end]).split("\n")
+    new = transform(old)
+    if new == old:
+        return
+    mark = get_mark(reader)
+    splice(reader, start, end, "\n".join(new), pos=reader.pos)
+    _set_positions(reader, start, old, new, mark)
+
+
+def move_region(reader: HistoricalReader, direction: int) -> bool:
+    """Move the region's lines up (-1) or down (1) past the adjacent line.
+
+    Returns:
+        False if there's no line to move past
+    """
+    start, end = region_lines(reader)
+    if direction < 0:
+        if start == 0:
+            return False
+        other_start, other_end = line_start(reader.buffer, start - 1), start - 1
+    else:
+        if end == len(reader.buffer):
+            return False
+        other_start, other_end = end + 1, line_end(reader.buffer, end + 1)
+    lines = "".join(reader.buffer[start:end]).split("\n")
+    other = "".join(reader.buffer[other_start:other_end])
+    mark = get_mark(reader)
+    if direction < 0:
+        old, new = [other, *lines], [*lines, other]
+        splice(reader, other_start, end, "\n".join(new), pos=reader.pos)
+        _set_positions(reader, other_start, old, new, mark, -1)
+    else:
+        old, new = [*lines, other], [other, *lines]
+        splice(reader, start, other_end, "\n".join(new), pos=reader.pos)
+        _set_positions(reader, start, old, new, mark, 1)
+    return True
+
+
+def duplicate_region(reader: HistoricalReader) -> None:
+    """Insert a copy of the region's lines below them (moving to the copy)."""
+    start, end = region_lines(reader)
+    lines = "".join(reader.buffer[start:end]).split("\n")
+    mark = get_mark(reader)
+    splice(reader, end, end, "\n" + "\n".join(lines), pos=reader.pos)
+    copies = [*lines, *lines]
+    _set_positions(reader, start, copies, copies, mark, len(lines))
+
+
+def indent_lines(lines: list[str], indent: str = INDENT) -> list[str]:
+    """Indent the non-blank lines.
+
+    Examples:
+        >>> indent_lines(["if x:", "", "    y"])
+        ['    if x:', '', '        y']
+    """
+    return [indent + line if line.strip() else line for line in lines]
+
+
+def dedent_lines(lines: list[str], indent: str = INDENT) -> list[str]:
+    """Remove up to one level of indentation from each line.
+
+    Examples:
+        >>> dedent_lines(["    if x:", "  y", "\\tz"])
+        ['if x:', 'y', 'z']
+    """
+    dedented = []
+    for line in lines:
+        if line.startswith("\t"):
+            line = line[1:]
+        else:
+            width = len(line) - len(line.lstrip(" "))
+            line = line[min(width, len(indent)) :]
+        dedented.append(line)
+    return dedented
+
+
+def comment_lines(lines: list[str]) -> list[str]:
+    """Comment out the non-blank lines, or uncomment them if all are comments.
+
+    Comments are added at the smallest indentation so they line up.
+
+    Examples:
+        >>> comment_lines(["if x:", "    y"])
+        ['# if x:', '#     y']
+        >>> comment_lines(["    # y", "    #z"])
+        ['    y', '    z']
+    """
+    code = [line for line in lines if line.strip()]
+    if not code:
+        return lines
+    if all(line.lstrip().startswith("#") for line in code):
+        uncommented = []
+        for line in lines:
+            indentation = line[: len(line) - len(line.lstrip())]
+            rest = line[len(indentation) :]
+            if rest.startswith("#"):
+                rest = rest[2:] if rest.startswith("# ") else rest[1:]
+            uncommented.append(indentation + rest)
+        return uncommented
+    width = min(len(line) - len(line.lstrip()) for line in code)
+    return [
+        line[:width] + "# " + line[width:] if line.strip() else line for line in lines
+    ]
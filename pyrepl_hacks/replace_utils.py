@@ -0,0 +1,234 @@
+"""Utilities for replacing regular expression matches in the input.
+
+Patterns are compiled once (the most recently used are kept in an LRU
+cache) and the matches in the input are found once per pattern and input,
+so stepping through the matches never searches again.  The buffer isn't
+changed while stepping: accepted replacements are collected and written
+into the buffer in one splice at the end.
+
+While stepping through matches, keys answer for the current match: y or
+Space replaces it, n or Backspace skips it, ! replaces it and every match
+after it, and q, Enter, or any other key stops (keeping the replacements
+accepted so far).  Ctrl+C interrupts the input without running a command,
+so stepping that was interrupted is abandoned when the next input starts.
+"""
+
+from __future__ import annotations
+
+import re
+from _pyrepl.input import KeymapTranslator
+from collections.abc import Sequence
+from functools import lru_cache
+
+from ._types import Command, HistoricalReader
+from .buffer_utils import get_text, splice
+from .hook_utils import add_input_hook
+
+__all__ = [
+    "QueryReplace",
+    "compile_pattern",
+    "find_matches",
+    "query_replace",
+    "replace_matches",
+]
+
+# The query-replace each reader is stepping through (keyed by id)
+_sessions: dict[int, QueryReplace] = {}
+
+
+@lru_cache(maxsize=64)
+def compile_pattern(pattern: str) -> re.Pattern[str]:
+    """Compile a regular expression (^ and $ match at every line).
+
+    Raises:
+        re.error: If the pattern is invalid
+    """
+    return re.compile(pattern, re.MULTILINE)
+
+
+@lru_cache(maxsize=8)
+def find_matches(
+    pattern: str,
+    text: str,
+    start: int = 0,
+    end: int | None = None,
+) -> tuple[re.Match[str], ...]:
+    """Find the matches of a pattern between two offsets of text.
+
+    Results are cached, so asking again for the same pattern and text
+    doesn't search again.
+
+    Raises:
+        re.error: If the pattern is invalid
+
+    Examples:
+        >>> [m.span() for m in find_matches(r"^\\w+", "ab = 1\\ncd = 2")]
+        [(0, 2), (7, 9)]
+    """
+    end = len(text) if end is None else end
+    return tuple(compile_pattern(pattern).finditer(text, start, end))
+
+
+def replace_matches(
+    reader: HistoricalReader,
+    matches: Sequence[re.Match[str]],
+    replacement: str,
+) -> None:
+    """Replace matches found in the reader's input in one splice.
+
+    The matches must be in order and from the reader's current input.  The
+    cursor moves to the end of the last replacement.
+
+    Args:
+        reader: The reader whose input the matches are from
+        matches: The matches to replace
+        replacement: Replacement template (as with re.sub, so \\1 and
+                     \\g<name> insert groups)
+
+    Raises:
+        re.error: If the replacement refers to a group that doesn't exist
+    """
+    if not matches:
+        return
+    start = position = matches[0].start()
+    pieces = []
+    for match in matches:
+        pieces += [match.string[position : match.start()], match.expand(replacement)]
+        position = match.end()
+    text = "".join(pieces)
+    splice(reader, start, position, text, pos=start + len(text))
+
+
+class QueryReplace:
+    """Matches being stepped through, asking whether to replace each one.
+
+    Args:
+        matches: The matches to step through (in order)
+        replacement: Replacement template for each match
+    """
+
+    def __init__(self, matches: Sequence[re.Match[str]], replacement: str) -> None:
+        self.matches = matches
+        self.replacement = replacement
+        self.index = 0
+        self.accepted: list[re.Match[str]] = []
+
+    @property
+    def done(self) -> bool:
+        """Return whether every match has been answered."""
+        return self.index >= len(self.matches)
+
+    def answer(self, replace: bool, rest: bool = False) -> None:
+        """Answer for the current match (or for it and every later match)."""
+        end = len(self.matches) if rest else self.index + 1
+        if replace:
+            self.accepted += self.matches[self.index : end]
+        self.index = end
+
+    def render(self) -> str:
+        """Return the question about the current match."""
+        match = self.matches[self.index]
+        return (
+            f"replace {match.group()!r} with {match.expand(self.replacement)!r}? "
+            f"(y, n, !, q) [{self.index + 1}/{len(self.matches)}]"
+        )
+
+
+def _show(reader: HistoricalReader, session: QueryReplace) -> None:
+    reader.pos = session.matches[session.index].start()
+    reader.msg = session.render()
+    reader.dirty = True
+
+
+def _finish(reader: HistoricalReader) -> None:
+    """Stop stepping and make the accepted replacements."""
+    session = _sessions.pop(id(reader), None)
+    reader.pop_input_trans()
+    if session is None:
+        return
+    if session.matches[0].string != get_text(reader):
+        reader.error("the input changed, so nothing was replaced")
+        return
+    replace_matches(reader, session.accepted, session.replacement)
+    reader.msg = f"replaced {len(session.accepted)} of {len(session.matches)} matches"
+    reader.dirty = True
+
+
+def _abandon_interrupted(reader: HistoricalReader) -> None:
+    """Stop stepping (without replacing) if the input was interrupted."""
+    if _sessions.pop(id(reader), None) is not None:
+        reader.pop_input_trans()
+
+
+class _QueryReplaceCommand(Command):  # type: ignore[misc]
+    """A command that answers for the current match."""
+
+    replace = False
+    rest = False
+
+    def do(self) -> None:
+        session = _sessions.get(id(self.reader))
+        if session is not None:
+            session.answer(self.replace, self.rest)
+        if session is None or session.done:
+            _finish(self.reader)
+        else:
+            _show(self.reader, session)
+
+
+class query_replace_yes(_QueryReplaceCommand):
+    replace = True
+
+
+class query_replace_no(_QueryReplaceCommand):
+    pass
+
+
+class query_replace_all(_QueryReplaceCommand):
+    replace = rest = True
+
+
+class query_replace_quit(_QueryReplaceCommand):
+    rest = True
+
+
+QUERY_REPLACE_KEYMAP: tuple[tuple[str, type[Command]], ...] = (
+    ("y", query_replace_yes),
+    (" ", query_replace_yes),
+    ("n", query_replace_no),
+    ("\\<backspace>", query_replace_no),
+    ("\\<delete>", query_replace_no),
+    ("!", query_replace_all),
+    ("q", query_replace_quit),
+    ("\\r", query_replace_quit),
+    ("\\n", query_replace_quit),
+)
+
+_translator: KeymapTranslator | None = None
+
+
+def query_replace(
+    reader: HistoricalReader,
+    matches: Sequence[re.Match[str]],
+    replacement: str,
+) -> None:
+    """Step through matches in the input, asking whether to replace each one.
+
+    Raises:
+        re.error: If the replacement refers to a group that doesn't exist
+    """
+    global _translator
+    if not matches:
+        return
+    matches[0].expand(replacement)  # Check the template before stepping
+    if _translator is None:
+        _translator = KeymapTranslator(
+            QUERY_REPLACE_KEYMAP,
+            invalid_cls=query_replace_quit,
+            character_cls=query_replace_quit,
+        )
+    add_input_hook(_abandon_interrupted)
+    if id(reader) not in _sessions:
+        reader.push_input_trans(_translator)
+    session = _sessions[id(reader)] = QueryReplace(matches, replacement)
+    _show(reader, session)
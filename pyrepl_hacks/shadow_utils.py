@@ -0,0 +1,232 @@
+"""Utilities for keeping a line-indexed copy of the reader's buffer.
+
+The reader's buffer is a list with one string per character, so getting
+its text means joining every character again, and finding a line means
+scanning for newlines.  With the shadow text enabled, the buffer is
+replaced by a list subclass that mirrors every edit into a ShadowText: the
+input kept as a list of lines with an index of where each line starts.
+
+Each edit to the buffer (whether made by the reader's commands or by the
+commands here, which edit the buffer with slice assignments) updates only
+the lines it touches.  The joined text is cached until the next edit, and
+finding the line containing an offset is a binary search.
+"""
+
+from __future__ import annotations
+
+from _pyrepl.simple_interact import _get_reader
+from bisect import bisect_right
+from collections.abc import Iterable
+from typing import Any, Self, SupportsIndex
+
+from ._types import HistoricalReader
+
+__all__ = [
+    "ShadowBuffer",
+    "ShadowText",
+    "disable_shadow_text",
+    "enable_shadow_text",
+    "get_shadow",
+]
+
+# Readers with the shadow text enabled (keyed by id, since readers use slots)
+_enabled: set[int] = set()
+
+
+class ShadowText:
+    """Text stored as a list of lines with an index of line offsets.
+
+    Line offsets are computed lazily: an edit forgets the offsets of the
+    lines after it, and they're computed again when they're next needed.
+
+    Args:
+        text: The initial text
+
+    Examples:
+        >>> shadow = ShadowText("if x:\\n    y = 1\\n")
+        >>> shadow.replace(10, 11, "z")
+        >>> shadow.text()
+        'if x:\\n    z = 1\\n'
+        >>> shadow.line_at(10), shadow.line_start(1)
+        (1, 6)
+    """
+
+    def __init__(self, text: str = "") -> None:
+        self.lines = text.split("\n")
+        self._starts = [0]  # Start offsets of the first len(_starts) lines
+        self._length = len(text)
+        self._text: str | None = text
+
+    def __len__(self) -> int:
+        return self._length
+
+    def text(self) -> str:
+        """Return the text (joined once per edit)."""
+        if self._text is None:
+            self._text = "\n".join(self.lines)
+        return self._text
+
+    def line_start(self, line: int) -> int:
+        """Return the offset of the start of a line."""
+        starts, lines = self._starts, self.lines
+        while len(starts) <= line:
+            starts.append(starts[-1] + len(lines[len(starts) - 1]) + 1)
+        return starts[line]
+
+    def line_at(self, offset: int) -> int:
+        """Return the line containing an offset."""
+        starts, lines = self._starts, self.lines
+        while starts[-1] <= offset and len(starts) < len(lines):
+            starts.append(starts[-1] + len(lines[len(starts) - 1]) + 1)
+        return bisect_right(starts, offset) - 1
+
+    def slice(self, start: int, end: int) -> str:
+        """Return the text between two offsets (joining only those lines)."""
+        first, last = self.line_at(start), self.line_at(end)
+        if first == last:
+            line_start = self.line_start(first)
+            return self.lines[first][start - line_start : end - line_start]
+        head = self.lines[first][start - self.line_start(first) :]
+        tail = self.lines[last][: end - self.line_start(last)]
+        return "\n".join([head, *self.lines[first + 1 : last], tail])
+
+    def replace(self, start: int, end: int, text: str) -> None:
+        """Replace the text between two offsets (editing only those lines)."""
+        first, last = self.line_at(start), self.line_at(end)
+        head = self.lines[first][: start - self.line_start(first)]
+        tail = self.lines[last][end - self.line_start(last) :]
+        self.lines[first : last + 1] = (head + text + tail).split("\n")
+        del self._starts[first + 1 :]
+        self._length += len(text) - (end - start)
+        self._text = None
+
+
+class ShadowBuffer(list[str]):
+    """A reader buffer (a list of characters) that mirrors edits to a ShadowText.
+
+    Slice assignment and deletion, insert, append, extend, and pop update
+    only the affected lines of the shadow.  Rarely used methods (like sort)
+    rebuild it.
+    """
+
+    def __init__(self, characters: Iterable[str] = ()) -> None:
+        super().__init__(characters)
+        self.shadow = ShadowText("".join(self))
+
+    def _rebuild(self) -> None:
+        self.shadow = ShadowText("".join(self))
+
+    def _span(self, index: SupportsIndex | slice) -> tuple[int, int] | None:
+        """Return the range an index or slice covers (None for extended slices)."""
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            return None if step != 1 else (start, max(start, stop))
+        position = index.__index__()
+        if position < 0:
+            position += len(self)
+        return position, position + 1
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        span = self._span(index)
+        if isinstance(index, slice):
+            value = list(value)
+            text = "".join(value)
+        else:
+            text = value
+        super().__setitem__(index, value)
+        if span is None:
+            self._rebuild()
+        else:
+            self.shadow.replace(*span, text)
+
+    def __delitem__(self, index: SupportsIndex | slice) -> None:
+        span = self._span(index)
+        super().__delitem__(index)
+        if span is None:
+            self._rebuild()
+        else:
+            self.shadow.replace(*span, "")
+
+    def __iadd__(self, values: Iterable[str]) -> Self:  # type: ignore[override,misc]
+        self.extend(values)
+        return self
+
+    def insert(self, index: SupportsIndex, value: str) -> None:
+        position = index.__index__()
+        if position < 0:
+            position = max(0, position + len(self))
+        position = min(position, len(self))
+        super().insert(position, value)
+        self.shadow.replace(position, position, value)
+
+    def append(self, value: str) -> None:
+        super().append(value)
+        self.shadow.replace(len(self) - 1, len(self) - 1, value)
+
+    def extend(self, values: Iterable[str]) -> None:
+        values = list(values)
+        end = len(self)
+        super().extend(values)
+        self.shadow.replace(end, end, "".join(values))
+
+    def pop(self, index: SupportsIndex = -1) -> str:
+        span = self._span(index)
+        value = super().pop(index)
+        assert span is not None
+        self.shadow.replace(span[0], span[0] + 1, "")
+        return value
+
+    def clear(self) -> None:
+        super().clear()
+        self.shadow = ShadowText()
+
+    def remove(self, value: str) -> None:
+        super().remove(value)
+        self._rebuild()
+
+    def reverse(self) -> None:
+        super().reverse()
+        self._rebuild()
+
+    def sort(self, *args: Any, **kwargs: Any) -> None:
+        super().sort(*args, **kwargs)
+        self._rebuild()
+
+    def __imul__(self, count: SupportsIndex) -> Self:
+        super().__imul__(count)
+        self._rebuild()
+        return self
+
+
+def get_shadow(reader: HistoricalReader) -> ShadowText | None:
+    """Return the shadow of the reader's buffer (None if it isn't enabled).
+
+    The reader replaces its buffer with a new list when it starts a new
+    input or moves through history, so the new buffer is wrapped here the
+    first time it's needed.
+    """
+    if id(reader) not in _enabled:
+        return None
+    buffer = reader.buffer
+    if not isinstance(buffer, ShadowBuffer):
+        buffer = reader.buffer = ShadowBuffer(buffer)
+    return buffer.shadow
+
+
+def enable_shadow_text() -> None:
+    """Keep a line-indexed copy of the input for commands here to use.
+
+    This speeds up commands (and the undo history) on very large inputs,
+    at the cost of a little extra work for every edit.
+    """
+    reader = _get_reader()
+    _enabled.add(id(reader))
+    get_shadow(reader)
+
+
+def disable_shadow_text() -> None:
+    """Stop keeping a line-indexed copy of the input."""
+    reader = _get_reader()
+    _enabled.discard(id(reader))
+    if isinstance(reader.buffer, ShadowBuffer):
+        reader.buffer = list(reader.buffer)
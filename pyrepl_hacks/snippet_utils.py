@@ -0,0 +1,227 @@
+"""Utilities for expanding snippets with placeholders (tab stops).
+
+Snippet templates are text with numbered fields, like VS Code and
+snipmate snippets:
+
+- ``$1``, ``$2``, ...: Tab stops, visited in order
+- ``${1:default}``: A tab stop with default text
+- ``$0``: Where the cursor ends up (the end of the snippet by default)
+- ``$$``: A literal ``$``
+
+Each expansion is applied to the buffer as a single splice, with the
+cursor offsets of the tab stops computed ahead of time.  Snippet files are
+only read when a snippet is first used and templates are only parsed when
+they're first expanded, so loading thousands of snippets is cheap.
+"""
+
+from __future__ import annotations
+
+import re
+import tomllib
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple
+
+from ._types import HistoricalReader
+
+__all__ = [
+    "Snippet",
+    "SnippetLibrary",
+    "expand_snippet",
+    "get_snippet_library",
+    "insert_snippet",
+    "load_snippets",
+    "next_field",
+    "parse_snippet",
+]
+
+FIELD_RE = re.compile(r"\$(?:(\d+)|\{(\d+)(?::([^}]*))?\}|(\$))")
+TRIGGER_RE = re.compile(r"\w+$")
+
+# Tab stops left in each reader's latest expansion, as distances from the
+# end of the buffer (so typing in one field doesn't move the later ones)
+_pending_fields: dict[int, list[int]] = {}
+
+
+class Snippet(NamedTuple):
+    """A parsed snippet template.
+
+    Attributes:
+        text: The text to insert (with default text filled in)
+        stops: Cursor offsets into text, in the order they're visited
+               (the final cursor position is last)
+    """
+
+    text: str
+    stops: tuple[int, ...]
+
+    def indented(self, indent: str) -> Snippet:
+        """Return the snippet with every line after the first indented.
+
+        Examples:
+            >>> Snippet("if x:\\n    $1", (10,)).indented("  ")
+            Snippet(text='if x:\\n      $1', stops=(12,))
+        """
+        if not indent or "\n" not in self.text:
+            return self
+        newlines = [i for i, char in enumerate(self.text) if char == "\n"]
+        stops = tuple(
+            stop + len(indent) * sum(1 for i in newlines if i < stop)
+            for stop in self.stops
+        )
+        return Snippet(self.text.replace("\n", "\n" + indent), stops)
+
+
+@lru_cache(maxsize=1024)
+def parse_snippet(template: str) -> Snippet:
+    """Parse a snippet template into its text and tab stops.
+
+    A field number used more than once is only a tab stop the first time.
+
+    Examples:
+        >>> parse_snippet('run("${1:cmd}", shell=$2)$0')
+        Snippet(text='run("cmd", shell=)', stops=(8, 17, 18))
+        >>> parse_snippet("cost: $$5")
+        Snippet(text='cost: $5', stops=(8,))
+    """
+    parts: list[str] = []
+    fields: dict[int, int] = {}
+    length = 0
+    position = 0
+    for match in FIELD_RE.finditer(template):
+        literal = template[position : match.start()]
+        number, braced_number, default, dollar = match.groups()
+        text = dollar or default or ""
+        parts += [literal, text]
+        length += len(literal) + len(text)
+        position = match.end()
+        if not dollar:
+            fields.setdefault(int(number or braced_number), length)
+    parts.append(template[position:])
+    text = "".join(parts)
+    final = fields.pop(0, len(text))
+    return Snippet(text, (*(fields[n] for n in sorted(fields)), final))
+
+
+def insert_snippet(reader: HistoricalReader, template: str) -> None:
+    """Insert a snippet at the cursor and move to its first tab stop."""
+    _splice_snippet(reader, reader.pos, reader.pos, parse_snippet(template))
+
+
+def _splice_snippet(
+    reader: HistoricalReader,
+    start: int,
+    end: int,
+    snippet: Snippet,
+) -> None:
+    """Replace buffer[start:end] with a snippet (indented like its line)."""
+    line_start = reader.get_unicode().rfind("\n", 0, start) + 1
+    line = reader.get_unicode()[line_start:start]
+    snippet = snippet.indented(line[: len(line) - len(line.lstrip())])
+    reader.buffer[start:end] = list(snippet.text)
+    first, *rest = (start + stop for stop in snippet.stops)
+    reader.pos = first
+    _pending_fields[id(reader)] = [len(reader.buffer) - stop for stop in rest]
+    reader.last_refresh_cache.invalidated = True
+    reader.dirty = True
+
+
+def next_field(reader: HistoricalReader) -> bool:
+    """Move to the next tab stop of the latest snippet.
+
+    Returns:
+        False if the latest snippet has no tab stops left
+    """
+    fields = _pending_fields.get(id(reader))
+    if not fields:
+        return False
+    distance = fields.pop(0)
+    reader.pos = max(0, len(reader.buffer) - distance)
+    reader.dirty = True
+    return True
+
+
+class SnippetLibrary:
+    """Named snippets, read from snippet files when they're first needed."""
+
+    def __init__(self) -> None:
+        self._templates: dict[str, str] = {}
+        self._unread: list[Path] = []
+
+    def load(self, path: str | Path) -> None:
+        """Add the snippets in a TOML file (read when a snippet is needed).
+
+        Each key in the file is a snippet name and its value is the template:
+
+            main = '''if __name__ == "__main__":
+                ${1:main()}'''
+            run = 'subprocess.run("$1", shell=True)$0'
+        """
+        self._unread.append(Path(path).expanduser())
+
+    def add(self, name: str, template: str) -> None:
+        """Add (or replace) a snippet."""
+        self._read_files()
+        self._templates[name] = template
+
+    def _read_files(self) -> None:
+        """Read the files not read yet (a file that fails is read again next time).
+
+        Raises:
+            OSError: If a file can't be read
+            ValueError: If a file isn't valid TOML
+            TypeError: If a file has a template that isn't a string
+        """
+        while self._unread:
+            path = self._unread[0]
+            with path.open("rb") as snippet_file:
+                templates = tomllib.load(snippet_file)
+            for name, template in templates.items():
+                if not isinstance(template, str):
+                    raise TypeError(f"Snippet {name} in {path} must be a string")
+            self._templates.update(templates)
+            self._unread.pop(0)
+
+    def get(self, name: str) -> Snippet | None:
+        """Return the parsed snippet with a name (or None if there isn't one)."""
+        self._read_files()
+        template = self._templates.get(name)
+        return None if template is None else parse_snippet(template)
+
+    def names(self) -> list[str]:
+        """Return the names of all snippets."""
+        self._read_files()
+        return sorted(self._templates)
+
+
+_library = SnippetLibrary()
+
+
+def get_snippet_library() -> SnippetLibrary:
+    """Return the library that the expand-snippet command uses."""
+    return _library
+
+
+def load_snippets(path: str | Path) -> None:
+    """Add the snippets in a TOML file for the expand-snippet command.
+
+    The file isn't read until a snippet is first expanded.
+
+    Args:
+        path: Path to the TOML file of snippet names and templates
+    """
+    _library.load(path)
+
+
+def expand_snippet(reader: HistoricalReader, library: SnippetLibrary) -> str | None:
+    """Replace the snippet name before the cursor with the snippet.
+
+    Returns:
+        The name of the expanded snippet, or None if there's no snippet
+        named by the word before the cursor
+    """
+    match = TRIGGER_RE.search(reader.get_unicode(), 0, reader.pos)
+    if match is None or (snippet := library.get(match.group())) is None:
+        return None
+    _splice_snippet(reader, match.start(), match.end(), snippet)
+    return match.group()
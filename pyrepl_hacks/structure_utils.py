@@ -0,0 +1,187 @@
+"""Utilities for finding the statements and blocks in REPL input.
+
+The input is parsed with ast when it's valid Python.  While it's being
+edited it often isn't, so on a syntax error the statements and blocks are
+guessed from indentation instead (using token_utils to skip lines that
+continue a bracket or a string from the line before).
+
+Results are cached by the input's text, so repeated motions over input that
+hasn't changed don't parse it again.
+"""
+
+from __future__ import annotations
+
+import ast
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
+from typing import NamedTuple
+
+from .token_utils import START_STATE, line_states
+
+__all__ = ["Block", "Structure", "parse_structure"]
+
+_KINDS: dict[type[ast.stmt], str] = {
+    ast.FunctionDef: "def",
+    ast.AsyncFunctionDef: "def",
+    ast.ClassDef: "class",
+    ast.For: "for",
+    ast.AsyncFor: "for",
+    ast.While: "while",
+    ast.If: "if",
+    ast.With: "with",
+    ast.AsyncWith: "with",
+    ast.Try: "try",
+    ast.TryStar: "try",
+    ast.Match: "match",
+}
+
+# Keywords that start a block, and keywords that continue one
+HEADERS = {"def", "class", "for", "while", "if", "with", "try", "match", "case"}
+CLAUSES = {"elif", "else", "except", "finally"}
+
+_KEYWORD = re.compile(r"\s*(?:async\s+)?(\w+|@)")
+
+
+class Block(NamedTuple):
+    """A compound statement (like a def, class, or for loop).
+
+    Attributes:
+        kind: The statement's keyword ("def" for async functions too)
+        start: First line (the first decorator for decorated statements)
+        header: Line with the statement's keyword
+        end: Last line
+    """
+
+    kind: str
+    start: int
+    header: int
+    end: int
+
+
+class Structure(NamedTuple):
+    """The statements and blocks in some source code (lines count from 0).
+
+    Attributes:
+        offsets: Offset of the start of each line
+        length: Length of the source code
+        statements: First and last line of each top-level statement
+        blocks: Every block, ordered by first line (outer blocks first)
+    """
+
+    offsets: tuple[int, ...]
+    length: int
+    statements: tuple[tuple[int, int], ...]
+    blocks: tuple[Block, ...]
+
+    def line_at(self, offset: int) -> int:
+        """Return the line containing an offset."""
+        return bisect_right(self.offsets, offset) - 1
+
+    def line_end(self, line: int) -> int:
+        """Return the offset of the end of a line (before its newline)."""
+        if line + 1 < len(self.offsets):
+            return self.offsets[line + 1] - 1
+        return self.length
+
+    def blocks_at(self, line: int) -> list[Block]:
+        """Return the blocks containing a line, innermost first."""
+        return [
+            block for block in reversed(self.blocks) if block.start <= line <= block.end
+        ]
+
+
+def _parsed_structure(source: str) -> tuple[list[tuple[int, int]], list[Block]]:
+    """Find the statements and blocks with ast.
+
+    Raises:
+        SyntaxError: If the source code is invalid
+    """
+    tree = ast.parse(source)
+    statements: list[tuple[int, int]] = []
+    for statement in tree.body:
+        decorators = getattr(statement, "decorator_list", [])
+        start = min([statement.lineno, *(d.lineno for d in decorators)]) - 1
+        end = (statement.end_lineno or statement.lineno) - 1
+        if statements and start <= statements[-1][1]:  # As in x = 1; y = 2
+            statements[-1] = (statements[-1][0], max(end, statements[-1][1]))
+        else:
+            statements.append((start, end))
+    blocks = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.stmt) and (kind := _KINDS.get(type(node))):
+            decorators = getattr(node, "decorator_list", [])
+            start = min([node.lineno, *(d.lineno for d in decorators)]) - 1
+            end = (node.end_lineno or node.lineno) - 1
+            blocks.append(Block(kind, start, node.lineno - 1, end))
+    return statements, sorted(blocks, key=lambda block: (block.start, -block.end))
+
+
+def _indented_structure(lines: list[str]) -> tuple[list[tuple[int, int]], list[Block]]:
+    """Guess the statements and blocks from indentation."""
+    statements: list[tuple[int, int]] = []
+    blocks: list[Block] = []
+    open_blocks: list[tuple[str, int, int, int]] = []  # kind, start, header, indent
+    decorated: int | None = None  # First line of the decorators before a def
+    last = -1  # Last line of the previous logical line
+    for number, (line, state) in enumerate(zip(lines, line_states(lines), strict=True)):
+        if state != START_STATE:  # Continues a bracket or string
+            last = number
+            if statements:
+                statements[-1] = (statements[-1][0], number)
+            continue
+        stripped = line.lstrip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        indent = len(line) - len(stripped)
+        match = _KEYWORD.match(line)
+        keyword = match.group(1) if match else ""
+        while open_blocks and open_blocks[-1][3] >= indent:
+            if open_blocks[-1][3] == indent and keyword in CLAUSES:
+                break
+            kind, start, header, _ = open_blocks.pop()
+            blocks.append(Block(kind, start, header, last))
+        if indent == 0 and keyword not in CLAUSES and decorated is None:
+            statements.append((number, number))
+        elif statements:
+            statements[-1] = (statements[-1][0], number)
+        else:
+            statements.append((number, number))
+        if keyword in HEADERS:
+            start = number if decorated is None else decorated
+            open_blocks.append((keyword, start, number, indent))
+        if keyword != "@":
+            decorated = None
+        elif decorated is None:
+            decorated = number
+        last = number
+    while open_blocks:
+        kind, start, header, _ = open_blocks.pop()
+        blocks.append(Block(kind, start, header, last))
+    return statements, sorted(blocks, key=lambda block: (block.start, -block.end))
+
+
+@lru_cache(maxsize=16)
+def parse_structure(source: str) -> Structure:
+    """Find the top-level statements and the blocks in source code.
+
+    Invalid source code (like a half-typed input) falls back to guessing the
+    structure from indentation.  Results are cached by source code.
+
+    Examples:
+        >>> structure = parse_structure("x = 1\\nfor n in x:\\n    print(n)")
+        >>> structure.statements
+        ((0, 0), (1, 2))
+        >>> structure.blocks
+        (Block(kind='for', start=1, header=1, end=2),)
+        >>> parse_structure("if x\\n    y = 1\\nz = 2").blocks  # Missing colon
+        (Block(kind='if', start=0, header=0, end=1),)
+    """
+    lines = source.split("\n")
+    offsets = tuple(accumulate((len(line) + 1 for line in lines[:-1]), initial=0))
+    try:
+        statements, blocks = _parsed_structure(source)
+    except SyntaxError:
+        statements, blocks = _indented_structure(lines)
+    return Structure(offsets, len(source), tuple(statements), tuple(blocks))
@@ -1,13 +1,56 @@
 """Utilities to modify _pyrepl syntax highlighting themes."""
 
+from __future__ import annotations
+
+import tomllib
 from _colorize import ANSIColors
+from pathlib import Path
+from typing import Any
+
+from ._types import AnsiEscape, ColorName
+
+__all__ = ["load_themes", "next_theme", "register_theme", "update_theme", "use_theme"]
+
+# Compiled themes by name, in registration order
+_themes: dict[str, Any] = {}
+_active_theme: str | None = None
+
+
+def _convert_extended_color(color: ColorName) -> AnsiEscape | None:
+    """Convert a 256-color or truecolor specification to an ANSI escape.
+
+    Args:
+        color: Color specification like '208', '#ff8800', or 'background #333'
+
+    Returns:
+        The ANSI escape sequence, or None if this isn't an extended color
+    """
+    *modifiers, value = color.split()
+    if modifiers not in ([], ["background"]):
+        return None
+    layer = 48 if modifiers else 38
+    if value.isdigit():
+        if int(value) > 255:
+            raise ValueError(f"Color {value} is not in the 256-color palette")
+        return f"\x1b[{layer};5;{value}m"
+    if value.startswith("#"):
+        digits = value[1:]
+        if len(digits) == 3:
+            digits = "".join(digit * 2 for digit in digits)
+        try:
+            red, green, blue = bytes.fromhex(digits)
+        except ValueError:
+            raise ValueError(f"Invalid hex color: {value}") from None
+        return f"\x1b[{layer};2;{red};{green};{blue}m"
+    return None
 
 
 def _convert_color(color: str) -> str:
     """Convert color specification strings into ANSI color codes.
 
     Args:
-        color: Color specification like 'red', 'intense blue', 'reset, bold'
+        color: Color specification like 'red', 'intense blue', 'reset, bold',
+               '208' (256-color palette), or '#ff8800' (truecolor)
 
     Returns:
         Combined ANSI color escape sequence
@@ -19,13 +62,24 @@ def _convert_color(color: str) -> str:
         '\\x1b[94m'
         >>> _convert_color('red, bold')
         '\\x1b[31m\\x1b[1m'
+        >>> _convert_color('background #ff8800')
+        '\\x1b[48;2;255;136;0m'
     """
-    subcolors = color.split(",")
+    subcolors = [c.strip() for c in color.split(",")]
     return "".join(
-        getattr(ANSIColors, c.strip().replace(" ", "_").upper()) for c in subcolors
+        _convert_extended_color(c) or getattr(ANSIColors, c.replace(" ", "_").upper())
+        for c in subcolors
     )
 
 
+def _compile_theme(**kwargs: ColorName) -> Any:
+    """Build a _colorize Theme with the given syntax colors."""
+    from _colorize import Syntax, default_theme
+
+    items = {name: _convert_color(color) for name, color in kwargs.items()}
+    return default_theme.copy_with(syntax=Syntax(**items))
+
+
 def update_theme(**kwargs: str) -> None:
     """Update the Python REPL syntax highlighting theme.
 
@@ -57,8 +111,90 @@ def update_theme(**kwargs: str) -> None:
     Examples:
         >>> update_theme(string='red', number='blue')
     """
-    from _colorize import Syntax, default_theme, set_theme
+    from _colorize import set_theme
 
-    items = {name: _convert_color(color) for name, color in kwargs.items()}
-    new_theme = default_theme.copy_with(syntax=Syntax(**items))
-    set_theme(new_theme)
+    set_theme(_compile_theme(**kwargs))
+
+
+def register_theme(name: str, **kwargs: ColorName) -> None:
+    """Register a named syntax highlighting theme.
+
+    The color specifications are converted to ANSI escape sequences right
+    away, so switching to the theme later (with use_theme or the
+    cycle-theme command) doesn't need to parse anything.
+
+    Args:
+        name: Name to register the theme under
+        **kwargs: Token type names mapped to color specifications
+                  (see update_theme for the supported names and colors)
+
+    Examples:
+        >>> register_theme("light", keyword="blue", string="#a31515")
+    """
+    _themes[name] = _compile_theme(**kwargs)
+
+
+def load_themes(path: str | Path) -> list[str]:
+    """Register every theme defined in a TOML file.
+
+    Each table in the file is a theme, named after the table:
+
+        [dark]
+        keyword = "bold green"
+        string = "#e6db74"
+
+        [light]
+        keyword = "blue"
+        string = "208"
+
+    Args:
+        path: Path to the TOML file
+
+    Returns:
+        The names of the themes that were registered
+    """
+    with Path(path).expanduser().open("rb") as theme_file:
+        config = tomllib.load(theme_file)
+    for name, colors in config.items():
+        register_theme(name, **colors)
+    return list(config)
+
+
+def use_theme(name: str) -> None:
+    """Switch to a theme registered with register_theme or load_themes.
+
+    Args:
+        name: Name of the registered theme
+
+    Raises:
+        ValueError: If no theme with the given name has been registered
+    """
+    from _colorize import set_theme
+
+    global _active_theme
+    try:
+        theme = _themes[name]
+    except KeyError:
+        raise ValueError(f"Unknown theme: {name}") from None
+    set_theme(theme)
+    _active_theme = name
+
+
+def next_theme() -> str:
+    """Switch to the registered theme after the active one.
+
+    Returns:
+        The name of the theme that is now active
+
+    Raises:
+        ValueError: If no themes have been registered
+    """
+    if not _themes:
+        raise ValueError("No themes registered")
+    names = list(_themes)
+    if _active_theme in _themes:
+        name = names[(names.index(_active_theme) + 1) % len(names)]
+    else:
+        name = names[0]
+    use_theme(name)
+    return name
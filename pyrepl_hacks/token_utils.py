@@ -0,0 +1,273 @@
+"""Line-oriented tokenizer state tracking for REPL input buffers.
+
+Python source can't be tokenized one line at a time without knowing what
+was left open by earlier lines (brackets and multi-line strings).  This
+module tracks that state from line to line so that per-line results can be
+cached and only recomputed for lines that changed (or whose starting state
+changed).
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import NamedTuple
+
+__all__ = [
+    "BracketIndex",
+    "LineScan",
+    "LineState",
+    "find_string_end",
+    "line_states",
+    "open_brackets",
+    "scan_line",
+]
+
+BRACKET_PAIRS = {"(": ")", "[": "]", "{": "}"}
+CLOSE_TO_OPEN = {closing: opening for opening, closing in BRACKET_PAIRS.items()}
+
+
+class LineState(NamedTuple):
+    """Tokenizer state at the start of a line.
+
+    Attributes:
+        brackets: Brackets left open by earlier lines (e.g. "([")
+        quote: Delimiter of a string left open by earlier lines (e.g. "'''")
+    """
+
+    brackets: str = ""
+    quote: str = ""
+
+
+class LineScan(NamedTuple):
+    """The result of scanning a single line.
+
+    Attributes:
+        end_state: Tokenizer state at the start of the following line
+        brackets: (column, character) pairs for brackets outside of strings
+                  and comments, in the order they appear
+    """
+
+    end_state: LineState
+    brackets: tuple[tuple[int, str], ...]
+
+
+START_STATE = LineState()
+
+
+def find_string_end(line: str, start: int, quote: str) -> int:
+    """Return the index just past the closing quote, or -1 if unterminated."""
+    index = start
+    while (index := line.find(quote[0], index)) != -1:
+        backslashes = 0
+        while index - backslashes > start and line[index - 1 - backslashes] == "\\":
+            backslashes += 1
+        if backslashes % 2 == 0 and line.startswith(quote, index):
+            return index + len(quote)
+        index += 1
+    return -1
+
+
+@lru_cache(maxsize=4096)
+def scan_line(line: str, state: LineState = START_STATE) -> LineScan:
+    """Scan one line of Python source starting from the given state.
+
+    Strings and comments are skipped, brackets are recorded, and the state
+    left over for the next line is computed.  Results are cached by line
+    text and starting state, so unchanged lines are never rescanned.
+
+    Args:
+        line: A single line of source code (without its newline)
+        state: Tokenizer state at the start of the line
+
+    Returns:
+        A LineScan with the state at the start of the next line and the
+        brackets found on this line
+
+    Examples:
+        >>> scan_line("x = '''abc").end_state
+        LineState(brackets='', quote="'''")
+        >>> scan_line("f(a, [b,").end_state
+        LineState(brackets='([', quote='')
+    """
+    brackets = list(state.brackets)
+    found: list[tuple[int, str]] = []
+    quote = state.quote
+    index = 0
+    if quote:
+        index = find_string_end(line, 0, quote)
+        if index == -1:
+            return LineScan(state, ())
+        quote = ""
+    while index < len(line):
+        char = line[index]
+        if char == "#":
+            break
+        if char in "\"'":
+            delimiter = char * 3 if line.startswith(char * 3, index) else char
+            end = find_string_end(line, index + len(delimiter), delimiter)
+            if end == -1:
+                # Only triple-quoted (or backslash-continued) strings carry on
+                if len(delimiter) == 3 or line.endswith("\\"):
+                    quote = delimiter
+                break
+            index = end
+            continue
+        if char in BRACKET_PAIRS:
+            brackets.append(char)
+            found.append((index, char))
+        elif char in CLOSE_TO_OPEN:
+            if brackets and brackets[-1] == CLOSE_TO_OPEN[char]:
+                brackets.pop()
+            found.append((index, char))
+        index += 1
+    return LineScan(LineState("".join(brackets), quote), tuple(found))
+
+
+def line_states(lines: list[str]) -> list[LineState]:
+    """Return the tokenizer state at the start of each of the given lines."""
+    state = START_STATE
+    states = []
+    for line in lines:
+        states.append(state)
+        state = scan_line(line, state).end_state
+    return states
+
+
+def open_brackets(text: str, pos: int) -> list[tuple[int, str]]:
+    """Return the brackets still open at a position in text.
+
+    Returns:
+        (offset, character) pairs for the open brackets, innermost last
+
+    Examples:
+        >>> open_brackets("f(a, [b], g(", 10)
+        [(1, '(')]
+        >>> open_brackets("f(a, [b], g(", 12)
+        [(1, '('), (11, '(')]
+    """
+    stack: list[tuple[int, str]] = []
+    state = START_STATE
+    offset = 0
+    for line in text[:pos].split("\n"):
+        scan = scan_line(line, state)
+        for column, char in scan.brackets:
+            if char in BRACKET_PAIRS:
+                stack.append((offset + column, char))
+            elif stack and stack[-1][1] == CLOSE_TO_OPEN[char]:
+                stack.pop()
+        state = scan.end_state
+        offset += len(line) + 1
+    return stack
+
+
+class BracketIndex:
+    """Matching bracket pairs in a text, updated as the text changes.
+
+    The scan of each line is kept between updates.  When the text changes,
+    only lines from the first changed line are rescanned, and scanning
+    stops as soon as an unchanged line at the end of the text starts in the
+    same state as before (the rest of its scans are reused).  The pairs
+    are matched up again only when they're needed.
+    """
+
+    def __init__(self) -> None:
+        self._text = ""
+        self._lines: list[str] = [""]
+        self._states: list[LineState] = [START_STATE]
+        self._scans: list[LineScan] = [scan_line("")]
+        self._pairs: dict[int, int] | None = None
+        self._brackets: list[tuple[int, str]] = []
+
+    def update(self, text: str) -> None:
+        """Update the index for the new text (rescanning changed lines)."""
+        if text == self._text:
+            return
+        lines = text.split("\n")
+        old_lines = self._lines
+        limit = min(len(lines), len(old_lines))
+        prefix = 0
+        while prefix < limit and lines[prefix] == old_lines[prefix]:
+            prefix += 1
+        suffix = 0
+        while (
+            suffix < limit - prefix
+            and lines[len(lines) - 1 - suffix] == old_lines[len(old_lines) - 1 - suffix]
+        ):
+            suffix += 1
+        states = self._states[:prefix]
+        scans = self._scans[:prefix]
+        state = scans[-1].end_state if scans else START_STATE
+        shift = len(old_lines) - len(lines)
+        for index in range(prefix, len(lines)):
+            if index >= len(lines) - suffix and self._states[index + shift] == state:
+                states += self._states[index + shift :]
+                scans += self._scans[index + shift :]
+                break
+            scan = scan_line(lines[index], state)
+            states.append(state)
+            scans.append(scan)
+            state = scan.end_state
+        self._text, self._lines = text, lines
+        self._states, self._scans = states, scans
+        self._pairs = None
+
+    def brackets(self) -> list[tuple[int, str]]:
+        """Return (offset, character) pairs for every bracket, in order."""
+        self._match()
+        return self._brackets
+
+    def _match(self) -> dict[int, int]:
+        """Match up the brackets (if the text changed since last time)."""
+        if self._pairs is not None:
+            return self._pairs
+        pairs: dict[int, int] = {}
+        brackets: list[tuple[int, str]] = []
+        stack: list[tuple[int, str]] = []
+        offset = 0
+        for line, scan in zip(self._lines, self._scans, strict=True):
+            for column, char in scan.brackets:
+                position = offset + column
+                brackets.append((position, char))
+                if char in BRACKET_PAIRS:
+                    stack.append((position, char))
+                elif stack and stack[-1][1] == CLOSE_TO_OPEN[char]:
+                    opening, _ = stack.pop()
+                    pairs[opening], pairs[position] = position, opening
+            offset += len(line) + 1
+        self._pairs, self._brackets = pairs, brackets
+        return pairs
+
+    def match(self, offset: int) -> int | None:
+        """Return the offset of the bracket matching the one at an offset.
+
+        Examples:
+            >>> index = BracketIndex()
+            >>> index.update("f(')', [x])  # )")
+            >>> index.match(1), index.match(10), index.match(3)
+            (10, 1, None)
+        """
+        return self._match().get(offset)
+
+    def enclosing(self, offset: int) -> list[tuple[int, int]]:
+        """Return the bracket pairs around an offset, innermost first.
+
+        Examples:
+            >>> index = BracketIndex()
+            >>> index.update("f(a, [b, c])")
+            >>> index.enclosing(7)
+            [(5, 10), (1, 11)]
+        """
+        pairs = self._match()
+        stack = []
+        for position, char in self._brackets:
+            if position >= offset:
+                break
+            if char in BRACKET_PAIRS:
+                stack.append(position)
+            elif stack and pairs.get(position) == stack[-1]:
+                stack.pop()
+        return [
+            (opening, pairs[opening])
+            for opening in reversed(stack)
+            if opening in pairs and pairs[opening] >= offset
+        ]
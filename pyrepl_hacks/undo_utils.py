@@ -0,0 +1,223 @@
+"""Utilities for undoing and redoing changes to the input.
+
+After every command, the input is compared with its text after the command
+before, and the difference is stored as a change: the offset where text was
+removed and inserted, the removed text, and the inserted text.  Commands
+that rewrite the whole buffer (like dedent or move-line-up) still store only
+the part that differs, and changes made by typing a run of characters are
+merged into one change.
+
+Undoing a change splices the removed text back in place of the inserted
+text, so it costs the size of the change rather than the size of the input.
+The oldest changes are forgotten once they use more than a memory budget,
+and every change is forgotten when the reader starts a new input.
+"""
+
+from __future__ import annotations
+
+import sys
+from _pyrepl.simple_interact import _get_reader
+from collections import deque
+from typing import NamedTuple
+
+from ._types import Command, HistoricalReader
+from .buffer_utils import diff_texts, get_text, splice
+from .hook_utils import (
+    add_command_hook,
+    add_input_hook,
+    remove_command_hook,
+    remove_input_hook,
+)
+
+__all__ = [
+    "Change",
+    "UndoHistory",
+    "disable_undo",
+    "enable_undo",
+    "get_undo_history",
+]
+
+UNDO_COMMANDS = {"undo", "redo"}
+
+# The undo history of each reader (keyed by id, since readers use slots)
+_histories: dict[int, UndoHistory] = {}
+
+
+class Change(NamedTuple):
+    """A change to the input.
+
+    Attributes:
+        offset: Where text was removed and inserted
+        removed: The text removed
+        inserted: The text inserted in its place
+        before: Cursor position before the change
+        after: Cursor position after the change
+    """
+
+    offset: int
+    removed: str
+    inserted: str
+    before: int
+    after: int
+
+    @property
+    def size(self) -> int:
+        """Return the bytes used by the change's text."""
+        return sys.getsizeof(self.removed) + sys.getsizeof(self.inserted)
+
+
+class UndoHistory:
+    """Changes made to the input, which can be undone and redone.
+
+    Args:
+        text: The input's current text
+        pos: The cursor's current position
+        max_bytes: Memory budget for the stored changes
+    """
+
+    def __init__(self, text: str = "", pos: int = 0, max_bytes: int = 1024 * 1024):
+        self.text = text
+        self.pos = pos
+        self.max_bytes = max_bytes
+        self._undo: deque[Change] = deque()
+        self._redo: list[Change] = []
+        self._size = 0
+        self._merging = False
+
+    @property
+    def size(self) -> int:
+        """Return the bytes used by the stored changes."""
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._undo)
+
+    def sync(self, text: str, pos: int) -> None:
+        """Note the input's text and cursor without recording a change."""
+        self.text, self.pos = text, pos
+        self._merging = False
+
+    def reset(self, text: str = "", pos: int = 0) -> None:
+        """Forget every change (for a new input)."""
+        self._undo.clear()
+        self._redo.clear()
+        self._size = 0
+        self.sync(text, pos)
+
+    def record(self, text: str, pos: int, merge: bool = False) -> Change | None:
+        """Record the change to the input since the last recorded text.
+
+        Args:
+            text: The input's new text
+            pos: The cursor's new position
+            merge: Whether the change may be merged into the one before (if
+                   that was also merged and this continues its insertion)
+
+        Returns:
+            The change recorded (None if the text didn't change)
+        """
+        difference = diff_texts(self.text, text)
+        if difference is None:
+            self.sync(text, pos)
+            return None
+        offset, removed, inserted = difference
+        change = Change(offset, removed, inserted, self.pos, pos)
+        if merge and self._merging and self._undo:
+            last = self._undo[-1]
+            last_end = last.offset + len(last.inserted)
+            if not (last.removed or removed) and offset == last_end:
+                self._size -= self._undo.pop().size
+                change = last._replace(inserted=last.inserted + inserted, after=pos)
+        self._undo.append(change)
+        self._size += change.size
+        self._size -= sum(redone.size for redone in self._redo)
+        self._redo.clear()
+        self._evict()
+        self.text, self.pos = text, pos
+        self._merging = merge
+        return change
+
+    def undo(self, reader: HistoricalReader) -> bool:
+        """Undo the last change to the reader's input.
+
+        Returns:
+            False if there's nothing to undo
+        """
+        if not self._undo:
+            return False
+        change = self._undo.pop()
+        end = change.offset + len(change.inserted)
+        splice(reader, change.offset, end, change.removed, pos=change.before)
+        self._redo.append(change)
+        self._merging = False
+        return True
+
+    def redo(self, reader: HistoricalReader) -> bool:
+        """Redo the last undone change to the reader's input.
+
+        Returns:
+            False if there's nothing to redo
+        """
+        if not self._redo:
+            return False
+        change = self._redo.pop()
+        end = change.offset + len(change.removed)
+        splice(reader, change.offset, end, change.inserted, pos=change.after)
+        self._undo.append(change)
+        self._merging = False
+        return True
+
+    def _evict(self) -> None:
+        """Forget the oldest changes until the history is within its budget."""
+        while len(self._undo) > 1 and self._size > self.max_bytes:
+            self._size -= self._undo.popleft().size
+
+
+def _record_change(reader: HistoricalReader, command: Command) -> None:
+    """Record the change the command made to the input (if any)."""
+    history = _histories.get(id(reader))
+    if history is None:
+        return
+    if command.event_name in UNDO_COMMANDS:
+        history.sync(get_text(reader), reader.pos)
+    else:
+        merge = command.event_name == "self-insert"
+        history.record(get_text(reader), reader.pos, merge)
+
+
+def _reset_history(reader: HistoricalReader) -> None:
+    """Forget the changes to the last input (accepted or interrupted)."""
+    history = _histories.get(id(reader))
+    if history is not None:
+        history.reset()
+
+
+def get_undo_history(reader: HistoricalReader) -> UndoHistory | None:
+    """Return the reader's undo history (None if undo isn't enabled)."""
+    return _histories.get(id(reader))
+
+
+def enable_undo(max_bytes: int = 1024 * 1024) -> None:
+    """Record changes to the input so the undo and redo commands work.
+
+    Args:
+        max_bytes: Memory budget for the recorded changes
+    """
+    reader = _get_reader()
+    history = _histories.get(id(reader))
+    if history is None:
+        text = get_text(reader)
+        _histories[id(reader)] = UndoHistory(text, reader.pos, max_bytes)
+    else:
+        history.max_bytes = max_bytes
+        history._evict()
+    add_command_hook(_record_change)
+    add_input_hook(_reset_history)
+
+
+def disable_undo() -> None:
+    """Stop recording changes to the input (forgetting the recorded ones)."""
+    _histories.pop(id(_get_reader()), None)
+    if not _histories:
+        remove_command_hook(_record_change)
+        remove_input_hook(_reset_history)
@@ -1,5 +1,7 @@
 """Test utilities for pyrepl-hacks tests."""
 
+from _pyrepl.console import Console
+from _pyrepl.historical_reader import HistoricalReader
 from unittest.mock import MagicMock
 
 
@@ -15,6 +17,11 @@ class MockReader:
         self.last_refresh_cache = MagicMock()
         self.last_refresh_cache.invalidated = False
 
+        # History, as kept by HistoricalReader
+        self.history = []
+        self.historyi = 0
+        self.transient_history = {}
+
         # Store original state for assertions
         self._initial_text = initial_text
 
@@ -47,6 +54,29 @@ class MockReader:
         self.dirty = True
 
 
+def create_historical_reader(text="", pos=None, history=()):
+    """Create a real _pyrepl reader (with a mock console) for testing commands."""
+    reader = HistoricalReader(MagicMock(spec=Console, height=25, width=80))
+    reader.history.extend(history)
+    reader.prepare()
+    reader.buffer[:] = list(text)
+    reader.pos = len(text) if pos is None else pos
+    reader.screen = reader.calc_screen()
+    return reader
+
+
+def start_patches(test_case, *patchers):
+    """Start patchers, stopping them when the test finishes.
+
+    Returns the mocks (or replacement values) the patchers put in place.
+    """
+    started = []
+    for patcher in patchers:
+        started.append(patcher.start())
+        test_case.addCleanup(patcher.stop)
+    return started
+
+
 def assert_buffer_equals(test_case, reader, expected_text):
     """Assert that the reader's buffer contains the expected text."""
     actual = reader.get_unicode()
@@ -0,0 +1,115 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from pyrepl_hacks.abbrev_utils import (
+    AbbreviationTrie,
+    _expand_abbreviation,
+    add_abbreviation,
+    remove_abbreviation,
+)
+
+from .support import MockReader, start_patches
+
+
+class TestAbbreviationTrie(unittest.TestCase):
+    def setUp(self):
+        self.trie = AbbreviationTrie()
+        self.trie.add("np", "numpy")
+        self.trie.add("imnp", "import numpy as np")
+
+    def test_match_whole_words(self):
+        """Test that abbreviations only match as whole words."""
+        self.assertEqual(self.trie.match("imnp", 4), (0, "import numpy as np"))
+        self.assertEqual(self.trie.match("x = np.", 6), (4, "numpy"))
+        self.assertIsNone(self.trie.match("mnp", 3))
+        self.assertIsNone(self.trie.match("x_np", 4))
+        self.assertIsNone(self.trie.match("p", 1))
+        self.assertIsNone(self.trie.match("", 0))
+
+    def test_match_before_end(self):
+        """Test that only the characters before the end index are checked."""
+        self.assertEqual(self.trie.match("np np", 2), (0, "numpy"))
+
+    def test_add_and_remove(self):
+        """Test replacing and removing abbreviations."""
+        self.assertEqual(len(self.trie), 2)
+        self.trie.add("np", "numpy.ndarray")
+        self.assertEqual(len(self.trie), 2)
+        self.assertEqual(self.trie.match("np", 2), (0, "numpy.ndarray"))
+
+        self.trie.remove("np")
+        self.trie.remove("missing")
+        self.assertEqual(len(self.trie), 1)
+        self.assertIsNone(self.trie.match("np", 2))
+        self.assertEqual(self.trie.match("imnp", 4), (0, "import numpy as np"))
+
+        self.trie.remove("imnp")
+        self.assertEqual(len(self.trie), 0)
+        self.assertEqual(self.trie._root, {})
+
+    def test_invalid_abbreviations(self):
+        """Test that abbreviations must be single words."""
+        for abbreviation in ["", "two words", "a.b"]:
+            with self.subTest(abbreviation=abbreviation), self.assertRaises(ValueError):
+                self.trie.add(abbreviation, "x")
+
+
+class TestExpandAbbreviation(unittest.TestCase):
+    def setUp(self):
+        self.add_hook = MagicMock()
+        self.remove_hook = MagicMock()
+        start_patches(
+            self,
+            patch("pyrepl_hacks.abbrev_utils._abbreviations", AbbreviationTrie()),
+            patch("pyrepl_hacks.abbrev_utils.add_command_hook", self.add_hook),
+            patch("pyrepl_hacks.abbrev_utils.remove_command_hook", self.remove_hook),
+        )
+        add_abbreviation("imnp", "import numpy as np")
+
+    def type_character(self, reader, char):
+        reader.buffer.insert(reader.pos, char)
+        reader.pos += 1
+        command = MagicMock(event_name="self-insert", event=[char])
+        _expand_abbreviation(reader, command)
+
+    def create_reader(self, text, pos=None):
+        reader = MockReader(text, pos)
+        reader.paste_mode = False
+        return reader
+
+    def test_hook_added_and_removed(self):
+        """Test that the command hook is only installed while needed."""
+        self.add_hook.assert_called_once_with(_expand_abbreviation)
+        remove_abbreviation("imnp")
+        self.remove_hook.assert_called_once_with(_expand_abbreviation)
+
+    def test_expands_on_word_boundary(self):
+        """Test that typing a non-word character expands the abbreviation."""
+        reader = self.create_reader("x = 1\nimnp\ny = 2", pos=10)
+
+        self.type_character(reader, ";")
+
+        self.assertEqual(reader.get_unicode(), "x = 1\nimport numpy as np;\ny = 2")
+        self.assertEqual(reader.pos, 25)
+        self.assertTrue(reader.dirty)
+
+    def test_no_expansion(self):
+        """Test word characters, non-matching words, and other commands."""
+        reader = self.create_reader("imnp")
+        self.type_character(reader, "x")
+        self.assertEqual(reader.get_unicode(), "imnpx")
+
+        reader = self.create_reader("imnpx")
+        self.type_character(reader, " ")
+        self.assertEqual(reader.get_unicode(), "imnpx ")
+
+        reader = self.create_reader("imnp ")
+        _expand_abbreviation(reader, MagicMock(event_name="left"))
+        self.assertEqual(reader.get_unicode(), "imnp ")
+
+    def test_no_expansion_when_pasting(self):
+        """Test that pasted text isn't expanded."""
+        reader = self.create_reader("imnp")
+        reader.paste_mode = True
+        self.type_character(reader, " ")
+        self.assertEqual(reader.get_unicode(), "imnp ")
@@ -0,0 +1,57 @@
+import threading
+import unittest
+
+from pyrepl_hacks.background_utils import BackgroundJob, run_in_background
+
+
+class TestRunInBackground(unittest.TestCase):
+    def run_job(self, source, namespace):
+        """Run a job and wait for it to finish."""
+        finished = threading.Event()
+        job = run_in_background(source, namespace, lambda job: finished.set())
+        self.assertTrue(finished.wait(timeout=10))
+        return job
+
+    def test_result_of_final_expression(self):
+        """Test that the value of the final expression is kept."""
+        namespace = {}
+        job = self.run_job("numbers = [1, 2, 3]\nsum(numbers)", namespace)
+
+        self.assertEqual(job.status, "done")
+        self.assertEqual(job.result, 6)
+        self.assertEqual(namespace["numbers"], [1, 2, 3])
+        self.assertIsNone(job.exception)
+        self.assertIsNotNone(job.finished)
+
+    def test_jobs_recorded_in_namespace(self):
+        """Test that jobs are appended to the _bg list in the namespace."""
+        namespace = {}
+        first = self.run_job("x = 1", namespace)
+        second = self.run_job("y = 2", namespace)
+
+        self.assertEqual(namespace["_bg"], [first, second])
+        self.assertEqual((first.number, second.number), (1, 2))
+        self.assertIsNone(first.result)
+
+    def test_exception(self):
+        """Test that exceptions are recorded on the job."""
+        job = self.run_job("1 / 0", {})
+
+        self.assertEqual(job.status, "failed")
+        self.assertIsInstance(job.exception, ZeroDivisionError)
+        self.assertIn("failed", repr(job))
+
+    def test_syntax_error(self):
+        """Test that invalid code raises before a job is started."""
+        namespace = {}
+        with self.assertRaises(SyntaxError):
+            run_in_background("x = (", namespace)
+        self.assertNotIn("_bg", namespace)
+
+    def test_repr(self):
+        """Test the job's representation."""
+        job = BackgroundJob(number=3, source="df = load()\ndf.fit()")
+        self.assertRegex(repr(job), r"<job 3 running for \d+\.\ds: df = load\(\) ...>")
+        job.status = "done"
+        job.finished = job.started + 2.5
+        self.assertEqual(repr(job), "<job 3 done in 2.5s: df = load() ...>")
@@ -1,8 +1,10 @@
 import unittest
 from unittest.mock import MagicMock, patch
 
-from pyrepl_hacks.bind_utils import bind, bind_to_insert
-from pyrepl_hacks.command_utils import register_command
+from pyrepl_hacks.bind_utils import bind, bind_snippet, bind_to_insert
+from pyrepl_hacks.command_utils import get_command_index, register_command
+
+from .support import MockReader
 
 
 class TestBindUtils(unittest.TestCase):
@@ -112,6 +114,19 @@ class TestBindUtils(unittest.TestCase):
         command_name = "_Ctrl_Alt_N"
         self.assertIn(command_name, self.mock_reader.commands)
 
+    def test_bind_snippet(self):
+        """Test bind_snippet inserts text and moves to the first tab stop."""
+        bind_snippet("Ctrl+X Ctrl+R", 'subprocess.run("$1", shell=True)$0')
+
+        command_name = "_Ctrl_X_Ctrl_R"
+        self.mock_reader.bind.assert_called_once_with(r"\C-x\C-r", command_name)
+
+        reader = MockReader("x = ")
+        command_class = self.mock_reader.commands[command_name]
+        command_class(reader, "event", "event_data").do()
+        self.assertEqual(reader.get_unicode(), 'x = subprocess.run("", shell=True)')
+        self.assertEqual(reader.pos, 20)
+
     def test_bind_special_keys(self):
         """Test binding with special key combinations."""
         bind("Shift+Tab", "dedent")
@@ -215,3 +230,18 @@ class TestCommandUtils(unittest.TestCase):
 
         self.assertIn("simple-command", self.mock_reader.commands)
         self.assertEqual(simple_command.name, "simple-command")
+
+    def test_register_command_updates_command_index(self):
+        """Test that the command index includes newly registered commands."""
+        self.mock_reader.commands = {"clear-screen": type("clear_screen", (), {})}
+        with patch("pyrepl_hacks.command_utils._command_index", None):
+            index = get_command_index(self.mock_reader)
+            self.assertEqual(index.search("cs"), ["clear-screen"])
+
+            @register_command
+            def count_spaces(reader):
+                """Count the spaces in the input."""
+
+            self.assertEqual(count_spaces.command_class.__doc__, count_spaces.__doc__)
+            self.assertEqual(index.search("cs"), ["clear-screen", "count-spaces"])
+            self.assertEqual(index.search("input"), ["count-spaces"])
@@ -0,0 +1,109 @@
+import unittest
+
+from pyrepl_hacks.buffer_utils import (
+    diff_texts,
+    line_end,
+    line_start,
+    replace_text,
+    splice,
+)
+
+from .support import ReaderTestMixin
+
+
+class TestLineBounds(unittest.TestCase):
+    def test_line_bounds(self):
+        """Test finding the start and end of lines in a list of characters."""
+        buffer = list("one\ntwo\n\nfour")
+        for pos, expected in [(0, (0, 3)), (3, (0, 3)), (5, (4, 7)), (8, (8, 8))]:
+            with self.subTest(pos=pos):
+                self.assertEqual(
+                    (line_start(buffer, pos), line_end(buffer, pos)),
+                    expected,
+                )
+        self.assertEqual(line_end(buffer, 9), 13)
+
+
+class TestDiffTexts(unittest.TestCase):
+    def test_insertions_deletions_and_replacements(self):
+        """Test finding the one changed range between two texts."""
+        self.assertEqual(diff_texts("abc", "abXc"), (2, "", "X"))
+        self.assertEqual(diff_texts("abc", "ac"), (1, "b", ""))
+        self.assertEqual(diff_texts("", "abc"), (0, "", "abc"))
+        self.assertEqual(diff_texts("abc", "xyz"), (0, "abc", "xyz"))
+        self.assertIsNone(diff_texts("abc", "abc"))
+
+    def test_repeated_characters(self):
+        """Test that the change is found when characters repeat around it."""
+        self.assertEqual(diff_texts("aaaa", "aaaaa"), (4, "", "a"))
+        self.assertEqual(diff_texts("abab", "ab"), (2, "ab", ""))
+
+    def test_big_texts_store_only_the_change(self):
+        """Test that a change in a big text is stored compactly."""
+        old = "x = 1\n" * 10_000
+        new = old[:30_000] + "y = 2\n" + old[30_000:]
+        self.assertEqual(diff_texts(old, new), (30_000, "", "y = 2\n"))
+
+
+class TestSplice(unittest.TestCase, ReaderTestMixin):
+    def test_cursor_after_range_shifts(self):
+        """Test that a cursor after the range stays on the same character."""
+        reader = self.create_reader("a = 1\nb = 2", pos=10)
+
+        splice(reader, 0, 1, "alpha")
+
+        self.assertBufferEquals(reader, "alpha = 1\nb = 2")
+        self.assertPositionEquals(reader, 14)
+        self.assertTrue(reader.dirty)
+        self.assertTrue(reader.last_refresh_cache.invalidated)
+
+    def test_cursor_inside_and_before_range(self):
+        """Test cursors before and inside the replaced range."""
+        reader = self.create_reader("abcdef", pos=5)
+        splice(reader, 2, 6, "X")
+        self.assertBufferEquals(reader, "abX")
+        self.assertPositionEquals(reader, 3)
+
+        reader = self.create_reader("abcdef", pos=1)
+        splice(reader, 2, 6, "X")
+        self.assertPositionEquals(reader, 1)
+
+    def test_explicit_position(self):
+        """Test setting the cursor position while splicing."""
+        reader = self.create_reader("abc", pos=0)
+        splice(reader, 3, 3, "def", pos=6)
+        self.assertBufferEquals(reader, "abcdef")
+        self.assertPositionEquals(reader, 6)
+
+
+class TestReplaceText(unittest.TestCase, ReaderTestMixin):
+    def test_only_the_difference_is_spliced(self):
+        """Test that replacing the input assigns only the changed slice."""
+        reader = self.create_reader("a = 1\nb = 2\nc = 3", pos=0)
+        reader.buffer = buffer = _SliceRecorder(reader.buffer)
+
+        replace_text(reader, "a = 1\nbee = 2\nc = 3", pos=8)
+
+        self.assertBufferEquals(reader, "a = 1\nbee = 2\nc = 3")
+        self.assertPositionEquals(reader, 8)
+        self.assertEqual(buffer.assigned, [(slice(7, 7), ["e", "e"])])
+        self.assertTrue(reader.dirty)
+
+    def test_unchanged_text_moves_the_cursor(self):
+        """Test replacing the input with the same text."""
+        reader = self.create_reader("abc", pos=0)
+        replace_text(reader, "abc", pos=2)
+        self.assertBufferEquals(reader, "abc")
+        self.assertPositionEquals(reader, 2)
+
+
+class _SliceRecorder(list):
+    """A list that records slice assignments."""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.assigned = []
+
+    def __setitem__(self, index, value):
+        self.assigned.append((index, list(value)))
+        super().__setitem__(index, value)
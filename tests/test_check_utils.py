@@ -0,0 +1,126 @@
+import sys
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from pyrepl_hacks.check_utils import BufferChecker, check_source
+
+from .support import MockReader
+
+
+class TestCheckSource(unittest.TestCase):
+    def test_valid_code(self):
+        """Test that valid code has no problems."""
+        self.assertIsNone(check_source("x = 1\nprint(x)", pyflakes=False))
+
+    def test_incomplete_code(self):
+        """Test that incomplete code isn't reported as a problem."""
+        self.assertIsNone(check_source("def f():", pyflakes=False))
+        self.assertIsNone(check_source("numbers = [1, 2,", pyflakes=False))
+
+    def test_syntax_error(self):
+        """Test that the first syntax error is reported with its line."""
+        self.assertEqual(
+            check_source("x = 1\ny = )", pyflakes=False),
+            "SyntaxError: unmatched ')' (line 2)",
+        )
+
+    def test_pyflakes(self):
+        """Test that the first pyflakes warning is reported (if installed)."""
+        messages = [
+            SimpleNamespace(
+                lineno=2,
+                col=0,
+                message="undefined name %r",
+                message_args=("y",),
+            ),
+            type("UnusedImport", (SimpleNamespace,), {})(lineno=1, col=0),
+        ]
+        checker = MagicMock(return_value=MagicMock(messages=messages))
+        fake_pyflakes = MagicMock()
+        fake_pyflakes.checker.Checker = checker
+        modules = {"pyflakes": fake_pyflakes, "pyflakes.checker": fake_pyflakes.checker}
+        with patch.dict(sys.modules, modules):
+            problem = check_source("import os\nprint(x, y)", ["x"])
+        self.assertEqual(problem, "undefined name 'y' (line 2)")
+        self.assertEqual(checker.call_args.kwargs["builtins"], {"x"})
+
+    def test_pyflakes_not_installed(self):
+        """Test that pyflakes is skipped if it isn't installed."""
+        with patch.dict(sys.modules, {"pyflakes.checker": None}):
+            self.assertIsNone(check_source("print(undefined)"))
+
+
+class TestBufferChecker(unittest.TestCase):
+    def setUp(self):
+        patcher = patch("pyrepl_hacks.check_utils.get_namespace", return_value={})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.checker = BufferChecker(delay=0, pyflakes=False)
+        self.addCleanup(self.checker.stop)
+
+    def wait_for_message(self, reader):
+        """Call the hook (like the idle reader would) until a message shows."""
+        deadline = time.monotonic() + 10
+        while not reader.msg and time.monotonic() < deadline:
+            self.checker(reader)
+            time.sleep(0.01)
+
+    def test_problem_shown_after_pause(self):
+        """Test that problems are shown once the input stops changing."""
+        reader = MockReader("x = 1 +* 2")
+        reader.msg = ""
+
+        self.wait_for_message(reader)
+
+        self.assertEqual(reader.msg, "SyntaxError: invalid syntax (line 1)")
+        self.assertTrue(reader.dirty)
+
+    def test_not_checked_while_typing(self):
+        """Test that nothing is checked until the delay has passed."""
+        checker = BufferChecker(delay=60, pyflakes=False)
+        reader = MockReader("x = 1 +* 2")
+        reader.msg = ""
+        with patch.object(checker, "_request") as request:
+            for _ in range(3):
+                checker(reader)
+        request.assert_not_called()
+
+    def test_stale_results_not_shown(self):
+        """Test that a result for an earlier input isn't shown."""
+        reader = MockReader("x = 1 +* 2")
+        reader.msg = ""
+        self.wait_for_message(reader)
+
+        reader.buffer = list("x = 1")
+        reader.msg = ""
+        for _ in range(3):
+            self.checker(reader)
+        self.assertEqual(reader.msg, "")
+
+    def test_results_cached(self):
+        """Test that returning to a checked input reuses its result."""
+        reader = MockReader("x = )")
+        reader.msg = ""
+        self.wait_for_message(reader)
+        reader.msg = ""
+        reader.buffer = list("x = 1")
+        self.checker(reader)
+
+        reader.buffer = list("x = )")
+        with patch.object(self.checker, "_request") as request:
+            self.checker(reader)
+            self.checker(reader)
+        request.assert_not_called()
+        self.assertEqual(reader.msg, "SyntaxError: unmatched ')' (line 1)")
+
+    def test_other_messages_not_replaced(self):
+        """Test that a problem doesn't replace another message."""
+        reader = MockReader("x = )")
+        reader.msg = "timing cancelled"
+        deadline = time.monotonic() + 1
+        while time.monotonic() < deadline:
+            self.checker(reader)
+            time.sleep(0.01)
+        self.assertEqual(reader.msg, "timing cancelled")
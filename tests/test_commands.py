@@ -1,15 +1,60 @@
+import contextlib
+import threading
 import unittest
+from unittest.mock import MagicMock, patch
 
 from pyrepl_hacks.commands import (
+    _paragraph_bounds,
+    accept_paragraph,
+    auto_import,
+    cancel_timeit,
+    command_palette,
+    cycle_theme,
     dedent,
+    dedent_region,
+    duplicate_region,
+    exchange_point_and_mark,
+    expand_snippet,
+    indent_region,
+    jump_to_enclosing_block,
+    jump_to_matching_bracket,
+    kill_ring_browse,
     move_line_down,
     move_line_up,
+    move_region_down,
+    move_region_up,
     move_to_indentation,
     next_paragraph,
+    next_snippet_field,
+    next_statement,
     previous_paragraph,
+    previous_statement,
+    profile_last,
+    query_replace_regexp,
+    rerun_changed,
+    run_background,
+    select_block,
+    select_inside_brackets,
+    set_mark,
+    show_help,
+    show_signature,
+    sort_lines,
+    timeit_background,
+    timeit_buffer,
+    timeit_paragraph,
+    toggle_comment,
 )
+from pyrepl_hacks.minibuffer_utils import (
+    picker_accept,
+    picker_add_character,
+    picker_next,
+)
+from pyrepl_hacks.perf_utils import TimingCancelled, TimingResult
+from pyrepl_hacks.region_utils import get_mark
+from pyrepl_hacks.replace_utils import query_replace_yes
+from pyrepl_hacks.snippet_utils import SnippetLibrary
 
-from .support import ReaderTestMixin
+from .support import ReaderTestMixin, create_historical_reader, start_patches
 
 
 class TestMoveToIndentation(unittest.TestCase, ReaderTestMixin):
@@ -458,3 +503,993 @@ class TestNextParagraph(unittest.TestCase, ReaderTestMixin):
 
         next_paragraph(reader)
         self.assertPositionEquals(reader, len(text))  # End of buffer
+
+
+class TestCycleTheme(unittest.TestCase, ReaderTestMixin):
+    def test_cycle_theme(self):
+        """Test switching to the next registered theme."""
+        reader = self.create_reader("x = 1")
+
+        with patch("pyrepl_hacks.commands.next_theme", return_value="dark"):
+            cycle_theme(reader)
+
+        self.assertEqual(reader.msg, "theme: dark")
+        self.assertTrue(reader.last_refresh_cache.invalidated)
+        self.assertTrue(reader.dirty)
+
+    def test_cycle_theme_without_themes(self):
+        """Test cycling themes when none are registered."""
+        reader = self.create_reader("x = 1")
+
+        with patch("pyrepl_hacks.commands.next_theme", side_effect=ValueError):
+            cycle_theme(reader)
+
+        self.assertTrue(reader.dirty)
+        self.assertBufferEquals(reader, "x = 1")
+
+
+class NamespaceTestMixin(ReaderTestMixin):
+    """Run commands against a test namespace without a real console."""
+
+    def setUp(self):
+        self.namespace = {}
+        start_patches(
+            self,
+            patch(
+                "pyrepl_hacks.commands.suspend_console",
+                lambda reader: contextlib.nullcontext(),
+            ),
+            patch("pyrepl_hacks.commands.get_namespace", lambda: self.namespace),
+        )
+
+
+class TestProfileLast(NamespaceTestMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        [self.page] = start_patches(self, patch("pyrepl_hacks.commands.page"))
+
+    def test_profile_last(self):
+        """Test profiling the previous input without changing the buffer."""
+        reader = self.create_reader("y = 2", pos=3)
+        reader.history = ["x = 1", "total = sum(range(100))"]
+
+        profile_last(reader)
+
+        self.assertEqual(self.namespace["total"], 4950)
+        report, _title = self.page.call_args.args
+        self.assertIn("function calls", report)
+        self.assertBufferEquals(reader, "y = 2")
+        self.assertPositionEquals(reader, 3)
+
+    def test_profile_last_no_history(self):
+        """Test profiling when there is no previous input."""
+        reader = self.create_reader()
+        reader.history = []
+
+        profile_last(reader)
+
+        self.page.assert_not_called()
+        self.assertTrue(reader.dirty)
+
+    def test_profile_last_error(self):
+        """Test that errors in the profiled code are reported, not paged."""
+        reader = self.create_reader()
+        reader.history = ["1 / 0"]
+
+        with patch("traceback.print_exc") as print_exc:
+            profile_last(reader)
+
+        print_exc.assert_called_once()
+        self.page.assert_not_called()
+
+
+class TestParagraphBounds(unittest.TestCase, ReaderTestMixin):
+    def test_paragraph_bounds_middle(self):
+        """Test finding the paragraph around the cursor."""
+        text = "a = 1\n\nb = 2\nc = 3\n\nd = 4"
+        reader = self.create_reader(text, pos=10)  # In "b = 2"
+        self.assertEqual(_paragraph_bounds(reader), (7, 19))
+
+    def test_paragraph_bounds_last_paragraph(self):
+        """Test finding the last paragraph (without a trailing newline)."""
+        text = "a = 1\n\nb = 2"
+        reader = self.create_reader(text)
+        self.assertEqual(_paragraph_bounds(reader), (7, 12))
+
+    def test_paragraph_bounds_blank_line(self):
+        """Test that there's no paragraph on a blank line."""
+        text = "a = 1\n\nb = 2"
+        reader = self.create_reader(text, pos=6)
+        self.assertEqual(_paragraph_bounds(reader), (6, 6))
+
+
+class TestAcceptParagraph(NamespaceTestMixin, unittest.TestCase):
+    def create_reader(self, text="", pos=None):
+        reader = super().create_reader(text, pos)
+        reader.console = MagicMock()
+        reader.history = []
+        return reader
+
+    def test_accept_paragraph(self):
+        """Test running only the paragraph under the cursor."""
+        text = "data = slow()\n\nx = 1\ny = x + 1\n\nz = 3"
+        reader = self.create_reader(text, pos=16)  # In "x = 1"
+
+        accept_paragraph(reader)
+
+        self.assertEqual(self.namespace["y"], 2)
+        self.assertNotIn("data", self.namespace)
+        self.assertNotIn("z", self.namespace)
+        self.assertEqual(reader.history, ["x = 1\ny = x + 1\n"])
+        self.assertBufferEquals(reader, text)
+        self.assertPositionEquals(reader, 16)
+
+    def test_accept_paragraph_shows_final_expression(self):
+        """Test that the paragraph's final expression is displayed."""
+        reader = self.create_reader("x = 1\nx + 1")
+
+        with patch("sys.displayhook") as displayhook:
+            accept_paragraph(reader)
+
+        displayhook.assert_called_once_with(2)
+
+    def test_accept_paragraph_on_blank_line(self):
+        """Test that nothing is run from a blank line."""
+        reader = self.create_reader("x = 1\n\ny = 2", pos=6)
+
+        accept_paragraph(reader)
+
+        self.assertEqual(self.namespace, {})
+        self.assertEqual(reader.history, [])
+        self.assertTrue(reader.dirty)
+
+    def test_accept_paragraph_history_navigation(self):
+        """Test moving through history after running a paragraph."""
+        reader = create_historical_reader("x = 1\n\ny = 2", history=["old"])
+        reader.select_item(0)  # Leaves the input as an unsaved history edit
+        reader.select_item(1)
+        reader.pos = 0
+
+        accept_paragraph(reader)
+        reader.do_cmd(("next-history", []))
+        self.assertIn("end of history list", reader.msg)
+        reader.do_cmd(("previous-history", []))
+        self.assertBufferEquals(reader, "x = 1")
+        reader.do_cmd(("next-history", []))
+        self.assertBufferEquals(reader, "x = 1\n\ny = 2")
+
+        reader.finish()
+        self.assertEqual(reader.history, ["old", "x = 1", "x = 1\n\ny = 2"])
+
+
+class TestRerunChanged(NamespaceTestMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = patch("pyrepl_hacks.commands._rerun_fingerprints", [])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.namespace["calls"] = []
+
+    def create_reader(self, text="", pos=None):
+        reader = super().create_reader(text, pos)
+        reader.console = MagicMock()
+        reader.history = []
+        return reader
+
+    def rerun(self, source):
+        reader = self.create_reader(source)
+        rerun_changed(reader)
+        self.assertBufferEquals(reader, source)
+        return reader
+
+    def test_rerun_changed_skips_unchanged_statements(self):
+        """Test that only statements from the first change onward are rerun."""
+        reader = self.rerun("calls.append('load')\nx = 1\ncalls.append(x)")
+        self.assertEqual(self.namespace["calls"], ["load", 1])
+        self.assertEqual(reader.msg, "skipped 0, ran 3 of 3 statements")
+
+        reader = self.rerun("calls.append('load')\nx = 2\ncalls.append(x)")
+        self.assertEqual(self.namespace["calls"], ["load", 1, 2])
+        self.assertEqual(reader.msg, "skipped 1, ran 2 of 3 statements")
+
+    def test_rerun_changed_nothing_changed(self):
+        """Test rerunning input that hasn't changed."""
+        self.rerun("calls.append(1)")
+        reader = self.rerun("calls.append(1)")
+        self.assertEqual(self.namespace["calls"], [1])
+        self.assertEqual(reader.msg, "nothing changed")
+
+    def test_rerun_changed_after_error(self):
+        """Test that statements after a failure are run next time."""
+        with patch("traceback.print_exc") as print_exc:
+            reader = self.rerun("calls.append(1)\nundefined\ncalls.append(2)")
+        print_exc.assert_called_once()
+        self.assertEqual(reader.msg, "skipped 0, ran 1 of 3 statements")
+
+        self.namespace["undefined"] = None
+        reader = self.rerun("calls.append(1)\nundefined\ncalls.append(2)")
+        self.assertEqual(self.namespace["calls"], [1, 2])
+        self.assertEqual(reader.msg, "skipped 1, ran 2 of 3 statements")
+
+    def test_rerun_changed_syntax_error(self):
+        """Test that invalid input isn't run."""
+        reader = self.rerun("calls.append(1)\nx = (")
+        self.assertEqual(self.namespace["calls"], [])
+        self.assertEqual(reader.history, [])
+
+    def test_rerun_changed_history_navigation(self):
+        """Test moving through history after rerunning the input."""
+        reader = create_historical_reader("calls.append(1)", history=["old"])
+
+        rerun_changed(reader)
+        reader.do_cmd(("next-history", []))
+        self.assertIn("end of history list", reader.msg)
+        reader.do_cmd(("previous-history", []))
+        self.assertBufferEquals(reader, "calls.append(1)")
+        reader.do_cmd(("previous-history", []))
+        self.assertBufferEquals(reader, "old")
+
+
+class TestTimeit(NamespaceTestMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.result = TimingResult(
+            loops=1000,
+            repeat=5,
+            mean=2e-6,
+            stdev=1e-7,
+            best=1.9e-6,
+        )
+        patcher = patch("pyrepl_hacks.commands.time_source", return_value=self.result)
+        self.time_source = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_timeit_buffer(self):
+        """Test timing the whole input and keeping it intact."""
+        reader = self.create_reader("x = 1\n\ny = 2", pos=3)
+
+        timeit_buffer(reader)
+
+        self.time_source.assert_called_once_with("x = 1\n\ny = 2", self.namespace)
+        self.assertEqual(reader.msg, str(self.result))
+        self.assertBufferEquals(reader, "x = 1\n\ny = 2")
+        self.assertPositionEquals(reader, 3)
+
+    def test_timeit_paragraph(self):
+        """Test timing only the paragraph under the cursor."""
+        reader = self.create_reader("x = 1\n\ny = 2\nz = 3", pos=9)
+
+        timeit_paragraph(reader)
+
+        self.time_source.assert_called_once_with("y = 2\nz = 3", self.namespace)
+
+    def test_timeit_empty(self):
+        """Test timing an empty input."""
+        reader = self.create_reader("  \n")
+
+        timeit_buffer(reader)
+
+        self.time_source.assert_not_called()
+        self.assertTrue(reader.dirty)
+
+    def test_timeit_error(self):
+        """Test that errors while timing are printed."""
+        self.time_source.side_effect = NameError("name 'x' is not defined")
+        reader = self.create_reader("x")
+
+        with patch("traceback.print_exc") as print_exc:
+            timeit_buffer(reader)
+
+        print_exc.assert_called_once()
+        self.assertFalse(hasattr(reader, "msg"))
+
+
+class TestTimeitBackground(unittest.TestCase, ReaderTestMixin):
+    def setUp(self):
+        self.cancelled = MagicMock()
+        self.callbacks = []
+        start_patches(
+            self,
+            patch(
+                "pyrepl_hacks.commands.call_soon",
+                lambda callback: callback(self.reader),
+            ),
+            patch("pyrepl_hacks.commands.get_namespace", dict),
+            patch("pyrepl_hacks.commands._timeit_cancelled", None),
+            patch(
+                "pyrepl_hacks.commands.time_in_background",
+                side_effect=self.start_timing,
+            ),
+        )
+
+    def start_timing(self, source, namespace, callback):
+        self.callbacks.append(callback)
+        return self.cancelled
+
+    def test_timeit_background(self):
+        """Test timing in the background and showing the result when done."""
+        self.reader = self.create_reader("x = 1")
+        result = TimingResult(loops=10, repeat=5, mean=0.1, stdev=0.01, best=0.09)
+
+        timeit_background(self.reader)
+        self.assertEqual(self.reader.msg, "timing in background...")
+
+        self.callbacks[0](result)
+        self.assertEqual(self.reader.msg, str(result))
+        self.assertBufferEquals(self.reader, "x = 1")
+
+    def test_timeit_background_only_one_at_a_time(self):
+        """Test that only one background timing can run at once."""
+        self.reader = self.create_reader("x = 1")
+
+        timeit_background(self.reader)
+        timeit_background(self.reader)
+
+        self.assertEqual(len(self.callbacks), 1)
+
+    def test_cancel_timeit(self):
+        """Test cancelling a background timing."""
+        self.reader = self.create_reader("x = 1")
+
+        timeit_background(self.reader)
+        cancel_timeit(self.reader)
+        self.cancelled.set.assert_called_once()
+
+        self.callbacks[0](TimingCancelled())
+        self.assertEqual(self.reader.msg, "timing cancelled")
+
+    def test_cancel_timeit_when_not_timing(self):
+        """Test cancelling when no timing is running."""
+        self.reader = self.create_reader("x = 1")
+
+        cancel_timeit(self.reader)
+
+        self.assertTrue(self.reader.dirty)
+        self.cancelled.set.assert_not_called()
+
+
+class TestRunBackground(unittest.TestCase, ReaderTestMixin):
+    def setUp(self):
+        self.namespace = {}
+        self.finished = threading.Event()
+        self.callbacks = []
+
+        def call_soon(callback):
+            self.callbacks.append(callback)
+            self.finished.set()
+
+        start_patches(
+            self,
+            patch("pyrepl_hacks.commands.call_soon", call_soon),
+            patch("pyrepl_hacks.commands.get_namespace", lambda: self.namespace),
+        )
+
+    def test_run_background(self):
+        """Test running the input in the background and clearing the buffer."""
+        reader = self.create_reader("total = sum(range(10))\ntotal")
+        reader.history = []
+
+        run_background(reader)
+
+        self.assertBufferEquals(reader, "")
+        self.assertPositionEquals(reader, 0)
+        self.assertEqual(reader.history, ["total = sum(range(10))\ntotal"])
+        self.assertEqual(reader.msg, "[bg] job 1 started (see _bg[0])")
+
+        self.assertTrue(self.finished.wait(timeout=10))
+        self.callbacks[0](reader)
+        self.assertRegex(reader.msg, r"\[bg\] job 1 done in \d+\.\ds")
+        self.assertEqual(self.namespace["_bg"][0].result, 45)
+
+    def test_run_background_failure(self):
+        """Test that failed jobs are reported."""
+        reader = self.create_reader("1 / 0")
+        reader.history = []
+
+        run_background(reader)
+
+        self.assertTrue(self.finished.wait(timeout=10))
+        self.callbacks[0](reader)
+        self.assertEqual(
+            reader.msg,
+            "[bg] job 1 failed: ZeroDivisionError: division by zero",
+        )
+
+    def test_run_background_syntax_error(self):
+        """Test that invalid input is kept and not run."""
+        reader = self.create_reader("x = (")
+        reader.history = []
+
+        run_background(reader)
+
+        self.assertBufferEquals(reader, "x = (")
+        self.assertEqual(reader.history, [])
+        self.assertNotIn("_bg", self.namespace)
+
+    def test_run_background_history_navigation(self):
+        """Test moving through history after starting a job."""
+        reader = create_historical_reader("x = 1", history=["old"])
+
+        run_background(reader)
+        self.assertTrue(self.finished.wait(timeout=10))
+        reader.do_cmd(("next-history", []))
+        self.assertIn("end of history list", reader.msg)
+        reader.do_cmd(("previous-history", []))
+        self.assertBufferEquals(reader, "x = 1")
+        reader.do_cmd(("next-history", []))
+        self.assertBufferEquals(reader, "")
+
+        reader.finish()
+        self.assertEqual(reader.history, ["old", "x = 1"])
+
+
+class TestShowHelp(unittest.TestCase, ReaderTestMixin):
+    def setUp(self):
+        self.callbacks = []
+        self.rendered = []
+        self.namespace = {"json": __import__("json")}
+        start_patches(
+            self,
+            patch("pyrepl_hacks.commands.call_soon", self.callbacks.append),
+            patch("pyrepl_hacks.commands.get_namespace", lambda: self.namespace),
+            patch("pyrepl_hacks.commands.cached_help", lambda obj: None),
+            patch("pyrepl_hacks.commands.render_help_in_background", self.render),
+            patch("pyrepl_hacks.commands.show_in_pager", MagicMock()),
+        )
+
+    def render(self, obj, callback):
+        self.rendered.append(obj)
+        callback(f"help on {obj.__name__}")
+
+    def test_show_help(self):
+        """Test rendering help in the background and then paging it."""
+        import json
+
+        from pyrepl_hacks import commands
+
+        reader = self.create_reader("json.dumps(data)", pos=7)
+
+        show_help(reader)
+
+        self.assertEqual(self.rendered, [json.dumps])
+        self.assertEqual(reader.msg, "rendering help on json.dumps...")
+        commands.show_in_pager.assert_not_called()
+        self.callbacks[0](reader)
+        commands.show_in_pager.assert_called_once_with(
+            reader,
+            "help on dumps",
+            "help on json.dumps",
+        )
+
+    def test_show_cached_help(self):
+        """Test that cached help is shown right away."""
+        from pyrepl_hacks import commands
+
+        reader = self.create_reader("len(x)", pos=1)
+
+        with patch("pyrepl_hacks.commands.cached_help", return_value="cached"):
+            show_help(reader)
+
+        self.assertEqual(self.rendered, [])
+        commands.show_in_pager.assert_called_once_with(reader, "cached", "help on len")
+
+    def test_show_help_errors(self):
+        """Test showing help with no name or an undefined name."""
+        for text in ["x = 1", "undefined_name"]:
+            with self.subTest(text=text):
+                reader = self.create_reader(text, pos=2)
+                reader.error = MagicMock()
+                show_help(reader)
+                reader.error.assert_called_once()
+        self.assertEqual(self.rendered, [])
+
+
+class TestShowSignature(NamespaceTestMixin, unittest.TestCase):
+    def test_show_signature(self):
+        """Test showing the signature of the call the cursor is in."""
+        self.namespace["greet"] = lambda name, greeting="Hi": None
+        reader = self.create_reader("greet('Trey', )", pos=14)
+
+        show_signature(reader)
+
+        self.assertEqual(reader.msg, "greet(name, greeting='Hi')")
+        self.assertBufferEquals(reader, "greet('Trey', )")
+
+    def test_show_signature_not_found(self):
+        """Test showing a signature outside of a call."""
+        reader = self.create_reader("x = 1")
+        reader.error = MagicMock()
+
+        show_signature(reader)
+
+        reader.error.assert_called_once_with("no signature found")
+
+
+class TestAutoImport(NamespaceTestMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.index = MagicMock()
+        self.index.modules_for.return_value = ["collections", "typing"]
+        patcher = patch(
+            "pyrepl_hacks.commands.get_import_index",
+            return_value=self.index,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_auto_import(self):
+        """Test inserting an import line at the top of the input."""
+        reader = self.create_reader("counts = defaultdict(int)", pos=15)
+
+        auto_import(reader)
+
+        self.index.modules_for.assert_called_once_with("defaultdict")
+        self.assertBufferEquals(
+            reader,
+            "from collections import defaultdict\ncounts = defaultdict(int)",
+        )
+        self.assertPositionEquals(reader, 51)
+        self.assertEqual(
+            reader.msg,
+            "from collections import defaultdict (also in typing)",
+        )
+
+    def test_auto_import_module(self):
+        """Test importing a module by name (using the first part of the name)."""
+        self.index.modules_for.return_value = ["json"]
+        reader = self.create_reader("json.dumps(data)", pos=7)
+
+        auto_import(reader)
+
+        self.index.modules_for.assert_called_once_with("json")
+        self.assertBufferEquals(reader, "import json\njson.dumps(data)")
+
+    def test_auto_import_index_not_ready(self):
+        """Test that nothing is inserted while the index is being built."""
+        self.index.ready.is_set.return_value = False
+        reader = self.create_reader("Path.cwd()", pos=2)
+
+        auto_import(reader)
+
+        self.assertBufferEquals(reader, "Path.cwd()")
+        self.assertIn("building import index", reader.msg)
+
+    def test_auto_import_errors(self):
+        """Test names that are defined, already imported, or unknown."""
+        self.namespace["defined"] = 1
+        cases = [
+            ("defined + 1", ["collections"]),
+            ("from collections import thing\nthing", ["collections"]),
+            ("unknown_name", []),
+            ("1 + 2", []),
+        ]
+        for text, modules in cases:
+            with self.subTest(text=text):
+                self.index.modules_for.return_value = modules
+                reader = self.create_reader(text, pos=len(text) - 1)
+                reader.error = MagicMock()
+                auto_import(reader)
+                reader.error.assert_called_once()
+                self.assertBufferEquals(reader, text)
+
+
+class TestCommandPalette(unittest.TestCase, ReaderTestMixin):
+    def setUp(self):
+        start_patches(
+            self,
+            patch("pyrepl_hacks.command_utils._command_index", None),
+            patch("pyrepl_hacks.minibuffer_utils._pickers", {}),
+            patch("pyrepl_hacks.minibuffer_utils.add_input_hook"),
+        )
+
+    def create_reader(self, text="", pos=None):
+        reader = super().create_reader(text, pos)
+        reader.msg = ""
+        reader.push_input_trans = MagicMock()
+        reader.pop_input_trans = MagicMock()
+        reader.commands = {
+            "dedent": type("dedent", (), {"__doc__": "Dedent the block."}),
+            "move-line-down": type("move_line_down", (), {}),
+        }
+        return reader
+
+    def test_command_palette_lists_commands(self):
+        """Test that the palette shows commands with their docstrings."""
+        reader = self.create_reader()
+
+        command_palette(reader)
+
+        reader.push_input_trans.assert_called_once()
+        self.assertEqual(
+            reader.msg,
+            "command: \n> dedent  Dedent the block.\n  move-line-down",
+        )
+
+    def test_command_palette_runs_picked_command(self):
+        """Test that picking a command runs it."""
+        reader = self.create_reader()
+        ran = []
+        reader.commands["move-line-down"].__init__ = lambda self, reader, name, event: (
+            ran.append(name)
+        )
+        reader.commands["move-line-down"].do = lambda self: ran.append("do")
+        reader.commands["move-line-down"].finish = False
+
+        command_palette(reader)
+        for char in "mld":
+            picker_add_character(reader, "self-insert", [char]).do()
+        picker_accept(reader, "accept", ["\r"]).do()
+
+        self.assertEqual(ran, ["move-line-down", "do"])
+        reader.pop_input_trans.assert_called_once()
+
+    def test_command_palette_reports_errors(self):
+        """Test that a failing command shows an error instead of raising."""
+        reader = self.create_reader()
+        reader.error = MagicMock()
+        reader.commands["dedent"].do = lambda self: 1 / 0
+        reader.commands["dedent"].__init__ = lambda self, *args: None
+
+        command_palette(reader)
+        picker_accept(reader, "accept", ["\r"]).do()
+
+        reader.error.assert_called_once_with("dedent failed: division by zero")
+
+
+class TestExpandSnippet(unittest.TestCase, ReaderTestMixin):
+    def setUp(self):
+        self.library = SnippetLibrary()
+        self.library.add("fori", "for ${1:i} in range($2):\n    $0")
+        start_patches(
+            self,
+            patch("pyrepl_hacks.snippet_utils._pending_fields", {}),
+            patch("pyrepl_hacks.commands.get_snippet_library", lambda: self.library),
+        )
+
+    def create_reader(self, text="", pos=None):
+        reader = super().create_reader(text, pos)
+        reader.error = MagicMock()
+        return reader
+
+    def test_expand_then_visit_fields(self):
+        """Test expanding a snippet and pressing the key again for each field."""
+        reader = self.create_reader("fori")
+
+        expand_snippet(reader)
+        self.assertBufferEquals(reader, "for i in range():\n    ")
+        self.assertPositionEquals(reader, 5)
+
+        expand_snippet(reader)
+        self.assertPositionEquals(reader, 15)
+        next_snippet_field(reader)
+        self.assertPositionEquals(reader, 22)
+
+        next_snippet_field(reader)
+        reader.error.assert_called_once_with("no more snippet fields")
+
+    def test_expand_unknown_snippet(self):
+        """Test the error when there's no snippet or field to go to."""
+        reader = self.create_reader("x = fo")
+
+        expand_snippet(reader)
+
+        self.assertBufferEquals(reader, "x = fo")
+        reader.error.assert_called_once_with("no snippet here")
+
+    def test_expand_unreadable_snippet_file(self):
+        """Test the error when the snippet file can't be read."""
+        self.library.load("/nonexistent/snippets.toml")
+        reader = self.create_reader("fori")
+
+        expand_snippet(reader)
+
+        self.assertBufferEquals(reader, "fori")
+        reader.error.assert_called_once()
+        self.assertIn("can't load snippets", reader.error.call_args[0][0])
+
+    def test_expand_invalid_snippet_file(self):
+        """Test the error when the snippet file has a template that isn't a string."""
+        reader = self.create_reader("fori")
+
+        error = TypeError("Snippet fori in snippets.toml must be a string")
+        with patch.object(self.library, "get", side_effect=error):
+            expand_snippet(reader)
+
+        self.assertBufferEquals(reader, "fori")
+        reader.error.assert_called_once_with(f"can't load snippets: {error}")
+
+
+class TestKillRingBrowse(unittest.TestCase, ReaderTestMixin):
+    def setUp(self):
+        start_patches(
+            self,
+            patch("pyrepl_hacks.minibuffer_utils._pickers", {}),
+            patch("pyrepl_hacks.minibuffer_utils.add_input_hook"),
+        )
+
+    def create_reader(self, text="", pos=None):
+        reader = super().create_reader(text, pos)
+        reader.msg = ""
+        reader.kill_ring = [list("first"), list("second\nline"), list("third")]
+        reader.push_input_trans = MagicMock()
+        reader.pop_input_trans = MagicMock()
+        reader.error = MagicMock()
+        reader.insert = lambda text: reader.buffer.extend(text)
+        return reader
+
+    def test_kill_ring_browse(self):
+        """Test picking an older kill inserts it and makes it the newest."""
+        reader = self.create_reader("x = ")
+
+        kill_ring_browse(reader)
+        self.assertEqual(
+            reader.msg,
+            "yank: \n> third\n  second  (+1 lines)\n  first",
+        )
+        picker_add_character(reader, "self-insert", ["f"]).do()
+        picker_accept(reader, "accept", ["\r"]).do()
+
+        self.assertBufferEquals(reader, "x = first")
+        self.assertEqual(reader.kill_ring[-1], list("first"))
+        self.assertEqual(len(reader.kill_ring), 3)
+
+    def test_kill_ring_browse_empty(self):
+        """Test the error when nothing has been killed."""
+        reader = self.create_reader()
+        reader.kill_ring = []
+
+        kill_ring_browse(reader)
+
+        reader.error.assert_called_once_with("nothing to yank")
+
+
+class TestRegionCommands(unittest.TestCase, ReaderTestMixin):
+    def setUp(self):
+        start_patches(
+            self,
+            patch("pyrepl_hacks.region_utils._marks", {}),
+            patch("pyrepl_hacks.region_utils.add_command_hook"),
+            patch("pyrepl_hacks.region_utils.add_input_hook"),
+        )
+
+    def create_reader(self, text="", pos=None):
+        reader = super().create_reader(text, pos)
+        reader.msg = ""
+        reader.error = MagicMock()
+        return reader
+
+    def test_set_mark_and_exchange(self):
+        """Test setting the mark and swapping it with the cursor."""
+        reader = self.create_reader("one\ntwo", pos=1)
+
+        exchange_point_and_mark(reader)
+        reader.error.assert_called_once_with("no mark set")
+
+        set_mark(reader)
+        self.assertEqual(reader.msg, "mark set")
+        reader.pos = 6
+        exchange_point_and_mark(reader)
+        self.assertPositionEquals(reader, 1)
+
+    def test_region_line_commands(self):
+        """Test the commands that transform the lines in the region."""
+        reader = self.create_reader("c = 3\nb = 2\na = 1\nprint(a)", pos=0)
+        set_mark(reader)
+        reader.pos = 13
+
+        sort_lines(reader)
+        self.assertBufferEquals(reader, "a = 1\nb = 2\nc = 3\nprint(a)")
+        indent_region(reader)
+        self.assertBufferEquals(reader, "    a = 1\n    b = 2\n    c = 3\nprint(a)")
+        dedent_region(reader)
+        toggle_comment(reader)
+        self.assertBufferEquals(reader, "# a = 1\n# b = 2\n# c = 3\nprint(a)")
+        toggle_comment(reader)
+        duplicate_region(reader)
+        self.assertBufferEquals(
+            reader,
+            "a = 1\nb = 2\nc = 3\na = 1\nb = 2\nc = 3\nprint(a)",
+        )
+
+    def test_move_region_commands(self):
+        """Test moving the region and the errors at the top and bottom."""
+        reader = self.create_reader("one\ntwo", pos=0)
+
+        move_region_up(reader)
+        reader.error.assert_called_once_with("no line above")
+        move_region_down(reader)
+        self.assertBufferEquals(reader, "two\none")
+        self.assertPositionEquals(reader, 4)
+        move_region_down(reader)
+        reader.error.assert_called_with("no line below")
+
+
+class TestBracketCommands(unittest.TestCase, ReaderTestMixin):
+    def setUp(self):
+        start_patches(
+            self,
+            patch("pyrepl_hacks.commands._bracket_indexes", {}),
+            patch("pyrepl_hacks.region_utils._marks", {}),
+            patch("pyrepl_hacks.region_utils.add_command_hook"),
+            patch("pyrepl_hacks.region_utils.add_input_hook"),
+        )
+
+    def create_reader(self, text="", pos=None):
+        reader = super().create_reader(text, pos)
+        reader.error = MagicMock()
+        return reader
+
+    def test_jump_to_matching_bracket(self):
+        """Test jumping between brackets, skipping brackets in strings."""
+        reader = self.create_reader('f(")", [1])', pos=1)
+
+        jump_to_matching_bracket(reader)
+        self.assertPositionEquals(reader, 10)
+        jump_to_matching_bracket(reader)
+        self.assertPositionEquals(reader, 1)
+
+        reader.buffer[-1:] = []
+        reader.pos = 10  # Just after a closing bracket
+        jump_to_matching_bracket(reader)
+        self.assertPositionEquals(reader, 7)
+        reader.pos = 1
+        jump_to_matching_bracket(reader)
+        reader.error.assert_called_once_with("no matching bracket")
+
+    def test_jump_errors_away_from_brackets(self):
+        """Test the error when there's no bracket at the cursor."""
+        reader = self.create_reader("x = 1", pos=2)
+        jump_to_matching_bracket(reader)
+        reader.error.assert_called_once_with("no bracket here")
+        self.assertPositionEquals(reader, 2)
+
+    def test_select_inside_brackets(self):
+        """Test selecting the inside of brackets, then the next pair out."""
+        reader = self.create_reader("f(a, [b, c])", pos=7)
+
+        select_inside_brackets(reader)
+        self.assertEqual((get_mark(reader), reader.pos), (6, 10))
+        select_inside_brackets(reader)
+        self.assertEqual((get_mark(reader), reader.pos), (2, 11))
+        select_inside_brackets(reader)
+        reader.error.assert_called_once_with("not inside brackets")
+
+
+class TestStructureCommands(unittest.TestCase, ReaderTestMixin):
+    CODE = "x = 1\n\ndef f(n):\n    for i in n:\n        print(i)\n\nf([x])"
+
+    def setUp(self):
+        start_patches(
+            self,
+            patch("pyrepl_hacks.region_utils._marks", {}),
+            patch("pyrepl_hacks.region_utils.add_command_hook"),
+            patch("pyrepl_hacks.region_utils.add_input_hook"),
+        )
+
+    def create_reader(self, text=CODE, pos=None):
+        reader = super().create_reader(text, pos)
+        reader.error = MagicMock()
+        return reader
+
+    def test_previous_and_next_statement(self):
+        """Test moving between top-level statements, skipping nested lines."""
+        reader = self.create_reader(pos=0)
+
+        next_statement(reader)
+        self.assertPositionEquals(reader, 7)
+        next_statement(reader)
+        self.assertPositionEquals(reader, 51)
+        next_statement(reader)
+        self.assertPositionEquals(reader, 57)
+        reader.error.assert_called_once_with("end of buffer")
+
+        reader.pos = 40  # Inside the for loop
+        previous_statement(reader)
+        self.assertPositionEquals(reader, 7)
+        previous_statement(reader)
+        self.assertPositionEquals(reader, 0)
+        previous_statement(reader)
+        reader.error.assert_called_with("start of buffer")
+
+    def test_jump_to_enclosing_block(self):
+        """Test jumping out to each enclosing block's header in turn."""
+        reader = self.create_reader(pos=45)  # On print(i)
+
+        jump_to_enclosing_block(reader)
+        self.assertPositionEquals(reader, 21)
+        jump_to_enclosing_block(reader)
+        self.assertPositionEquals(reader, 7)
+        jump_to_enclosing_block(reader)
+        reader.error.assert_called_once_with("not in a block")
+
+    def test_select_block(self):
+        """Test selecting the block's lines, then the next block out."""
+        reader = self.create_reader(pos=45)
+
+        select_block(reader)
+        self.assertEqual((get_mark(reader), reader.pos), (17, 49))
+        select_block(reader)
+        self.assertEqual((get_mark(reader), reader.pos), (7, 49))
+        select_block(reader)
+        reader.error.assert_called_once_with("not in a block")
+
+    def test_works_on_invalid_code(self):
+        """Test that the motions fall back to indentation for invalid code."""
+        reader = self.create_reader(self.CODE.replace("print(i)", "print(i"), pos=45)
+        jump_to_enclosing_block(reader)
+        self.assertPositionEquals(reader, 21)
+
+
+class TestQueryReplaceRegexp(unittest.TestCase, ReaderTestMixin):
+    def setUp(self):
+        *_, self.add_mark_input_hook = start_patches(
+            self,
+            patch("pyrepl_hacks.minibuffer_utils._pickers", {}),
+            patch("pyrepl_hacks.minibuffer_utils.add_input_hook"),
+            patch("pyrepl_hacks.replace_utils._sessions", {}),
+            patch("pyrepl_hacks.replace_utils.add_input_hook"),
+            patch("pyrepl_hacks.region_utils._marks", {}),
+            patch("pyrepl_hacks.region_utils.add_command_hook"),
+            patch("pyrepl_hacks.region_utils.add_input_hook"),
+        )
+
+    def create_reader(self, text="a = 1\nb = 2\nc = 3", pos=None):
+        reader = super().create_reader(text, pos)
+        reader.msg = ""
+        reader.push_input_trans = MagicMock()
+        reader.pop_input_trans = MagicMock()
+        return reader
+
+    def type_text(self, reader, text):
+        for char in text:
+            picker_add_character(reader, "self-insert", [char]).do()
+
+    def test_previews_count_and_replaces_all(self):
+        """Test the match count preview and replacing every match."""
+        reader = self.create_reader()
+        query_replace_regexp(reader)
+        self.type_text(reader, r"(\w) = ")
+        self.assertEqual(reader.msg, "replace regexp: (\\w) = \n> 3 matches")
+        picker_accept(reader, "accept", ["\r"]).do()
+        self.type_text(reader, r"\1: ")
+        self.assertIn("replace 3 matches ('a = ' -> 'a: ')", reader.msg)
+        picker_accept(reader, "accept", ["\r"]).do()
+
+        self.assertBufferEquals(reader, "a: 1\nb: 2\nc: 3")
+        self.assertEqual(reader.msg, "replaced 3 matches")
+
+    def test_steps_through_region(self):
+        """Test stepping through just the matches in the region's lines."""
+        reader = self.create_reader(pos=6)
+        set_mark(reader)
+        reader.pos = 13
+        query_replace_regexp(reader)
+        self.type_text(reader, r"\d")
+        self.assertIn("2 matches", reader.msg)
+        picker_accept(reader, "accept", ["\r"]).do()
+        self.type_text(reader, "0")
+        picker_next(reader, "down", []).do()
+        picker_accept(reader, "accept", ["\r"]).do()
+        query_replace_yes(reader, "y", ["y"]).do()
+        query_replace_yes(reader, "y", ["y"]).do()
+
+        self.assertBufferEquals(reader, "a = 1\nb = 0\nc = 0")
+
+    def test_mark_from_earlier_input_ignored(self):
+        """Test that a mark set in an earlier input doesn't limit the search."""
+        reader = self.create_reader(pos=6)
+        set_mark(reader)
+        (hook,) = self.add_mark_input_hook.call_args.args
+        hook(reader)  # The next input starts
+        reader.buffer[:], reader.pos = list("x = 1\ny = 2\nz = 3"), 13
+
+        query_replace_regexp(reader)
+        self.type_text(reader, r"\d")
+        self.assertIn("3 matches", reader.msg)
+
+    def test_invalid_pattern_has_no_matches(self):
+        """Test that an invalid pattern shows no matches."""
+        reader = self.create_reader()
+        query_replace_regexp(reader)
+        self.type_text(reader, "(")
+        self.assertEqual(reader.msg, "replace regexp: (\n  (no matches)")
@@ -0,0 +1,152 @@
+import collections
+import gc
+import rlcompleter
+import threading
+import unittest
+import weakref
+from unittest.mock import patch
+
+from pyrepl_hacks import completion_utils
+from pyrepl_hacks.completion_utils import (
+    AttributeCache,
+    CachedCompleter,
+    disable_completion_cache,
+    enable_completion_cache,
+)
+
+
+class SlowDir:
+    """An object whose dir() blocks until it's released."""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def __dir__(self):
+        self.release.wait(timeout=10)
+        return ["slow_attribute"]
+
+
+class TestAttributeCache(unittest.TestCase):
+    def test_names_cached(self):
+        """Test that attribute names are only computed once per object."""
+        cache = AttributeCache()
+        with patch.object(
+            completion_utils,
+            "_attribute_names",
+            wraps=completion_utils._attribute_names,
+        ) as attribute_names:
+            first = cache.names(collections)
+            second = cache.names(collections)
+        attribute_names.assert_called_once_with(collections)
+        self.assertIs(first, second)
+        self.assertEqual(first, sorted(first))
+
+    def test_invalidated_when_attributes_added(self):
+        """Test that adding an attribute invalidates the cached names."""
+
+        class Thing:
+            pass
+
+        thing = Thing()
+        cache = AttributeCache()
+        self.assertNotIn("color", cache.names(thing))
+        thing.color = "blue"
+        self.assertIn("color", cache.names(thing))
+
+    def test_invalidated_after_max_age(self):
+        """Test that old names are computed again."""
+        cache = AttributeCache(max_age=0)
+        first = cache.names(collections)
+        self.assertIsNot(cache.names(collections), first)
+
+    def test_cached_objects_can_be_collected(self):
+        """Test that the cache doesn't keep completed objects alive."""
+
+        class Frame:
+            pass
+
+        frame = Frame()
+        reference = weakref.ref(frame)
+        cache = AttributeCache()
+        cache.names(frame)
+        del frame
+        gc.collect()
+        self.assertIsNone(reference())
+
+    def test_objects_without_weak_references(self):
+        """Test that ints and lists are cached under their type."""
+        cache = AttributeCache()
+        names = cache.names([1, 2])
+        self.assertIn("append", names)
+        self.assertIs(cache.names([3]), names)
+        self.assertIn("bit_length", cache.names(5))
+
+    def test_slow_objects_filled_in_background(self):
+        """Test that slow dir() calls don't block past the time budget."""
+        cache = AttributeCache(budget=0.01)
+        slow = SlowDir()
+        self.assertIsNone(cache.names(slow))
+        self.assertIsNone(cache.names(slow))  # Still computing
+        slow.release.set()
+        cache.budget = 10
+        self.assertIn("slow_attribute", cache.names(slow))
+
+
+class TestCachedCompleter(unittest.TestCase):
+    def test_same_matches_as_rlcompleter(self):
+        """Test that matches agree with the standard completer."""
+        namespace = {"collections": collections, "numbers": [1, 2]}
+        standard = rlcompleter.Completer(namespace)
+        cached = CachedCompleter(namespace)
+        for text in [
+            "collections.Or",
+            "collections.",
+            "collections._",
+            "collections.__",
+            "numbers.",
+            "numbers.__cl",
+            "numbers.nope",
+            "undefined.x",
+        ]:
+            with self.subTest(text=text):
+                self.assertEqual(
+                    cached.attr_matches(text),
+                    standard.attr_matches(text),
+                )
+
+    def test_complete(self):
+        """Test the readline-style complete method."""
+        completer = CachedCompleter({"collections": collections})
+        self.assertEqual(
+            completer.complete("collections.Ordered", 0),
+            "collections.OrderedDict(",
+        )
+        self.assertIsNone(completer.complete("collections.Ordered", 1))
+
+    def test_slow_object_message(self):
+        """Test that a message is shown when names aren't ready yet."""
+        slow = SlowDir()
+        completer = CachedCompleter({"slow": slow}, AttributeCache(budget=0.01))
+        with patch("pyrepl_hacks.completion_utils.call_soon") as call_soon:
+            self.assertEqual(completer.attr_matches("slow.s"), [])
+        call_soon.assert_called_once()
+        slow.release.set()
+
+
+class TestEnableCompletionCache(unittest.TestCase):
+    def test_enable_and_disable(self):
+        """Test installing and uninstalling the cached completer."""
+        from _pyrepl.readline import _wrapper
+
+        original = _wrapper.config.readline_completer
+        self.addCleanup(setattr, _wrapper.config, "readline_completer", original)
+        run_now = patch(
+            "pyrepl_hacks.completion_utils.call_soon",
+            lambda callback: callback(None),
+        )
+        with run_now:
+            enable_completion_cache()
+            completer = _wrapper.config.readline_completer
+            self.assertIsInstance(completer.__self__, CachedCompleter)
+            disable_completion_cache()
+        self.assertIs(_wrapper.config.readline_completer, original)
@@ -0,0 +1,114 @@
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+from pyrepl_hacks.exec_utils import (
+    compile_source,
+    fingerprint_statements,
+    get_namespace,
+    run_source,
+    show_in_pager,
+    split_statements,
+    suspend_console,
+)
+
+from .support import MockReader
+
+
+class TestExecUtils(unittest.TestCase):
+    def test_get_namespace(self):
+        """Test that the namespace is the __main__ module's namespace."""
+        self.assertIs(get_namespace(), vars(sys.modules["__main__"]))
+
+    def test_compile_source_with_final_expression(self):
+        """Test compiling code that ends in an expression."""
+        namespace = {}
+        statements, expression = compile_source("x = 2\nx * 3", "<test>")
+        exec(statements, namespace)  # noqa: S102
+        self.assertEqual(eval(expression, namespace), 6)
+
+    def test_compile_source_without_final_expression(self):
+        """Test compiling code that ends in a statement."""
+        namespace = {}
+        statements, expression = compile_source("x = 2\ny = x * 3", "<test>")
+        exec(statements, namespace)  # noqa: S102
+        self.assertIsNone(expression)
+        self.assertEqual(namespace["y"], 6)
+
+    def test_compile_source_syntax_error(self):
+        """Test compiling invalid code."""
+        with self.assertRaises(SyntaxError):
+            compile_source("x = (", "<test>")
+
+    def test_split_statements(self):
+        """Test splitting code into top-level statements."""
+        source = "a = 1; b = 2\n\n@decorator\nclass A:\n    pass\nprint(a,\n      b)\n"
+        self.assertEqual(
+            split_statements(source),
+            [
+                (1, "a = 1; b = 2\n"),
+                (3, "@decorator\nclass A:\n    pass\n"),
+                (6, "print(a,\n      b)\n"),
+            ],
+        )
+
+    def test_fingerprint_statements_chained(self):
+        """Test that fingerprints depend on the statements before them."""
+        first = fingerprint_statements(["a = 1", "b = 2", "c = 3"])
+        second = fingerprint_statements(["a = 1", "b = 20", "c = 3"])
+        self.assertEqual(first[0], second[0])
+        self.assertNotEqual(first[1], second[1])
+        self.assertNotEqual(first[2], second[2])
+        self.assertEqual(first, fingerprint_statements(["a = 1\n", " b = 2", "c = 3"]))
+
+    def test_run_source_displays_final_expression(self):
+        """Test that the final expression is shown with sys.displayhook."""
+        namespace = {}
+        with patch("sys.displayhook") as displayhook:
+            run_source("x = 2\nx * 3", namespace, "<test>")
+        displayhook.assert_called_once_with(6)
+        self.assertEqual(namespace["x"], 2)
+
+    def test_run_source_prints_exceptions(self):
+        """Test that exceptions (including syntax errors) are printed."""
+        for source in ["1 / 0", "x = ("]:
+            with self.subTest(source=source):
+                with patch("traceback.print_exc") as print_exc:
+                    run_source(source, {}, "<test>")
+                print_exc.assert_called_once()
+
+    def test_suspend_console(self):
+        """Test that the console is restored and prepared again."""
+        reader = MockReader("x = 1")
+        reader.console = MagicMock()
+
+        with suspend_console(reader):
+            reader.console.restore.assert_called_once()
+            reader.console.prepare.assert_not_called()
+
+        reader.console.prepare.assert_called_once()
+        self.assertTrue(reader.last_refresh_cache.invalidated)
+        self.assertTrue(reader.dirty)
+        self.assertEqual(reader.get_unicode(), "x = 1")
+
+    def test_suspend_console_after_error(self):
+        """Test that the console is prepared again after an exception."""
+        reader = MockReader()
+        reader.console = MagicMock()
+
+        with self.assertRaises(KeyboardInterrupt), suspend_console(reader):
+            raise KeyboardInterrupt
+
+        reader.console.prepare.assert_called_once()
+
+    def test_show_in_pager(self):
+        """Test showing text in the pager."""
+        reader = MockReader()
+        reader.console = MagicMock()
+        pager = MagicMock()
+
+        with patch("_pyrepl.pager.get_pager", return_value=pager):
+            show_in_pager(reader, "some text", "title")
+
+        pager.assert_called_once_with("some text", "title")
+        reader.console.prepare.assert_called_once()
@@ -0,0 +1,67 @@
+import unittest
+
+from pyrepl_hacks.fuzzy_utils import FuzzyIndex, fuzzy_score
+
+
+class TestFuzzyScore(unittest.TestCase):
+    def test_subsequence_matches(self):
+        """Test that characters must appear in order (but not together)."""
+        self.assertIsNotNone(fuzzy_score("mld", "move-line-down"))
+        self.assertIsNone(fuzzy_score("dlm", "move-line-down"))
+
+    def test_word_starts_score_higher(self):
+        """Test that matching the start of words beats matching mid-word."""
+        self.assertGreater(
+            fuzzy_score("ml", "move-line"),
+            fuzzy_score("ml", "html"),
+        )
+
+    def test_empty_query_matches_everything(self):
+        """Test that an empty query matches with a score of zero."""
+        self.assertEqual(fuzzy_score("", "anything"), 0)
+
+
+class TestFuzzyIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = FuzzyIndex()
+        self.index.add("move-line-down", "Move the current line down.")
+        self.index.add("move-line-up", "Move the current line up.")
+        self.index.add("clear-screen", "Clear the screen.")
+        self.index.add("dedent", "Dedent the current code block.")
+
+    def test_len_and_contains(self):
+        """Test that the index knows which keys it has."""
+        self.assertEqual(len(self.index), 4)
+        self.assertIn("dedent", self.index)
+        self.assertNotIn("indent", self.index)
+
+    def test_empty_query_returns_all_keys(self):
+        """Test that every key matches an empty query, shortest first."""
+        self.assertEqual(
+            self.index.search(""),
+            ["dedent", "clear-screen", "move-line-up", "move-line-down"],
+        )
+
+    def test_name_matches_rank_first(self):
+        """Test that keys matching by name come before description matches."""
+        self.assertEqual(self.index.search("mld"), ["move-line-down"])
+        self.assertEqual(self.index.search("ded")[0], "dedent")
+        self.assertIn("move-line-up", self.index.search("current"))
+
+    def test_query_is_case_and_space_insensitive(self):
+        """Test that uppercase letters and spaces in queries are ignored."""
+        self.assertEqual(self.index.search("Clear S"), ["clear-screen"])
+
+    def test_incremental_search(self):
+        """Test extending, shortening, and changing the query."""
+        self.assertEqual(self.index.search("m"), ["move-line-up", "move-line-down"])
+        self.assertEqual(self.index.search("mlu"), ["move-line-up"])
+        self.assertEqual(self.index.search("ml"), ["move-line-up", "move-line-down"])
+        self.assertEqual(self.index.search("xyz"), [])
+        self.assertEqual(self.index.search("cs"), ["clear-screen"])
+
+    def test_added_keys_found_after_searching(self):
+        """Test that adding a key is seen by an extended query."""
+        self.assertEqual(self.index.search("in"), ["move-line-up", "move-line-down"])
+        self.index.add("indent", "Indent the current line.")
+        self.assertEqual(self.index.search("ind")[0], "indent")
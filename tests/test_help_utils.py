@@ -0,0 +1,237 @@
+import gc
+import json
+import os
+import threading
+import unittest
+import weakref
+from types import ModuleType
+from unittest.mock import MagicMock, patch
+
+from pyrepl_hacks import help_utils
+from pyrepl_hacks.help_utils import (
+    _show_signature_hint,
+    cached_help,
+    called_name_at,
+    format_signature,
+    name_at,
+    render_help,
+    render_help_in_background,
+    resolve_name,
+    signature_at,
+)
+
+from .support import MockReader
+
+
+class TestNameAt(unittest.TestCase):
+    def test_name_at_cursor(self):
+        """Test finding the name under the cursor."""
+        self.assertEqual(name_at("len(items)", 1), "len")
+        self.assertEqual(name_at("len(items)", 3), "len")
+        self.assertEqual(name_at("len(items)", 6), "items")
+
+    def test_dotted_name_up_to_cursor_word(self):
+        """Test that the name ends with the word under the cursor."""
+        text = "os.path.join(a, b)"
+        self.assertEqual(name_at(text, 1), "os")
+        self.assertEqual(name_at(text, 5), "os.path")
+        self.assertEqual(name_at(text, 10), "os.path.join")
+
+    def test_multiline(self):
+        """Test finding names on later lines."""
+        self.assertEqual(name_at("x = 1\nprint(x)", 8), "print")
+
+    def test_no_name(self):
+        """Test that there's no name outside of names."""
+        self.assertIsNone(name_at("x = 1", 3))
+        self.assertIsNone(name_at("", 0))
+
+
+class TestResolveName(unittest.TestCase):
+    def test_resolve_name(self):
+        """Test resolving names, attributes, and builtins."""
+        namespace = {"os": os}
+        self.assertIs(resolve_name("os.path.join", namespace), os.path.join)
+        self.assertIs(resolve_name("len", namespace), len)
+
+    def test_resolve_name_errors(self):
+        """Test resolving names that don't exist."""
+        with self.assertRaises(NameError):
+            resolve_name("undefined", {})
+        with self.assertRaises(AttributeError):
+            resolve_name("os.nope", {"os": os})
+
+
+class TestRenderHelp(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.object(help_utils, "_help_cache", help_utils.OrderedDict())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_render_help(self):
+        """Test rendering plain text help (without overstrike formatting)."""
+        text = render_help(json.dumps)
+        self.assertIn("function dumps in module json", text)
+        self.assertNotIn("\b", text)
+
+    def test_cached(self):
+        """Test that rendered help is cached by object identity."""
+        self.assertIsNone(cached_help(json.dumps))
+        with patch("pydoc.render_doc", return_value="help text") as render_doc:
+            render_help(json.dumps)
+            render_help(json.dumps)
+        render_doc.assert_called_once()
+        self.assertEqual(cached_help(json.dumps), "help text")
+        self.assertIsNone(cached_help(json.loads))
+
+    def test_cache_invalidated_by_module_version(self):
+        """Test that a new package version renders help again."""
+        module = ModuleType("fakepackage")
+        module.__version__ = "1.0"
+
+        def function():
+            pass
+
+        function.__module__ = "fakepackage.sub"
+        with patch.dict("sys.modules", {"fakepackage": module}):
+            render_help(function)
+            self.assertIsNotNone(cached_help(function))
+            module.__version__ = "2.0"
+            self.assertIsNone(cached_help(function))
+
+    def test_cached_objects_can_be_collected(self):
+        """Test that the help cache doesn't keep objects alive."""
+
+        def function():
+            pass
+
+        reference = weakref.ref(function)
+        with patch("pydoc.render_doc", return_value="help text"):
+            render_help(function)
+        del function
+        gc.collect()
+        self.assertIsNone(reference())
+
+    def test_instances_share_their_type_help(self):
+        """Test that ints (which can't be weakly referenced) are cached by type."""
+        with patch("pydoc.render_doc", return_value="help text") as render_doc:
+            render_help(5)
+            self.assertEqual(cached_help(7), "help text")
+        render_doc.assert_called_once_with(5)
+
+    def test_render_help_in_background(self):
+        """Test rendering help in a background thread."""
+        results = []
+        done = threading.Event()
+
+        def callback(outcome):
+            results.append(outcome)
+            done.set()
+
+        render_help_in_background(len, callback)
+        self.assertTrue(done.wait(timeout=10))
+        self.assertIn("len(obj, /)", results[0])
+
+
+class TestSignatures(unittest.TestCase):
+    def test_called_name_at(self):
+        """Test finding the name of the call the cursor is in."""
+        self.assertEqual(called_name_at("print(", 6), "print")
+        self.assertEqual(called_name_at("x = sorted(items, key=len", 25), "sorted")
+        self.assertEqual(called_name_at("f(\n    a,\n    ", 14), "f")
+        self.assertIsNone(called_name_at("print()", 7))
+        self.assertIsNone(called_name_at("(1, 2", 5))
+
+    def test_format_signature(self):
+        """Test formatting signatures."""
+
+        def greet(name, *, greeting="Hello"):
+            pass
+
+        self.assertEqual(
+            format_signature(greet, "greet"),
+            "greet(name, *, greeting='Hello')",
+        )
+        self.assertIsNone(format_signature(42, "x"))
+
+    def test_signatures_cached(self):
+        """Test that signatures are cached by object."""
+
+        def function(a, b):
+            pass
+
+        with (
+            patch.object(help_utils, "_signature_cache", help_utils.OrderedDict()),
+            patch("inspect.signature", wraps=help_utils.inspect.signature) as sig,
+        ):
+            format_signature(function, "function")
+            format_signature(function, "function")
+        sig.assert_called_once_with(function)
+
+    def test_bound_methods_not_kept_alive(self):
+        """Test that caching a method's signature doesn't keep its instance."""
+
+        class Frame:
+            def merge(self, other, *, how="inner"):
+                pass
+
+        frame = Frame()
+        reference = weakref.ref(frame)
+        self.assertEqual(
+            format_signature(frame.merge, "frame.merge"),
+            "frame.merge(other, *, how='inner')",
+        )
+        self.assertEqual(
+            format_signature(frame.merge, "frame.merge"),
+            "frame.merge(other, *, how='inner')",
+        )
+        del frame
+        gc.collect()
+        self.assertIsNone(reference())
+
+    def test_cached_callables_can_be_collected(self):
+        """Test that the signature cache doesn't keep callables alive."""
+
+        def function(a):
+            pass
+
+        reference = weakref.ref(function)
+        format_signature(function, "function")
+        del function
+        gc.collect()
+        self.assertIsNone(reference())
+
+    def test_unhashable_callable(self):
+        """Test that unhashable callables are inspected."""
+
+        class Unhashable:
+            __hash__ = None
+
+            def __call__(self, x):
+                pass
+
+        self.assertEqual(format_signature(Unhashable(), "obj"), "obj(x)")
+
+    def test_signature_at(self):
+        """Test resolving the called object in a namespace."""
+        namespace = {"os": os}
+        self.assertEqual(
+            signature_at("os.path.exists(", 15, namespace),
+            "os.path.exists(path)",
+        )
+        self.assertIsNone(signature_at("undefined(", 10, namespace))
+
+    def test_signature_hint_after_paren(self):
+        """Test that typing "(" shows the signature."""
+        reader = MockReader("divmod(")
+        reader.msg = ""
+        command = MagicMock(event_name="self-insert", event=["("])
+        with patch("pyrepl_hacks.help_utils.get_namespace", return_value={}):
+            _show_signature_hint(reader, command)
+        self.assertEqual(reader.msg, "divmod(x, y, /)")
+
+        reader = MockReader("divmod(1")
+        reader.msg = ""
+        command = MagicMock(event_name="self-insert", event=["1"])
+        _show_signature_hint(reader, command)
+        self.assertEqual(reader.msg, "")
@@ -0,0 +1,115 @@
+import re
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+from pyrepl_hacks.highlight_utils import LineHighlighter
+
+
+class FakeColorizer:
+    """Colorize keywords and (single-line) strings, recording each call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, source):
+        self.calls.append(source)
+        for match in re.finditer(r"\b(def|if|return)\b|'[^']*'|\"[^\"]*\"", source):
+            tag = "keyword" if match.group(1) else "string"
+            yield match.start(), match.end() - 1, tag
+
+
+class TestLineHighlighter(unittest.TestCase):
+    def setUp(self):
+        self.colorizer = FakeColorizer()
+        self.highlighter = LineHighlighter(self.colorizer)
+
+    def test_spans_offset_by_line(self):
+        """Test that spans are reported relative to the whole buffer."""
+        spans = list(self.highlighter("x = 1\nif x:\n    return 'a'"))
+        self.assertEqual(
+            spans,
+            [(6, 7, "keyword"), (16, 21, "keyword"), (23, 25, "string")],
+        )
+
+    def test_unchanged_lines_are_cached(self):
+        """Test that only edited lines are colorized again."""
+        list(self.highlighter("def f():\n    return 1"))
+        self.colorizer.calls.clear()
+
+        list(self.highlighter("def f():\n    return 12"))
+
+        self.assertEqual(self.colorizer.calls, ["    return 12"])
+
+    def test_state_change_recolorizes_following_lines(self):
+        """Test that lines after a newly opened string are colorized again."""
+        list(self.highlighter("x = 1\nif x:\n    return x"))
+        self.colorizer.calls.clear()
+
+        spans = list(self.highlighter('x = """\nif x:\n    return x'))
+
+        self.assertEqual(self.colorizer.calls, ['x = """'])
+        self.assertIn((8, 12, "string"), spans)
+        self.assertIn((14, 25, "string"), spans)
+        self.assertNotIn("keyword", [tag for *_, tag in spans])
+
+    def test_closing_quote_highlights_rest_of_line(self):
+        """Test a line that closes a string opened on an earlier line."""
+        spans = list(self.highlighter('"""\nend""" if x'))
+        self.assertIn((4, 9, "string"), spans)
+        self.assertIn((11, 12, "keyword"), spans)
+        self.assertEqual(self.colorizer.calls[-1], " if x")
+
+    def test_open_brackets_prefixed(self):
+        """Test that lines inside brackets are colorized with the brackets."""
+        spans = list(self.highlighter("f(\n    'a')"))
+        self.assertEqual(self.colorizer.calls[-1], "(    'a')")
+        self.assertEqual(spans, [(7, 9, "string")])
+
+    def test_lru_eviction(self):
+        """Test that the least recently used lines are evicted."""
+        highlighter = LineHighlighter(self.colorizer, maxsize=2)
+        list(highlighter("a"))
+        list(highlighter("b"))
+        list(highlighter("c"))
+        self.colorizer.calls.clear()
+
+        list(highlighter("a"))
+        list(highlighter("c"))
+
+        self.assertEqual(self.colorizer.calls, ["a"])
+
+    def test_cache_clear(self):
+        """Test clearing the highlighting cache."""
+        list(self.highlighter("if x"))
+        self.highlighter.cache_clear()
+        list(self.highlighter("if x"))
+        self.assertEqual(self.colorizer.calls, ["if x", "if x"])
+
+
+class TestEnableHighlightCache(unittest.TestCase):
+    def test_enable_and_disable_patch_reader(self):
+        """Test that the reader's colorizer is replaced and restored."""
+        original = MagicMock()
+        reader_module = MagicMock(gen_colors=original)
+        utils_module = MagicMock(gen_colors=original)
+        with (
+            patch.dict(
+                sys.modules,
+                {
+                    "_pyrepl.reader": reader_module,
+                    "_pyrepl.utils": utils_module,
+                },
+            ),
+            patch("_pyrepl.reader", reader_module, create=True),
+        ):
+            from pyrepl_hacks.highlight_utils import (
+                disable_highlight_cache,
+                enable_highlight_cache,
+            )
+
+            enable_highlight_cache()
+            self.assertIsNot(reader_module.gen_colors, original)
+
+            disable_highlight_cache()
+            self.assertIs(reader_module.gen_colors, original)
@@ -0,0 +1,196 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from pyrepl_hacks import hook_utils
+from pyrepl_hacks.hook_utils import (
+    add_command_hook,
+    add_idle_hook,
+    add_input_hook,
+    call_soon,
+    remove_command_hook,
+    remove_idle_hook,
+    remove_input_hook,
+)
+
+from .support import MockReader, start_patches
+
+
+class HookedReader(MockReader):
+    """MockReader with a run_hooks method, like the real reader."""
+
+    def run_hooks(self):
+        self.hooks_run = True
+
+    def refresh(self):
+        self.dirty = False
+        self.refreshed = True
+
+    def after_command(self, command):
+        self.last_command = command
+
+    def prepare(self):
+        self.buffer = []
+
+
+class TestCallSoon(unittest.TestCase):
+    def setUp(self):
+        """Install the hook on a fresh reader class for each test."""
+        self.reader_class = type("Reader", (HookedReader,), {})
+        self.reader = self.reader_class()
+        start_patches(
+            self,
+            patch("pyrepl_hacks.hook_utils._installed", False),
+            patch("pyrepl_hacks.hook_utils._get_reader", lambda: self.reader),
+            patch("pyrepl_hacks.hook_utils._idle_hooks", []),
+            patch("pyrepl_hacks.hook_utils._command_hooks_installed", False),
+            patch("pyrepl_hacks.hook_utils._command_hooks", []),
+            patch("pyrepl_hacks.hook_utils._input_hooks_installed", False),
+            patch("pyrepl_hacks.hook_utils._input_hooks", []),
+        )
+
+    def test_callbacks_run_on_idle(self):
+        """Test that scheduled callbacks run when the reader runs its hooks."""
+        callback = MagicMock()
+
+        call_soon(callback)
+        callback.assert_not_called()
+
+        self.reader.run_hooks()
+        callback.assert_called_once_with(self.reader)
+        self.assertTrue(self.reader.hooks_run)
+
+        self.reader.run_hooks()
+        callback.assert_called_once()
+
+    def test_screen_refreshed_when_dirty(self):
+        """Test that the screen is redrawn if a callback changed anything."""
+
+        def set_message(reader):
+            reader.msg = "done"
+            reader.dirty = True
+
+        call_soon(set_message)
+        self.reader.run_hooks()
+
+        self.assertEqual(self.reader.msg, "done")
+        self.assertTrue(self.reader.refreshed)
+
+    def test_screen_not_refreshed_when_unchanged(self):
+        """Test that the screen isn't redrawn if callbacks changed nothing."""
+        self.reader.dirty = True  # Like after the reader clears its message
+
+        call_soon(lambda reader: None)
+        self.reader.run_hooks()
+
+        self.assertFalse(hasattr(self.reader, "refreshed"))
+        self.assertTrue(self.reader.dirty)
+
+    def test_callback_errors_shown(self):
+        """Test that exceptions raised by callbacks are shown as errors."""
+        self.reader.error = MagicMock()
+
+        call_soon(lambda reader: 1 / 0)
+        self.reader.run_hooks()
+
+        self.reader.error.assert_called_once_with(
+            "ZeroDivisionError: division by zero",
+        )
+
+    def test_installed_once(self):
+        """Test that run_hooks is only wrapped once."""
+        call_soon(lambda reader: None)
+        run_hooks = self.reader_class.run_hooks
+        call_soon(lambda reader: None)
+        self.assertIs(self.reader_class.run_hooks, run_hooks)
+        self.assertTrue(hook_utils._installed)
+        self.reader.run_hooks()
+
+    def test_idle_hooks(self):
+        """Test that idle hooks run every time the reader runs its hooks."""
+        hook = MagicMock()
+
+        add_idle_hook(hook)
+        add_idle_hook(hook)
+        self.reader.run_hooks()
+        self.reader.run_hooks()
+        self.assertEqual(hook.call_count, 2)
+
+        remove_idle_hook(hook)
+        self.reader.run_hooks()
+        self.assertEqual(hook.call_count, 2)
+
+    def test_idle_hook_changes_redrawn(self):
+        """Test that the screen is redrawn if an idle hook changed anything."""
+
+        def set_message(reader):
+            reader.msg = "idle"
+            reader.dirty = True
+
+        add_idle_hook(set_message)
+        self.reader.run_hooks()
+
+        self.assertTrue(self.reader.refreshed)
+
+    def test_failing_idle_hook_removed(self):
+        """Test that idle hooks that raise exceptions are removed."""
+        self.reader.error = MagicMock()
+        hook = MagicMock(side_effect=ValueError("oops"))
+
+        add_idle_hook(hook)
+        self.reader.run_hooks()
+        self.reader.run_hooks()
+
+        hook.assert_called_once()
+        self.reader.error.assert_called_once_with("ValueError: oops")
+
+    def test_command_hooks(self):
+        """Test that command hooks are called after each command."""
+        hook = MagicMock()
+        command = MagicMock()
+
+        add_command_hook(hook)
+        self.reader.after_command(command)
+        hook.assert_called_once_with(self.reader, command)
+        self.assertIs(self.reader.last_command, command)
+
+        remove_command_hook(hook)
+        self.reader.after_command(command)
+        hook.assert_called_once()
+
+    def test_failing_command_hook_removed(self):
+        """Test that command hooks that raise exceptions are removed."""
+        self.reader.error = MagicMock()
+        hook = MagicMock(side_effect=KeyError("x"))
+
+        add_command_hook(hook)
+        self.reader.after_command(MagicMock())
+        self.reader.after_command(MagicMock())
+
+        hook.assert_called_once()
+        self.reader.error.assert_called_once_with("KeyError: 'x'")
+
+    def test_input_hooks(self):
+        """Test that input hooks are called before each new input starts."""
+        self.reader.buffer = list("interrupted")
+        hook = MagicMock(side_effect=lambda reader: self.assertTrue(reader.buffer))
+
+        add_input_hook(hook)
+        self.reader.prepare()
+        hook.assert_called_once_with(self.reader)
+        self.assertEqual(self.reader.buffer, [])
+
+        remove_input_hook(hook)
+        self.reader.prepare()
+        hook.assert_called_once()
+
+    def test_failing_input_hook_removed(self):
+        """Test that input hooks that raise exceptions are removed."""
+        self.reader.error = MagicMock()
+        hook = MagicMock(side_effect=ValueError("oops"))
+
+        add_input_hook(hook)
+        self.reader.prepare()
+        self.reader.prepare()
+
+        hook.assert_called_once()
+        self.reader.error.assert_called_once_with("ValueError: oops")
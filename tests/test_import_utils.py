@@ -0,0 +1,152 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from pyrepl_hacks import import_utils
+from pyrepl_hacks.import_utils import ImportIndex, import_line, public_names
+
+
+class TestPublicNames(unittest.TestCase):
+    def test_definitions(self):
+        """Test finding public functions, classes, and assignments."""
+        source = (
+            "import os\n"
+            "from typing import Any\n"
+            "def load(): pass\n"
+            "class Frame: pass\n"
+            "class _Private: pass\n"
+            "VERSION: str = '1.0'\n"
+            "try:\n"
+            "    fast = True\n"
+            "except ImportError:\n"
+            "    fast = False\n"
+        )
+        self.assertEqual(public_names(source), ["Frame", "VERSION", "fast", "load"])
+
+    def test_dunder_all(self):
+        """Test that a literal __all__ takes precedence."""
+        source = "__all__ = ['load']\n__all__ += ['dump']\ndef load(): pass\ndef other(): pass"
+        self.assertEqual(public_names(source), ["dump", "load"])
+
+    def test_star_imports_in_package(self):
+        """Test following star imports from sibling modules in a package."""
+        with tempfile.TemporaryDirectory() as directory:
+            package = Path(directory)
+            (package / "_local.py").write_text("__all__ = ['Path']\n")
+            source = "from ._local import *\n__all__ = _local.__all__\n"
+            self.assertEqual(public_names(source, package), ["Path"])
+            self.assertEqual(public_names(source), [])
+
+
+class TestImportIndex(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+        self.site = self.root / "site"
+        self.site.mkdir()
+        (self.site / "shapes.py").write_text("class Circle: pass\nclass Square: pass\n")
+        package = self.site / "geometry"
+        package.mkdir()
+        (package / "__init__.py").write_text("__all__ = ['Circle', 'distance']\n")
+        self.cache_path = self.root / "cache" / "index.json"
+
+    def build(self):
+        index = ImportIndex([str(self.site)], cache_path=self.cache_path)
+        index.build()
+        return index
+
+    def test_modules_for(self):
+        """Test looking up the modules that provide a name."""
+        index = self.build()
+        self.assertTrue(index.ready.is_set())
+        self.assertEqual(index.modules_for("Square"), ["shapes"])
+        self.assertEqual(index.modules_for("Circle"), ["shapes", "geometry"])
+        self.assertEqual(index.modules_for("geometry"), ["geometry"])
+        self.assertEqual(index.modules_for("chain"), ["itertools"])
+        self.assertEqual(index.modules_for("undefined_thing"), [])
+
+    def test_name_match_preferred(self):
+        """Test that modules named after the name are preferred."""
+        (self.site / "circle_utils.py").write_text("class Circle: pass\n")
+        index = self.build()
+        self.assertEqual(index.modules_for("Circle")[0], "circle_utils")
+
+    def test_cache_reused(self):
+        """Test that unchanged entries are loaded from the cache file."""
+        self.build()
+        self.assertTrue(self.cache_path.exists())
+        with patch.object(import_utils, "_scan_entry") as scan_entry:
+            index = self.build()
+        scan_entry.assert_not_called()
+        self.assertEqual(index.modules_for("Square"), ["shapes"])
+
+    def test_incremental_update(self):
+        """Test that only changed modules are parsed when a directory changes."""
+        self.build()
+        (self.site / "colors.py").write_text("RED = 1\n")
+        os.utime(self.site, (0, os.stat(self.site).st_mtime + 10))
+
+        with patch.object(
+            import_utils,
+            "public_names",
+            wraps=import_utils.public_names,
+        ) as parse:
+            index = self.build()
+
+        parse.assert_called_once_with("RED = 1\n", None)
+        self.assertEqual(index.modules_for("RED"), ["colors"])
+        self.assertEqual(index.modules_for("Square"), ["shapes"])
+        cached = json.loads(self.cache_path.read_text())
+        self.assertIn("colors", cached["entries"][str(self.site)]["modules"])
+
+    def test_corrupt_cache_ignored(self):
+        """Test that an unreadable cache file is rebuilt."""
+        self.cache_path.parent.mkdir()
+        self.cache_path.write_text("not json")
+        index = self.build()
+        self.assertEqual(index.modules_for("Square"), ["shapes"])
+
+    def test_malformed_cache_ignored(self):
+        """Test that a cache file with the wrong structure is rebuilt."""
+        self.cache_path.parent.mkdir()
+        for entries in [[], {str(self.site): {}}, {str(self.site): {"mtime": 1}}]:
+            with self.subTest(entries=entries):
+                data = {"version": import_utils.CACHE_VERSION, "entries": entries}
+                self.cache_path.write_text(json.dumps(data))
+                index = self.build()
+                self.assertEqual(index.modules_for("Square"), ["shapes"])
+
+    def test_failed_background_build_can_be_retried(self):
+        """Test that an error while building doesn't block later builds."""
+        index = ImportIndex([str(self.site)], cache_path=self.cache_path)
+        with (
+            patch.object(index, "_invert", side_effect=RuntimeError("oops")),
+            patch("threading.excepthook"),
+        ):
+            index.build_in_background()
+            for thread in threading.enumerate():
+                if thread.name == "import index":
+                    thread.join(timeout=10)
+        self.assertFalse(index.ready.is_set())
+
+        index.build_in_background()
+        self.assertTrue(index.ready.wait(timeout=10))
+        self.assertEqual(index.modules_for("Square"), ["shapes"])
+
+    def test_build_in_background(self):
+        """Test building the index in a background thread."""
+        index = ImportIndex([str(self.site)], cache_path=self.cache_path)
+        index.build_in_background()
+        self.assertTrue(index.ready.wait(timeout=10))
+        self.assertEqual(index.modules_for("Square"), ["shapes"])
+
+
+class TestImportLine(unittest.TestCase):
+    def test_import_line(self):
+        self.assertEqual(import_line("Path", "pathlib"), "from pathlib import Path")
+        self.assertEqual(import_line("math", "math"), "import math")
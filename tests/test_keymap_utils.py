@@ -0,0 +1,180 @@
+import tempfile
+import threading
+import tomllib
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from pyrepl_hacks.keymap_utils import BindingsFile, load_bindings, read_bindings
+
+from .support import start_patches
+
+DEFAULT_KEYMAP = ((r"\C-a", "beginning-of-line"), (r"\C-n", "next-history"))
+
+
+class BindingsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.reader = MagicMock()
+        self.reader.keymap = DEFAULT_KEYMAP
+        self.reader.input_trans_stack = []
+        self.reader.commands = {
+            "beginning-of-line": object,
+            "next-history": object,
+            "dedent": object,
+            "home": object,
+        }
+        start_patches(
+            self,
+            patch("pyrepl_hacks.keymap_utils._get_reader", return_value=self.reader),
+            patch("pyrepl_hacks.command_utils._get_reader", return_value=self.reader),
+        )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "bindings.toml"
+
+    def write(self, text):
+        self.path.write_text(text, encoding="utf-8")
+
+
+class TestReadBindings(BindingsTestCase):
+    def test_read_bindings(self):
+        """Test reading bound commands, inserted text, and snippets."""
+        self.write(
+            '[bind]\n"Shift+Tab" = "dedent"\n'
+            '[insert]\n"Ctrl+N" = "[1, 2]"\n'
+            '[snippet]\n"Ctrl+P" = "print($1)"\n',
+        )
+
+        keys, texts = read_bindings(self.path)
+
+        self.assertEqual(
+            keys,
+            {r"\e[Z": "dedent", r"\C-n": "_Ctrl_N", r"\C-p": "_Ctrl_P"},
+        )
+        self.assertEqual(
+            texts,
+            {"_Ctrl_N": ("insert", "[1, 2]"), "_Ctrl_P": ("snippet", "print($1)")},
+        )
+
+    def test_read_invalid_bindings(self):
+        """Test errors for unknown tables, values, and invalid TOML."""
+        for text, error in [
+            ('[keys]\n"Ctrl+A" = "home"\n', ValueError),
+            ('[bind]\n"Ctrl+A" = 1\n', TypeError),
+            ("[bind\n", tomllib.TOMLDecodeError),
+        ]:
+            with self.subTest(text=text):
+                self.write(text)
+                with self.assertRaises(error):
+                    read_bindings(self.path)
+
+
+class TestApplyBindings(BindingsTestCase):
+    def test_load_bindings(self):
+        """Test that loading appends bindings and registers text commands."""
+        self.write('[bind]\n"Ctrl+A" = "home"\n[insert]\n"Ctrl+N" = "[1, 2]"\n')
+
+        bindings_file = load_bindings(self.path)
+
+        self.assertEqual(
+            self.reader.keymap,
+            (*DEFAULT_KEYMAP, (r"\C-a", "home"), (r"\C-n", "_Ctrl_N")),
+        )
+        self.assertIsNot(self.reader.input_trans, None)
+        self.assertEqual(self.reader.commands["_Ctrl_N"].__doc__, "Insert '[1, 2]'.")
+        self.assertIsNone(bindings_file._thread)
+
+    def test_reload_applies_only_changes(self):
+        """Test that reloading adds and removes only what changed."""
+        self.write('[bind]\n"Ctrl+A" = "home"\n"Shift+Tab" = "dedent"\n')
+        bindings_file = load_bindings(self.path)
+        translator = self.reader.input_trans
+
+        self.write('[bind]\n"Shift+Tab" = "dedent"\n"Ctrl+X" = "home"\n')
+        bindings_file.reload(self.reader)
+
+        self.assertEqual(
+            self.reader.keymap,
+            (*DEFAULT_KEYMAP, (r"\e[Z", "dedent"), (r"\C-x", "home")),
+        )
+        self.assertIsNot(self.reader.input_trans, translator)
+        self.assertEqual(self.reader.msg, "bindings.toml: 1 bindings added, 1 removed")
+
+    def test_reload_without_changes(self):
+        """Test that an unchanged file leaves the keymap alone."""
+        self.write('[insert]\n"Ctrl+N" = "[1, 2]"\n')
+        bindings_file = load_bindings(self.path)
+        command = self.reader.commands["_Ctrl_N"]
+        keymap, translator = self.reader.keymap, self.reader.input_trans
+
+        bindings_file.reload(self.reader)
+
+        self.assertIs(self.reader.keymap, keymap)
+        self.assertIs(self.reader.input_trans, translator)
+        self.assertIs(self.reader.commands["_Ctrl_N"], command)
+
+    def test_removing_override_restores_default(self):
+        """Test that removing a binding brings back the binding it overrode."""
+        self.write('[bind]\n"Ctrl+N" = "next-history"\n')
+        bindings_file = load_bindings(self.path)
+
+        self.write("")
+        bindings_file.reload(self.reader)
+
+        self.assertEqual(self.reader.keymap, DEFAULT_KEYMAP)
+
+    def test_unknown_command(self):
+        """Test that unknown commands raise and keep the old bindings."""
+        self.write('[bind]\n"Ctrl+A" = "home"\n')
+        bindings_file = load_bindings(self.path)
+        keymap = self.reader.keymap
+
+        self.write('[bind]\n"Ctrl+A" = "hmoe"\n')
+        with self.assertRaises(ValueError):
+            bindings_file.reload(self.reader)
+
+        self.assertIs(self.reader.keymap, keymap)
+
+    def test_unknown_command_keeps_text_commands(self):
+        """Test that a failed reload doesn't register its text commands."""
+        self.write('[insert]\n"Ctrl+N" = "old"\n')
+        bindings_file = load_bindings(self.path)
+        command = self.reader.commands["_Ctrl_N"]
+
+        self.write('[bind]\n"Ctrl+A" = "hmoe"\n[insert]\n"Ctrl+N" = "new"\n')
+        with self.assertRaises(ValueError):
+            bindings_file.reload(self.reader)
+
+        self.assertIs(self.reader.commands["_Ctrl_N"], command)
+        self.assertEqual(command.__doc__, "Insert 'old'.")
+
+    def test_replaces_base_translator_during_search(self):
+        """Test that a pushed translator (like isearch) is left in place."""
+        self.reader.input_trans_stack = [MagicMock()]
+        search_translator = self.reader.input_trans
+        self.write('[bind]\n"Ctrl+A" = "home"\n')
+
+        load_bindings(self.path)
+
+        self.assertIs(self.reader.input_trans, search_translator)
+        self.assertEqual(len(self.reader.input_trans_stack), 1)
+        self.assertIsNot(self.reader.input_trans_stack[0], search_translator)
+
+
+class TestWatchBindings(BindingsTestCase):
+    def test_watch_schedules_reload(self):
+        """Test that changing the file schedules a reload on the reader."""
+        self.write('[bind]\n"Ctrl+A" = "home"\n')
+        reloaded = threading.Event()
+        with patch(
+            "pyrepl_hacks.keymap_utils.call_soon",
+            side_effect=lambda callback: reloaded.set(),
+        ):
+            bindings_file = BindingsFile(self.path)
+            bindings_file.watch(interval=0.01)
+            self.addCleanup(bindings_file.stop)
+            self.write('[bind]\n"Ctrl+A" = "home"\n"Ctrl+X" = "home"\n')
+            self.assertTrue(reloaded.wait(5))
+
+        bindings_file.stop()
+        self.assertIsNone(bindings_file._thread)
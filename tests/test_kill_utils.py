@@ -0,0 +1,133 @@
+import sys
+import unittest
+from _pyrepl.commands import KillCommand, kill_line, yank_pop
+from unittest.mock import patch
+
+from pyrepl_hacks.kill_utils import KillRing, disable_kill_ring, enable_kill_ring
+
+from .support import MockReader
+
+
+class KillReader(MockReader):
+    """MockReader with the attributes used by the kill commands."""
+
+    def __init__(self, text="", pos=None, kill_ring=None):
+        super().__init__(text, pos)
+        self.kill_ring = KillRing() if kill_ring is None else kill_ring
+        self.last_command = None
+
+    def insert(self, text):
+        self.buffer[self.pos : self.pos] = list(text)
+        self.pos += len(text)
+
+
+class TestKillRing(unittest.TestCase):
+    def test_list_of_characters_interface(self):
+        """Test that kills go in and come out as lists of characters."""
+        ring = KillRing([list("one"), "two"])
+        ring.append(list("three"))
+
+        self.assertEqual(len(ring), 3)
+        self.assertEqual(ring[-1], list("three"))
+        self.assertEqual(ring[0:2], [list("one"), list("two")])
+        self.assertEqual(ring.texts(), ["three", "two", "one"])
+
+        ring[-1] = list("three!")
+        self.assertEqual(ring.pop(), list("three!"))
+        ring.insert(0, list("zero"))
+        self.assertEqual(list(ring), [list("zero"), list("one"), list("two")])
+
+    def test_duplicates_moved_not_stored(self):
+        """Test that killing the same text again moves it to the newest spot."""
+        ring = KillRing(["a", "b", "c"])
+        size = ring.size
+
+        ring.append(list("a"))
+
+        self.assertEqual(ring.texts(), ["a", "c", "b"])
+        self.assertEqual(ring.size, size)
+
+    def test_max_entries(self):
+        """Test that the oldest kills are evicted past max_entries."""
+        ring = KillRing(["a", "b", "c", "d"], max_entries=2)
+        self.assertEqual(ring.texts(), ["d", "c"])
+
+    def test_resize(self):
+        """Test that lowering the limits evicts the oldest kills."""
+        ring = KillRing(["a", "b", "c"])
+        ring.resize(ring.max_bytes, 2)
+        self.assertEqual(ring.texts(), ["c", "b"])
+        self.assertEqual(ring.max_entries, 2)
+
+    def test_max_bytes(self):
+        """Test that the oldest kills are evicted past the memory budget."""
+        ring = KillRing(max_bytes=3 * sys.getsizeof("x" * 100))
+        for char in "abcd":
+            ring.append(list(char * 100))
+        self.assertEqual([text[0] for text in ring.texts()], ["d", "c", "b"])
+        self.assertLessEqual(ring.size, ring.max_bytes)
+
+        ring.append(list("e" * 10_000))  # The newest kill is always kept
+        self.assertEqual(len(ring), 1)
+
+    def test_big_kills_compressed(self):
+        """Test that big kills are stored compressed."""
+        text = "spam and eggs\n" * 100_000
+        ring = KillRing(max_bytes=sys.maxsize)
+
+        ring.append(list(text))
+
+        self.assertLess(ring.size, len(text) // 10)
+        self.assertEqual(ring.texts(), [text])
+        self.assertEqual("".join(ring[-1]), text)
+
+    def test_duplicate_big_kills_not_compressed_again(self):
+        """Test that a big kill already in the ring isn't compressed again."""
+        text = "spam and eggs\n" * 100_000
+        ring = KillRing([text, "other"], max_bytes=sys.maxsize)
+
+        with patch("zlib.compress") as compress:
+            ring.append(list(text))
+
+        compress.assert_not_called()
+        self.assertEqual(ring.texts(), [text, "other"])
+
+
+class TestKillCommands(unittest.TestCase):
+    def test_kill_commands_use_ring(self):
+        """Test the reader's kill and yank-pop commands with a KillRing."""
+        reader = KillReader("one two three", pos=0)
+        for word in ["one ", "two "]:
+            command = KillCommand(reader, "kill-word", [])
+            command.kill_range(0, len(word))
+            reader.last_command = None
+        # Consecutive kills are merged into the newest kill
+        reader.last_command = kill_line
+        KillCommand(reader, "kill-word", []).kill_range(0, 5)
+        self.assertEqual(reader.kill_ring.texts(), ["two three", "one "])
+
+        reader.insert("two three")
+        reader.last_command = yank_pop
+        yank_pop(reader, "yank-pop", []).do()
+        self.assertEqual(reader.get_unicode(), "one ")
+        self.assertEqual(reader.kill_ring.texts(), ["one ", "two three"])
+
+
+class TestEnableKillRing(unittest.TestCase):
+    def setUp(self):
+        self.reader = KillReader(kill_ring=[list("a"), list("b")])
+        patcher = patch("pyrepl_hacks.kill_utils._get_reader", return_value=self.reader)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_enable_and_disable(self):
+        """Test replacing the reader's kill ring and restoring a list."""
+        enable_kill_ring(max_entries=1)
+        self.assertIsInstance(self.reader.kill_ring, KillRing)
+        self.assertEqual(self.reader.kill_ring.texts(), ["b"])
+
+        enable_kill_ring(max_entries=5)
+        self.assertEqual(self.reader.kill_ring.max_entries, 5)
+
+        disable_kill_ring()
+        self.assertEqual(self.reader.kill_ring, [list("b")])
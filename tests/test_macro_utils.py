@@ -0,0 +1,247 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from pyrepl_hacks._types import Command
+from pyrepl_hacks.macro_utils import (
+    LAST_MACRO,
+    Macro,
+    MacroCommand,
+    _record,
+    load_macros,
+    name_last_macro,
+    save_macros,
+    start_recording,
+    stop_recording,
+)
+
+from .support import MockReader, create_historical_reader, start_patches
+
+
+class insert(Command):
+    def do(self):
+        self.reader.buffer[self.reader.pos : self.reader.pos] = self.event
+        self.reader.pos += len(self.event)
+
+
+class home(Command):
+    def do(self):
+        self.reader.pos = 0
+
+
+class accept(Command):
+    def do(self):
+        self.finish = True
+
+
+class MacroReader(MockReader):
+    """MockReader with the command machinery macros use (but no refresh)."""
+
+    def __init__(self, initial_text="", pos=None):
+        super().__init__(initial_text, pos)
+        self.commands = {
+            "self-insert": insert,
+            "beginning-of-line": home,
+            "accept": accept,
+            LAST_MACRO: MacroCommand,
+        }
+        self.arg = None
+        self.last_command = None
+        self.error = MagicMock()
+        self.after_command = MagicMock()
+
+    def get_arg(self, default=1):
+        return default if self.arg is None else self.arg
+
+
+def run(reader, name, event=""):
+    """Run a command like the reader does (then record it)."""
+    command = reader.commands[name](reader, name, list(event))
+    command.do()
+    _record(reader, command)
+    return command
+
+
+class MacroTestCase(unittest.TestCase):
+    def setUp(self):
+        self.reader = MacroReader()
+        start_patches(
+            self,
+            patch("pyrepl_hacks.macro_utils._recordings", {}),
+            patch("pyrepl_hacks.macro_utils._macros", {}),
+            patch("pyrepl_hacks.macro_utils._get_reader", lambda: self.reader),
+            patch("pyrepl_hacks.macro_utils.add_command_hook", MagicMock()),
+        )
+
+    def record(self, *steps):
+        start_recording(self.reader)
+        for step in steps:
+            run(self.reader, *step)
+        return stop_recording(self.reader)
+
+
+class TestRecording(MacroTestCase):
+    def test_records_commands_but_not_macro_commands(self):
+        """Test recording command names and events, skipping control commands."""
+        macro = self.record(
+            ("self-insert", "a"),
+            (LAST_MACRO,),
+            ("beginning-of-line",),
+        )
+        self.assertEqual(
+            macro,
+            Macro((("self-insert", "a"), ("beginning-of-line", ""))),
+        )
+        self.reader.error.assert_called_once_with(
+            "can't call the last macro while recording",
+        )
+
+    def test_stop_without_recording(self):
+        """Test that stopping when not recording returns None."""
+        self.assertIsNone(stop_recording(self.reader))
+
+    def test_not_recorded_without_start(self):
+        """Test that commands aren't recorded unless recording."""
+        run(self.reader, "self-insert", "a")
+        start_recording(self.reader)
+        self.assertEqual(stop_recording(self.reader), Macro(()))
+
+
+class TestMacroCommand(MacroTestCase):
+    def test_replays_without_redrawing(self):
+        """Test replaying a macro N times (MacroReader has no refresh)."""
+        self.record(("beginning-of-line",), ("self-insert", "# "))
+        self.reader.buffer, self.reader.pos = list("x"), 1
+        self.reader.arg = 3
+
+        run(self.reader, LAST_MACRO)
+
+        self.assertEqual(self.reader.get_unicode(), "# # # x")
+        self.assertEqual(self.reader.after_command.call_count, 6)
+        self.assertIs(self.reader.last_command, insert)
+
+    def test_replayed_commands_not_recorded_again(self):
+        """Test that a macro called while recording records only itself."""
+        self.record(("self-insert", "x"))
+        name_last_macro("insert-x")
+        start_recording(self.reader)
+        command = self.reader.commands["insert-x"](self.reader, "insert-x", [])
+        command.do()
+        _record(self.reader, command)
+        self.assertEqual(stop_recording(self.reader), Macro((("insert-x", ""),)))
+
+    def test_accept_finishes_input(self):
+        """Test that a step that finishes the input stops the macro."""
+        self.record(("self-insert", "a"), ("accept",), ("self-insert", "b"))
+        self.reader.buffer, self.reader.pos = [], 0
+        self.reader.arg = 2
+        command = run(self.reader, LAST_MACRO)
+        self.assertTrue(command.finish)
+        self.assertEqual(self.reader.get_unicode(), "a")
+
+    def test_errors(self):
+        """Test the errors for missing macros and unknown commands."""
+        run(self.reader, LAST_MACRO)
+        self.reader.error.assert_called_once_with("no macro recorded")
+        self.record(("self-insert", "a"))
+        del self.reader.commands["self-insert"]
+        run(self.reader, LAST_MACRO)
+        self.reader.error.assert_called_with("unknown commands in macro: self-insert")
+
+
+class TestNamedMacros(MacroTestCase):
+    def test_name_last_macro(self):
+        """Test registering the last macro as a command."""
+        with self.assertRaises(ValueError):
+            name_last_macro("comment")
+        self.record(("beginning-of-line",), ("self-insert", "# "))
+        name_last_macro("comment")
+        with self.assertRaises(ValueError):
+            name_last_macro("accept")
+
+        self.reader.buffer, self.reader.pos = list("x"), 1
+        run(self.reader, "comment")
+        self.assertEqual(self.reader.get_unicode(), "# x")
+        self.assertEqual(
+            self.reader.commands["comment"].__doc__,
+            "Run the comment keyboard macro.",
+        )
+
+    def test_save_and_load(self):
+        """Test saving named macros to JSON and loading them again."""
+        self.record(("beginning-of-line",), ("self-insert", "# "))
+        name_last_macro("comment")
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "macros.json"
+            save_macros(path)
+            self.assertEqual(
+                json.loads(path.read_text()),
+                {"comment": [["beginning-of-line", ""], ["self-insert", "# "]]},
+            )
+            del self.reader.commands["comment"]
+            load_macros(path)
+        self.reader.buffer, self.reader.pos = [], 0
+        run(self.reader, "comment")
+        self.assertEqual(self.reader.get_unicode(), "# ")
+
+    def test_load_invalid_file(self):
+        """Test that a badly formatted macros file raises ValueError."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "macros.json"
+            path.write_text('{"comment": ["beginning-of-line"]}')
+            with self.assertRaises(ValueError):
+                load_macros(path)
+            self.assertNotIn("comment", self.reader.commands)
+
+    def test_load_non_object_file(self):
+        """Test that a macros file without a JSON object raises TypeError."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "macros.json"
+            path.write_text('[["beginning-of-line", "a"]]')
+            with self.assertRaises(TypeError):
+                load_macros(path)
+
+
+class TestMacroLayout(unittest.TestCase):
+    def test_replay_matches_typing(self):
+        """Test that motions replayed after edits use the updated layout."""
+        steps = (
+            ("insert-nl", "\n"),
+            ("insert-nl", "\n"),
+            ("self-insert", "x"),
+            ("up", ""),
+            ("up", ""),
+        )
+        typed = create_historical_reader("abcdef")
+        for name, event in steps:
+            typed.do_cmd((name, list(event)))
+        replayed = create_historical_reader("abcdef")
+
+        Macro(steps).run(replayed)
+
+        self.assertEqual(replayed.get_unicode(), typed.get_unicode())
+        self.assertEqual(replayed.pos, typed.pos)
+        self.assertEqual(replayed.pos, 6)
+
+
+class TestMacroArgument(unittest.TestCase):
+    def setUp(self):
+        start_patches(
+            self,
+            patch("pyrepl_hacks.macro_utils._recordings", {}),
+            patch(
+                "pyrepl_hacks.macro_utils._macros",
+                {LAST_MACRO: Macro((("self-insert", "a"),))},
+            ),
+        )
+
+    def test_argument_repeats_macro_once(self):
+        """Test that the numeric argument isn't also used by the first command."""
+        reader = create_historical_reader()
+        reader.do_cmd(("digit-arg", ["3"]))
+
+        reader.do_cmd((MacroCommand, []))
+
+        self.assertEqual(reader.get_unicode(), "aaa")
@@ -0,0 +1,144 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from pyrepl_hacks import minibuffer_utils
+from pyrepl_hacks.minibuffer_utils import (
+    Picker,
+    open_picker,
+    picker_accept,
+    picker_add_character,
+    picker_backspace,
+    picker_cancel,
+    picker_next,
+    picker_previous,
+)
+
+from .support import MockReader
+
+WORDS = ["apple", "apricot", "banana", "cherry"]
+
+
+def search(query):
+    return [(word.upper(), word) for word in WORDS if query in word]
+
+
+class PickerReader(MockReader):
+    """MockReader that tracks its input translators."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.msg = ""
+        self.translators = []
+
+    def push_input_trans(self, translator):
+        self.translators.append(translator)
+
+    def pop_input_trans(self):
+        self.translators.pop()
+
+    def error(self, msg="none"):
+        self.msg = f"! {msg}"
+        self.dirty = True
+
+
+class TestPicker(unittest.TestCase):
+    def test_render(self):
+        """Test the rendered prompt, items, and selection marker."""
+        picker = Picker("fruit: ", search, MagicMock(), height=2)
+        picker.move(1)
+        self.assertEqual(
+            picker.render(),
+            "fruit: \n  APPLE\n> APRICOT\n  (2 more)",
+        )
+
+    def test_render_scrolls_to_selection(self):
+        """Test that the selected item is always shown."""
+        picker = Picker("fruit: ", search, MagicMock(), height=2)
+        picker.move(-1)
+        self.assertEqual(
+            picker.render(),
+            "fruit: \n  BANANA\n> CHERRY\n  (2 more)",
+        )
+
+    def test_set_query(self):
+        """Test that changing the query searches again."""
+        picker = Picker("fruit: ", search, MagicMock())
+        picker.move(1)
+        picker.set_query("ap")
+        self.assertEqual(picker.selected, 0)
+        self.assertEqual(picker.render(), "fruit: ap\n> APPLE\n  APRICOT")
+        picker.set_query("xyz")
+        self.assertEqual(picker.render(), "fruit: xyz\n  (no matches)")
+
+
+class TestOpenPicker(unittest.TestCase):
+    def setUp(self):
+        patcher = patch("pyrepl_hacks.minibuffer_utils._pickers", {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch("pyrepl_hacks.minibuffer_utils.add_input_hook")
+        self.add_input_hook = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.reader = PickerReader("x = 1")
+        self.on_pick = MagicMock(return_value=None)
+        open_picker(self.reader, Picker("fruit: ", search, self.on_pick))
+
+    def run_command(self, command_class, event="x"):
+        command = command_class(self.reader, "picker", list(event))
+        command.do()
+        return command
+
+    def test_open_shows_picker(self):
+        """Test that opening a picker takes over keys and shows the items."""
+        self.assertEqual(len(self.reader.translators), 1)
+        self.assertTrue(self.reader.msg.startswith("fruit: \n> APPLE"))
+        self.assertTrue(self.reader.dirty)
+
+    def test_typing_filters(self):
+        """Test typing and deleting query characters."""
+        self.run_command(picker_add_character, "c")
+        self.run_command(picker_add_character, "h")
+        self.assertEqual(self.reader.msg, "fruit: ch\n> CHERRY")
+        self.run_command(picker_backspace)
+        self.assertEqual(self.reader.msg, "fruit: c\n> APRICOT\n  CHERRY")
+        self.assertEqual(self.reader.get_unicode(), "x = 1")
+
+    def test_move_and_accept(self):
+        """Test picking the selected item."""
+        self.run_command(picker_next)
+        self.run_command(picker_next)
+        self.run_command(picker_previous)
+        self.run_command(picker_accept)
+        self.on_pick.assert_called_once_with(self.reader, "apricot")
+        self.assertEqual(self.reader.translators, [])
+        self.assertEqual(self.reader.msg, "")
+
+    def test_accept_finishes_like_picked_command(self):
+        """Test that accepting copies the finish flag of the command run."""
+        self.on_pick.return_value = MagicMock(finish=True)
+        command = self.run_command(picker_accept)
+        self.assertTrue(command.finish)
+
+    def test_accept_without_matches(self):
+        """Test that accepting with no matches keeps the picker open."""
+        self.run_command(picker_add_character, "z")
+        self.run_command(picker_accept)
+        self.on_pick.assert_not_called()
+        self.assertEqual(self.reader.msg, "! no matches")
+        self.assertEqual(len(self.reader.translators), 1)
+
+    def test_cancel(self):
+        """Test that cancelling closes the picker without picking."""
+        self.run_command(picker_cancel)
+        self.on_pick.assert_not_called()
+        self.assertEqual(self.reader.translators, [])
+        self.assertEqual(self.reader.msg, "")
+
+    def test_interrupted_input_closes_picker(self):
+        """Test that starting the next input after Ctrl+C closes the picker."""
+        (hook,) = self.add_input_hook.call_args.args
+        hook(self.reader)
+        self.assertEqual(self.reader.translators, [])
+        self.assertEqual(minibuffer_utils._pickers, {})
+        hook(self.reader)  # Nothing to close after an ordinary input
+        self.assertEqual(self.reader.translators, [])
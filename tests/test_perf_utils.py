@@ -0,0 +1,174 @@
+import sys
+import tempfile
+import threading
+import unittest
+from _pyrepl.console import InteractiveColoredConsole
+from pathlib import Path
+from unittest.mock import patch
+
+from pyrepl_hacks.perf_utils import (
+    TimingCancelled,
+    TimingResult,
+    TimingTable,
+    configure_profiler,
+    disable_timings,
+    enable_timings,
+    format_size,
+    format_time,
+    profile_source,
+    profiler_options,
+    time_in_background,
+    time_source,
+    timings,
+)
+
+from .support import start_patches
+
+
+class TestProfileSource(unittest.TestCase):
+    def test_profile_source_runs_in_namespace(self):
+        """Test that profiled code runs in (and updates) the namespace."""
+        namespace = {"n": 3}
+        profile_source("def square(x):\n    return x * x\nm = square(n)", namespace)
+        self.assertEqual(namespace["m"], 9)
+
+    def test_profile_source_report(self):
+        """Test that the report includes the profiled functions."""
+        namespace = {}
+        source = "def busy():\n    return sum(range(1000))\nbusy()"
+        report = profile_source(source, namespace, sort="tottime", limit=5)
+        self.assertIn("function calls", report)
+        self.assertIn("busy", report)
+
+    def test_profile_source_saves_stats(self):
+        """Test saving the raw profile data to a file."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "last.prof"
+            profile_source("sum(range(10))", {}, save_path=path)
+            self.assertTrue(path.exists())
+
+    def test_profile_source_raises_errors(self):
+        """Test that exceptions from the profiled code propagate."""
+        with self.assertRaises(ZeroDivisionError):
+            profile_source("1 / 0", {})
+
+
+class TestConfigureProfiler(unittest.TestCase):
+    def test_configure_profiler(self):
+        """Test updating the profiler options."""
+        with patch.dict(profiler_options):
+            configure_profiler(sort="tottime", limit=10, save_path="out.prof")
+            self.assertEqual(
+                profiler_options,
+                {"sort": "tottime", "limit": 10, "save_path": "out.prof"},
+            )
+
+
+class TestTimeSource(unittest.TestCase):
+    def test_time_source(self):
+        """Test timing code with autorange and repeats."""
+        result = time_source("total = sum(values)", {"values": [1, 2, 3]}, repeat=3)
+        self.assertEqual(result.repeat, 3)
+        self.assertGreater(result.loops, 1)
+        self.assertLessEqual(result.best, result.mean)
+        self.assertGreaterEqual(result.stdev, 0)
+        self.assertIn("per loop", str(result))
+
+    def test_time_source_cancelled(self):
+        """Test that a set cancellation event stops the timing."""
+        cancelled = threading.Event()
+        cancelled.set()
+        with self.assertRaises(TimingCancelled):
+            time_source("pass", {}, cancelled=cancelled)
+
+    def test_time_source_syntax_error(self):
+        """Test that invalid code raises a SyntaxError."""
+        with self.assertRaises(SyntaxError):
+            time_source("1 +", {})
+
+    def test_time_in_background(self):
+        """Test timing in a background thread."""
+        done = threading.Event()
+        outcomes = []
+
+        def callback(outcome):
+            outcomes.append(outcome)
+            done.set()
+
+        time_in_background("x = 1", {}, callback, repeat=2)
+
+        self.assertTrue(done.wait(timeout=10))
+        self.assertIsInstance(outcomes[0], TimingResult)
+
+    def test_format_time(self):
+        """Test formatting durations with appropriate units."""
+        self.assertEqual(format_time(1.5), "1.5 s")
+        self.assertEqual(format_time(0.0025), "2.5 ms")
+        self.assertEqual(format_time(0.0000123), "12.3 µs")
+        self.assertEqual(format_time(0.000000042), "42 ns")
+
+
+class TestTimings(unittest.TestCase):
+    def setUp(self):
+        """Start with no recorded timings and a default prompt."""
+        start_patches(
+            self,
+            patch("pyrepl_hacks.perf_utils._timings", TimingTable(), create=True),
+            patch("sys.ps1", ">>> ", create=True),
+        )
+        self.addCleanup(disable_timings)
+        self.console = InteractiveColoredConsole({})
+
+    def test_timings_recorded(self):
+        """Test that each completed input is timed."""
+        enable_timings()
+
+        self.console.runsource("data = list(range(10_000))")
+        self.console.runsource("total = sum(data)")
+
+        self.assertEqual(len(timings()), 2)
+        timing = timings()[0]
+        self.assertEqual(timing.source, "data = list(range(10_000))")
+        self.assertGreater(timing.wall, 0)
+        self.assertGreaterEqual(timing.cpu, 0)
+        self.assertGreater(timing.peak_memory, 10_000)
+        self.assertIn("data = list(range(10_000))", repr(timings()))
+
+    def test_prompt_updated(self):
+        """Test that the last timing is shown in the prompt."""
+        enable_timings(memory=False)
+
+        self.console.runsource("x = 1")
+
+        self.assertIsNone(timings()[-1].peak_memory)
+        self.assertEqual(sys.ps1, f"[{timings()[-1].summary()}] >>> ")
+
+        disable_timings()
+        self.assertEqual(sys.ps1, ">>> ")
+
+    def test_prompt_unchanged(self):
+        """Test disabling the timings in the prompt."""
+        enable_timings(prompt=False)
+
+        self.console.runsource("x = 1")
+
+        self.assertEqual(sys.ps1, ">>> ")
+
+    def test_disable_timings(self):
+        """Test that nothing is recorded after timings are disabled."""
+        original = InteractiveColoredConsole.runsource
+        enable_timings()
+        disable_timings()
+
+        self.console.runsource("x = 1")
+
+        self.assertIs(InteractiveColoredConsole.runsource, original)
+        self.assertEqual(timings(), [])
+
+
+class TestFormatSize(unittest.TestCase):
+    def test_format_size(self):
+        """Test formatting byte counts with binary units."""
+        self.assertEqual(format_size(100), "100 B")
+        self.assertEqual(format_size(2048), "2 KiB")
+        self.assertEqual(format_size(5 * 1024**3), "5 GiB")
@@ -0,0 +1,201 @@
+import unittest
+from unittest.mock import patch
+
+from pyrepl_hacks.buffer_utils import splice
+from pyrepl_hacks.region_utils import (
+    comment_lines,
+    dedent_lines,
+    duplicate_region,
+    exchange_point_and_mark,
+    get_mark,
+    indent_lines,
+    move_region,
+    region_lines,
+    set_mark,
+    transform_region,
+)
+
+from .support import ReaderTestMixin, start_patches
+
+CODE = "a = 1\nif a:\n    b = 2\n    c = 3\nprint(b)"
+
+
+class RegionTestCase(unittest.TestCase, ReaderTestMixin):
+    def setUp(self):
+        [_, self.add_command_hook, self.add_input_hook] = start_patches(
+            self,
+            patch("pyrepl_hacks.region_utils._marks", {}),
+            patch("pyrepl_hacks.region_utils.add_command_hook"),
+            patch("pyrepl_hacks.region_utils.add_input_hook"),
+        )
+
+    def create_reader(self, text=CODE, pos=None, mark=None):
+        reader = super().create_reader(text, pos)
+        if mark is not None:
+            set_mark(reader, mark)
+        return reader
+
+
+class TestMark(RegionTestCase):
+    def test_set_and_exchange(self):
+        """Test setting the mark and swapping it with the cursor."""
+        reader = self.create_reader(pos=3)
+        self.assertIsNone(get_mark(reader))
+        self.assertFalse(exchange_point_and_mark(reader))
+
+        set_mark(reader)
+        reader.pos = 10
+        self.assertTrue(exchange_point_and_mark(reader))
+        self.assertPositionEquals(reader, 3)
+        self.assertEqual(get_mark(reader), 10)
+
+    def test_mark_dropped_for_next_input(self):
+        """Test that the mark doesn't carry over to the next input."""
+        reader = self.create_reader(pos=3)
+        set_mark(reader)
+        (hook,) = self.add_input_hook.call_args.args
+
+        reader.buffer[:] = []  # The input is accepted and the next one starts
+        hook(reader)
+        self.assertIsNone(get_mark(reader))
+
+    def test_mark_shifted_by_splices(self):
+        """Test that splicing text before the mark moves it with its text."""
+        reader = self.create_reader("abc def", pos=4, mark=4)
+        for start, end, text, mark in [
+            (0, 0, "xy", 6),  # Inserted before the mark
+            (6, 6, "!", 6),  # Inserted at the mark
+            (0, 2, "", 4),  # Removed before the mark
+            (2, 5, "-", 2),  # Removed around the mark
+            (5, 6, "", 2),  # Removed after the mark
+        ]:
+            splice(reader, start, end, text)
+            self.assertEqual(get_mark(reader), mark)
+
+    def test_mark_shifted_by_typing(self):
+        """Test that the reader's own edits at the cursor move the mark."""
+        reader = self.create_reader("abc def", pos=0, mark=4)
+        (hook,) = self.add_command_hook.call_args.args
+
+        reader.buffer[0:0], reader.pos = list("xy"), 2  # Typed before the mark
+        hook(reader, None)
+        self.assertEqual(get_mark(reader), 6)
+        del reader.buffer[2:4]  # Deleted after the cursor
+        hook(reader, None)
+        self.assertEqual(get_mark(reader), 4)
+        reader.pos = 7
+        del reader.buffer[7:]  # Deleted after the mark
+        hook(reader, None)
+        self.assertEqual(get_mark(reader), 4)
+
+    def test_mark_kept_within_buffer(self):
+        """Test that a mark past the end of the buffer is clamped."""
+        reader = self.create_reader("abc", mark=100)
+        self.assertEqual(get_mark(reader), 3)
+
+    def test_region_lines(self):
+        """Test which lines the region covers."""
+        for pos, mark, expected in [
+            (2, None, (0, 5)),  # No mark: the cursor's line
+            (8, 25, (6, 31)),  # From the mark's line to the cursor's line
+            (25, 8, (6, 31)),
+            (12, 6, (6, 11)),  # Ends at the start of a line
+        ]:
+            with self.subTest(pos=pos, mark=mark):
+                reader = self.create_reader(pos=pos, mark=mark)
+                self.assertEqual(region_lines(reader), expected)
+
+
+class TestRegionEdits(RegionTestCase):
+    def test_indent_region(self):
+        """Test that the cursor and mark stay on their characters."""
+        reader = self.create_reader(pos=6, mark=15)
+
+        transform_region(reader, indent_lines)
+
+        self.assertBufferEquals(
+            reader,
+            "a = 1\n    if a:\n        b = 2\n    c = 3\nprint(b)",
+        )
+        self.assertPositionEquals(reader, 10)
+        self.assertEqual(get_mark(reader), 23)
+
+    def test_dedent_region_clamps_cursor(self):
+        """Test that a cursor in removed indentation moves to the line start."""
+        reader = self.create_reader(pos=14)
+
+        transform_region(reader, dedent_lines)
+
+        self.assertBufferEquals(reader, "a = 1\nif a:\nb = 2\n    c = 3\nprint(b)")
+        self.assertPositionEquals(reader, 12)
+
+    def test_unchanged_region(self):
+        """Test that nothing is spliced when the lines don't change."""
+        reader = self.create_reader(pos=2)
+        transform_region(reader, dedent_lines)
+        self.assertFalse(reader.dirty)
+
+    def test_move_region_up_and_down(self):
+        """Test moving a block of lines past its neighbors."""
+        reader = self.create_reader(pos=16, mark=25)
+
+        self.assertTrue(move_region(reader, -1))
+        self.assertBufferEquals(reader, "a = 1\n    b = 2\n    c = 3\nif a:\nprint(b)")
+        self.assertPositionEquals(reader, 10)
+        self.assertEqual(get_mark(reader), 19)
+
+        self.assertTrue(move_region(reader, 1))
+        self.assertTrue(move_region(reader, 1))
+        self.assertBufferEquals(reader, "a = 1\nif a:\nprint(b)\n    b = 2\n    c = 3")
+        self.assertFalse(move_region(reader, 1))
+
+        reader = self.create_reader(pos=0)
+        self.assertFalse(move_region(reader, -1))
+
+    def test_duplicate_region(self):
+        """Test that duplicating moves the cursor to the copy."""
+        reader = self.create_reader(pos=8, mark=10)
+
+        duplicate_region(reader)
+
+        self.assertBufferEquals(
+            reader,
+            "a = 1\nif a:\nif a:\n    b = 2\n    c = 3\nprint(b)",
+        )
+        self.assertPositionEquals(reader, 14)
+        self.assertEqual(get_mark(reader), 16)
+
+    def test_large_buffer_single_splice(self):
+        """Test that region edits only read the region's lines."""
+        lines = [f"line_{n} = {n}" for n in range(5000)]
+        reader = self.create_reader("\n".join(lines), pos=0)
+        reader.get_unicode = None  # Region edits never need the whole buffer
+        set_mark(reader, len(reader.buffer))
+
+        transform_region(reader, comment_lines)
+
+        self.assertEqual(
+            "".join(reader.buffer).splitlines(),
+            [f"# {line}" for line in lines],
+        )
+
+
+class TestLineTransforms(unittest.TestCase):
+    def test_comment_lines(self):
+        """Test commenting at the smallest indentation, skipping blank lines."""
+        self.assertEqual(
+            comment_lines(["    if x:", "", "        y"]),
+            ["    # if x:", "", "    #     y"],
+        )
+        self.assertEqual(comment_lines(["", " "]), ["", " "])
+
+    def test_uncomment_lines(self):
+        """Test removing comments (and the space after them)."""
+        self.assertEqual(
+            comment_lines(["# if x:", "#     y", ""]),
+            ["if x:", "    y", ""],
+        )
+
+    def test_dedent_lines(self):
+        """Test removing at most one level of indentation."""
+        self.assertEqual(dedent_lines(["        x", "x"]), ["    x", "x"])
@@ -0,0 +1,149 @@
+import re
+import unittest
+from unittest.mock import MagicMock, patch
+
+from pyrepl_hacks.buffer_utils import splice
+from pyrepl_hacks.replace_utils import (
+    QueryReplace,
+    compile_pattern,
+    find_matches,
+    query_replace,
+    query_replace_all,
+    query_replace_no,
+    query_replace_quit,
+    query_replace_yes,
+    replace_matches,
+)
+
+from .support import ReaderTestMixin
+
+
+class TestFindMatches(unittest.TestCase):
+    def setUp(self):
+        find_matches.cache_clear()
+
+    def test_finds_matches_between_offsets(self):
+        """Test finding matches in part of the text."""
+        matches = find_matches(r"\d", "1 2 3 4", 1, 6)
+        self.assertEqual([match.group() for match in matches], ["2", "3"])
+
+    def test_cached_by_pattern_and_text(self):
+        """Test that the same pattern and text aren't searched again."""
+        first = find_matches("a", "banana")
+        self.assertIs(find_matches("a", "banana"), first)
+        self.assertEqual(find_matches.cache_info().hits, 1)
+        self.assertIsNot(find_matches("a", "bananas"), first)
+
+    def test_compiled_patterns_cached(self):
+        """Test that patterns are compiled once and match at each line."""
+        self.assertIs(compile_pattern("^x"), compile_pattern("^x"))
+        self.assertEqual(len(find_matches("^x", "x\nx")), 2)
+
+    def test_invalid_pattern(self):
+        """Test that invalid patterns raise re.error."""
+        with self.assertRaises(re.error):
+            find_matches("(", "text")
+
+
+class TestReplaceMatches(unittest.TestCase, ReaderTestMixin):
+    def test_replaces_in_one_splice(self):
+        """Test replacing matches (with groups) and moving the cursor."""
+        reader = self.create_reader("f(a, b, c)", pos=0)
+        matches = find_matches(r"(\w), ", reader.get_unicode())
+        with patch("pyrepl_hacks.replace_utils.splice", wraps=splice) as spliced:
+            replace_matches(reader, matches, r"\1; ")
+        spliced.assert_called_once_with(reader, 2, 8, "a; b; ", pos=8)
+        self.assertBufferEquals(reader, "f(a; b; c)")
+        self.assertPositionEquals(reader, 8)
+
+    def test_bad_group_reference(self):
+        """Test that a replacement using a missing group raises re.error."""
+        reader = self.create_reader("abc")
+        with self.assertRaises(re.error):
+            replace_matches(reader, find_matches("b", "abc"), r"\2")
+        self.assertBufferEquals(reader, "abc")
+
+
+class TestQueryReplace(unittest.TestCase, ReaderTestMixin):
+    def setUp(self):
+        patcher = patch("pyrepl_hacks.replace_utils._sessions", {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch("pyrepl_hacks.replace_utils.add_input_hook")
+        self.add_input_hook = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_reader(self, text="x1 x2 x3 x4", pos=None):
+        reader = super().create_reader(text, pos)
+        reader.msg = ""
+        reader.push_input_trans = MagicMock()
+        reader.pop_input_trans = MagicMock()
+        return reader
+
+    def press(self, reader, command_class):
+        command_class(reader, "key", ["k"]).do()
+
+    def test_steps_through_matches(self):
+        """Test answering for each match, then replacing in one go."""
+        reader = self.create_reader()
+        query_replace(reader, find_matches(r"x(\d)", reader.get_unicode()), r"y\1")
+
+        reader.push_input_trans.assert_called_once()
+        self.assertEqual(reader.msg, "replace 'x1' with 'y1'? (y, n, !, q) [1/4]")
+        self.assertPositionEquals(reader, 0)
+        self.press(reader, query_replace_yes)
+        self.press(reader, query_replace_no)
+        self.assertPositionEquals(reader, 6)
+        self.assertBufferEquals(reader, "x1 x2 x3 x4")  # Nothing replaced yet
+        self.press(reader, query_replace_all)
+
+        self.assertBufferEquals(reader, "y1 x2 y3 y4")
+        self.assertEqual(reader.msg, "replaced 3 of 4 matches")
+        reader.pop_input_trans.assert_called_once()
+
+    def test_quit_keeps_accepted_replacements(self):
+        """Test that quitting makes only the replacements accepted so far."""
+        reader = self.create_reader()
+        query_replace(reader, find_matches("x", reader.get_unicode()), "z")
+        self.press(reader, query_replace_yes)
+        self.press(reader, query_replace_quit)
+        self.assertBufferEquals(reader, "z1 x2 x3 x4")
+        self.assertEqual(reader.msg, "replaced 1 of 4 matches")
+
+    def test_interrupted_input_abandons_stepping(self):
+        """Test that starting the next input after Ctrl+C stops stepping."""
+        reader = self.create_reader()
+        query_replace(reader, find_matches("x", reader.get_unicode()), "z")
+        self.press(reader, query_replace_yes)
+        (hook,) = self.add_input_hook.call_args.args
+
+        hook(reader)
+        reader.pop_input_trans.assert_called_once()
+        reader.buffer[:] = list("x = 1")  # The next input
+        hook(reader)
+        reader.pop_input_trans.assert_called_once()
+        self.press(reader, query_replace_yes)  # Just pops the translator
+        self.assertBufferEquals(reader, "x = 1")
+
+    def test_changed_input_not_replaced(self):
+        """Test that matches from an older input are never spliced in."""
+        reader = self.create_reader()
+        reader.error = MagicMock()
+        query_replace(reader, find_matches("x", reader.get_unicode()), "z")
+        self.press(reader, query_replace_yes)
+        reader.buffer[:] = list("new input")
+
+        self.press(reader, query_replace_quit)
+
+        self.assertBufferEquals(reader, "new input")
+        reader.error.assert_called_once_with(
+            "the input changed, so nothing was replaced",
+        )
+
+    def test_answer(self):
+        """Test collecting the accepted matches."""
+        session = QueryReplace(find_matches(r"\d", "1 2 3"), "n")
+        session.answer(replace=False)
+        session.answer(replace=True, rest=True)
+        self.assertTrue(session.done)
+        self.assertEqual([match.group() for match in session.accepted], ["2", "3"])
@@ -0,0 +1,130 @@
+import unittest
+from unittest.mock import patch
+
+from pyrepl_hacks.buffer_utils import get_text
+from pyrepl_hacks.commands import dedent, move_line_down
+from pyrepl_hacks.shadow_utils import (
+    ShadowBuffer,
+    ShadowText,
+    disable_shadow_text,
+    enable_shadow_text,
+    get_shadow,
+)
+
+from .support import MockReader, ReaderTestMixin
+
+
+class TestShadowText(unittest.TestCase):
+    def test_line_index(self):
+        """Test finding lines and their offsets."""
+        shadow = ShadowText("one\ntwo\n\nfour")
+        self.assertEqual(shadow.lines, ["one", "two", "", "four"])
+        for offset, line in [(0, 0), (3, 0), (4, 1), (8, 2), (9, 3), (13, 3)]:
+            with self.subTest(offset=offset):
+                self.assertEqual(shadow.line_at(offset), line)
+        self.assertEqual(shadow.line_start(3), 9)
+        self.assertEqual(len(shadow), 13)
+
+    def test_replace_across_lines(self):
+        """Test replacing text that spans lines (and adds or removes lines)."""
+        shadow = ShadowText("a = 1\nb = 2\nc = 3")
+        shadow.line_at(17)  # Index every line before editing
+        shadow.replace(4, 7, "10\nx = 20\ny")
+        self.assertEqual(shadow.text(), "a = 10\nx = 20\ny = 2\nc = 3")
+        self.assertEqual(shadow.line_start(3), 20)
+        shadow.replace(0, 20, "")
+        self.assertEqual(shadow.text(), "c = 3")
+        self.assertEqual((shadow.lines, len(shadow)), (["c = 3"], 5))
+
+    def test_slice(self):
+        """Test getting text between offsets without joining every line."""
+        shadow = ShadowText("one\ntwo\nthree")
+        self.assertEqual(shadow.slice(1, 3), "ne")
+        self.assertEqual(shadow.slice(2, 10), "e\ntwo\nth")
+        self.assertEqual(shadow.slice(0, 13), shadow.text())
+
+    def test_text_is_cached_until_an_edit(self):
+        """Test that the text is joined once per edit."""
+        shadow = ShadowText("x")
+        shadow.replace(1, 1, "y")
+        self.assertIs(shadow.text(), shadow.text())
+
+
+class TestShadowBuffer(unittest.TestCase):
+    def assertMirrored(self, buffer):
+        self.assertEqual(buffer.shadow.text(), "".join(buffer))
+        self.assertEqual(len(buffer.shadow), len(buffer))
+
+    def test_list_edits_are_mirrored(self):
+        """Test that each way the reader edits its buffer updates the shadow."""
+        buffer = ShadowBuffer("ab\ncd")
+        edits = [
+            lambda: buffer.__setitem__(slice(1, 4), list("X\nY\n")),
+            lambda: buffer.__setitem__(0, "\n"),
+            lambda: buffer.__setitem__(-1, "Z"),
+            lambda: buffer.__delitem__(2),
+            lambda: buffer.__delitem__(slice(-3, None)),
+            lambda: buffer.insert(1, "\n"),
+            lambda: buffer.insert(-100, "s"),
+            lambda: buffer.append("e"),
+            lambda: buffer.extend("f\ng"),
+            lambda: buffer.__iadd__(["h"]),
+            lambda: buffer.pop(),
+            lambda: buffer.pop(0),
+            lambda: buffer.__setitem__(slice(None, None, 2), ["."] * 4),
+            lambda: buffer.__delitem__(slice(None, None, 3)),
+            lambda: buffer.reverse(),
+            lambda: buffer.sort(),
+            lambda: buffer.clear(),
+        ]
+        for number, edit in enumerate(edits):
+            with self.subTest(edit=number):
+                edit()
+                self.assertMirrored(buffer)
+
+    def test_in_place_add_keeps_the_buffer(self):
+        """Test that += extends the same buffer."""
+        buffer = ShadowBuffer("a")
+        same = buffer
+        buffer += ["\n", "b"]
+        self.assertIs(buffer, same)
+        self.assertEqual(buffer.shadow.lines, ["a", "b"])
+
+
+class TestShadowCommands(unittest.TestCase, ReaderTestMixin):
+    def setUp(self):
+        self.reader = MockReader("x = 1\n    y = 2\n", pos=0)
+        patcher = patch("pyrepl_hacks.shadow_utils._get_reader", lambda: self.reader)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(disable_shadow_text)
+
+    def test_enable_and_disable(self):
+        """Test wrapping the reader's buffer (again after it's replaced)."""
+        self.assertIsNone(get_shadow(self.reader))
+        enable_shadow_text()
+        self.assertIsInstance(self.reader.buffer, ShadowBuffer)
+        self.assertIs(get_text(self.reader), get_text(self.reader))
+
+        self.reader.buffer = list("new input")  # As when the next input starts
+        self.assertEqual(get_shadow(self.reader).lines, ["new input"])
+        self.assertIsInstance(self.reader.buffer, ShadowBuffer)
+
+        disable_shadow_text()
+        self.assertIs(type(self.reader.buffer), list)
+        self.assertEqual(get_text(self.reader), "new input")
+
+    def test_commands_edit_the_shadow(self):
+        """Test that commands rewriting the input keep the shadow in sync."""
+        enable_shadow_text()
+        move_line_down(self.reader)
+        self.assertBufferEquals(self.reader, "    y = 2\nx = 1\n")
+        self.assertPositionEquals(self.reader, 10)
+        self.assertEqual(get_text(self.reader), "    y = 2\nx = 1\n")
+
+        self.reader.buffer[:] = list("    a\n    b\n")
+        self.reader.pos = 10
+        dedent(self.reader)
+        self.assertBufferEquals(self.reader, "a\nb\n")
+        self.assertPositionEquals(self.reader, 2)
+        self.assertEqual(get_shadow(self.reader).lines, ["a", "b", ""])
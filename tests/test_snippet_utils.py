@@ -0,0 +1,163 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from pyrepl_hacks.snippet_utils import (
+    Snippet,
+    SnippetLibrary,
+    expand_snippet,
+    insert_snippet,
+    next_field,
+    parse_snippet,
+)
+
+from .support import ReaderTestMixin
+
+
+class TestParseSnippet(unittest.TestCase):
+    def test_plain_text(self):
+        """Test that text without fields puts the cursor at the end."""
+        self.assertEqual(parse_snippet("pass"), Snippet("pass", (4,)))
+
+    def test_fields_in_order(self):
+        """Test that fields are visited by number, with $0 last."""
+        self.assertEqual(
+            parse_snippet("$0 $2 $1"),
+            Snippet("  ", (2, 1, 0)),
+        )
+
+    def test_defaults(self):
+        """Test that default text is inserted and the stop is after it."""
+        self.assertEqual(
+            parse_snippet("for ${1:item} in ${2:items}:"),
+            Snippet("for item in items:", (8, 17, 18)),
+        )
+
+    def test_repeated_and_literal(self):
+        """Test repeated field numbers and escaped and stray dollar signs."""
+        self.assertEqual(
+            parse_snippet("${1:x} = $1 + $$ + $x"),
+            Snippet("x =  + $ + $x", (1, 13)),
+        )
+
+    def test_indented(self):
+        """Test that later lines and their stops are indented."""
+        snippet = parse_snippet("try:\n    $1\nexcept ${2:Exception}:\n    $0")
+        self.assertEqual(
+            snippet.indented("    "),
+            Snippet(
+                "try:\n        \n    except Exception:\n        ",
+                (13, 34, 44),
+            ),
+        )
+
+
+class TestInsertSnippet(unittest.TestCase, ReaderTestMixin):
+    def setUp(self):
+        patcher = patch("pyrepl_hacks.snippet_utils._pending_fields", {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_insert_and_visit_fields(self):
+        """Test inserting a snippet and moving through its fields."""
+        reader = self.create_reader("x = ")
+
+        insert_snippet(reader, 'run("$1", shell=${2:True})$0')
+        self.assertBufferEquals(reader, 'x = run("", shell=True)')
+        self.assertPositionEquals(reader, 9)
+        self.assertTrue(reader.last_refresh_cache.invalidated)
+
+        reader.buffer[9:9] = list("ls -l")  # Typing in the first field
+        reader.pos = 14
+        self.assertTrue(next_field(reader))
+        self.assertPositionEquals(reader, 27)
+        self.assertTrue(next_field(reader))
+        self.assertPositionEquals(reader, 28)
+        self.assertFalse(next_field(reader))
+
+    def test_insert_in_indented_line(self):
+        """Test that multi-line snippets match the line's indentation."""
+        reader = self.create_reader("def f():\n    ")
+
+        insert_snippet(reader, "if $1:\n    $0")
+
+        self.assertBufferEquals(reader, "def f():\n    if :\n        ")
+        self.assertPositionEquals(reader, 16)
+        next_field(reader)
+        self.assertPositionEquals(reader, 26)
+
+    def test_next_field_without_snippet(self):
+        """Test that there's no next field before any snippet is inserted."""
+        reader = self.create_reader("x")
+        self.assertFalse(next_field(reader))
+
+
+class TestSnippetLibrary(unittest.TestCase, ReaderTestMixin):
+    def setUp(self):
+        patcher = patch("pyrepl_hacks.snippet_utils._pending_fields", {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "snippets.toml"
+        self.path.write_text(
+            "pr = 'print($1)$0'\nmain = '''if __name__ == \"__main__\":\n    $0'''\n",
+        )
+
+    def test_file_read_on_first_use(self):
+        """Test that loading a file doesn't read it until it's needed."""
+        library = SnippetLibrary()
+        library.load(self.path)
+        self.path.write_text("pr = 'print(\"$1\")'\n")
+
+        self.assertEqual(library.names(), ["pr"])
+        self.assertEqual(library.get("pr"), Snippet('print("")', (7, 9)))
+        self.assertIsNone(library.get("missing"))
+
+    def test_add_overrides_file(self):
+        """Test that snippets added later replace those from files."""
+        library = SnippetLibrary()
+        library.load(self.path)
+        library.add("pr", "pprint($1)")
+
+        self.assertEqual(library.names(), ["main", "pr"])
+        self.assertEqual(library.get("pr"), Snippet("pprint()", (7, 8)))
+
+    def test_expand_snippet(self):
+        """Test replacing the name before the cursor with its snippet."""
+        library = SnippetLibrary()
+        library.load(self.path)
+        reader = self.create_reader("x = 1; pr")
+
+        self.assertEqual(expand_snippet(reader, library), "pr")
+
+        self.assertBufferEquals(reader, "x = 1; print()")
+        self.assertPositionEquals(reader, 13)
+
+    def test_expand_unknown_snippet(self):
+        """Test that unknown names are left alone."""
+        library = SnippetLibrary()
+        reader = self.create_reader("x = 1; pr")
+
+        self.assertIsNone(expand_snippet(reader, library))
+        self.assertBufferEquals(reader, "x = 1; pr")
+
+    def test_non_string_template(self):
+        """Test that a template that isn't a string is reported by name."""
+        self.path.write_text("pr = 'print($1)'\ncount = 3\n")
+        library = SnippetLibrary()
+        library.load(self.path)
+
+        with self.assertRaisesRegex(TypeError, "Snippet count in .* must be a string"):
+            library.get("pr")
+
+    def test_failed_read_retried(self):
+        """Test that a file that couldn't be read is read again later."""
+        library = SnippetLibrary()
+        library.load(self.path.with_name("later.toml"))
+
+        with self.assertRaises(OSError):
+            library.names()
+        self.path.rename(self.path.with_name("later.toml"))
+        self.assertEqual(library.names(), ["main", "pr"])
@@ -0,0 +1,80 @@
+import ast
+import unittest
+from unittest.mock import patch
+
+from pyrepl_hacks.structure_utils import Block, parse_structure
+
+CODE = """\
+import math
+
+@cache
+def area(r):
+    if r < 0:
+        raise ValueError(
+            "negative radius"
+        )
+    else:
+        return math.pi * r**2
+
+x = 1; y = 2
+print(area(x))"""
+
+BLOCKS = (
+    Block("def", 2, 3, 9),
+    Block("if", 4, 4, 9),
+)
+
+
+class TestParseStructure(unittest.TestCase):
+    def setUp(self):
+        parse_structure.cache_clear()
+
+    def test_valid_code(self):
+        """Test the statements and blocks found by parsing."""
+        structure = parse_structure(CODE)
+        self.assertEqual(structure.statements, ((0, 0), (2, 9), (11, 11), (12, 12)))
+        self.assertEqual(structure.blocks, BLOCKS)
+
+    def test_invalid_code_uses_indentation(self):
+        """Test that invalid code gets the same structure from indentation."""
+        broken = CODE.replace("raise ValueError", "raise ValueError ===")
+        with self.assertRaises(SyntaxError):
+            ast.parse(broken)
+        structure = parse_structure(broken)
+        self.assertEqual(structure.statements, ((0, 0), (2, 9), (11, 11), (12, 12)))
+        self.assertEqual(structure.blocks, BLOCKS)
+
+    def test_indentation_blocks_nest_and_end(self):
+        """Test guessing nested blocks and where they end."""
+        structure = parse_structure(
+            "class A:\n    def f(self):\n        pass\n    x =\ny = 2",
+        )
+        self.assertEqual(
+            structure.blocks,
+            (Block("class", 0, 0, 3), Block("def", 1, 1, 2)),
+        )
+        self.assertEqual(structure.statements, ((0, 3), (4, 4)))
+
+    def test_cached_by_text(self):
+        """Test that unchanged code isn't parsed again."""
+        with patch("ast.parse", wraps=ast.parse) as parse:
+            first = parse_structure(CODE)
+            self.assertIs(parse_structure(CODE), first)
+            parse_structure(CODE + "\n")
+        self.assertEqual(parse.call_count, 2)
+
+    def test_lines_and_offsets(self):
+        """Test converting between offsets and lines."""
+        structure = parse_structure("ab\ncd\n")
+        self.assertEqual(structure.offsets, (0, 3, 6))
+        self.assertEqual(structure.line_at(2), 0)
+        self.assertEqual(structure.line_at(3), 1)
+        self.assertEqual(structure.line_end(1), 5)
+        self.assertEqual(structure.line_end(2), 6)
+
+    def test_blocks_at(self):
+        """Test finding the blocks around a line, innermost first."""
+        structure = parse_structure(CODE)
+        self.assertEqual(structure.blocks_at(6), [BLOCKS[1], BLOCKS[0]])
+        self.assertEqual(structure.blocks_at(2), [BLOCKS[0]])
+        self.assertEqual(structure.blocks_at(11), [])
@@ -57,3 +57,103 @@ class TestThemeUtils(unittest.TestCase):
 
             # Call update_theme - this will actually call _convert_color
             update_theme(keyword="green", string="blue")
+
+    def test_convert_extended_colors(self):
+        """Test converting 256-color and truecolor specifications."""
+        from pyrepl_hacks.theme_utils import _convert_color
+
+        self.assertEqual(_convert_color("208"), "\x1b[38;5;208m")
+        self.assertEqual(_convert_color("background 17"), "\x1b[48;5;17m")
+        self.assertEqual(_convert_color("#ff8800"), "\x1b[38;2;255;136;0m")
+        self.assertEqual(_convert_color("#abc"), "\x1b[38;2;170;187;204m")
+        self.assertEqual(
+            _convert_color("background #000000, 231"),
+            "\x1b[48;2;0;0;0m\x1b[38;5;231m",
+        )
+
+    def test_convert_invalid_extended_colors(self):
+        """Test that invalid 256-color and truecolor specifications fail."""
+        from pyrepl_hacks.theme_utils import _convert_color
+
+        with self.assertRaises(ValueError):
+            _convert_color("256")
+        with self.assertRaises(ValueError):
+            _convert_color("#12345")
+
+
+class TestThemeRegistry(unittest.TestCase):
+    def setUp(self):
+        """Mock _colorize and start each test with no registered themes."""
+        self.colorize = MagicMock()
+        self.colorize.default_theme.copy_with.side_effect = lambda syntax: (
+            "theme",
+            syntax,
+        )
+        self.colorize.Syntax.side_effect = lambda **items: items
+        patcher = patch.dict("sys.modules", {"_colorize": self.colorize})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch.dict("pyrepl_hacks.theme_utils._themes", clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch("pyrepl_hacks.theme_utils._active_theme", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_register_theme_compiles_once(self):
+        """Test that colors are converted when the theme is registered."""
+        from pyrepl_hacks.theme_utils import _themes, register_theme, use_theme
+
+        register_theme("warm", keyword="208", string="#ff0000")
+        self.assertEqual(
+            _themes["warm"],
+            (
+                "theme",
+                {"keyword": "\x1b[38;5;208m", "string": "\x1b[38;2;255;0;0m"},
+            ),
+        )
+
+        with patch("pyrepl_hacks.theme_utils._convert_color") as convert:
+            use_theme("warm")
+            convert.assert_not_called()
+        self.colorize.set_theme.assert_called_once_with(_themes["warm"])
+
+    def test_use_unknown_theme(self):
+        """Test that switching to an unregistered theme raises ValueError."""
+        from pyrepl_hacks.theme_utils import use_theme
+
+        with self.assertRaises(ValueError):
+            use_theme("missing")
+
+    def test_next_theme_cycles(self):
+        """Test cycling through registered themes in registration order."""
+        from pyrepl_hacks.theme_utils import next_theme, register_theme
+
+        register_theme("dark", keyword="208")
+        register_theme("light", keyword="17")
+
+        self.assertEqual(next_theme(), "dark")
+        self.assertEqual(next_theme(), "light")
+        self.assertEqual(next_theme(), "dark")
+
+    def test_next_theme_without_themes(self):
+        """Test that cycling with no registered themes raises ValueError."""
+        from pyrepl_hacks.theme_utils import next_theme
+
+        with self.assertRaises(ValueError):
+            next_theme()
+
+    def test_load_themes(self):
+        """Test registering themes from a TOML file."""
+        import tempfile
+        from pathlib import Path
+
+        from pyrepl_hacks.theme_utils import _themes, load_themes
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "themes.toml"
+            path.write_text('[dark]\nkeyword = "#fff"\n\n[light]\nnumber = "17"\n')
+            names = load_themes(path)
+
+        self.assertEqual(names, ["dark", "light"])
+        self.assertEqual(_themes["light"], ("theme", {"number": "\x1b[38;5;17m"}))
@@ -0,0 +1,171 @@
+import unittest
+from unittest.mock import patch
+
+from pyrepl_hacks import token_utils
+from pyrepl_hacks.token_utils import (
+    BracketIndex,
+    LineState,
+    line_states,
+    open_brackets,
+    scan_line,
+)
+
+
+class TestScanLine(unittest.TestCase):
+    def test_plain_line(self):
+        """Test scanning a line with no brackets or strings."""
+        result = scan_line("x = 1")
+        self.assertEqual(result.end_state, LineState())
+        self.assertEqual(result.brackets, ())
+
+    def test_brackets_recorded(self):
+        """Test that brackets and their columns are recorded."""
+        result = scan_line("f(a[0], {})")
+        self.assertEqual(
+            result.brackets,
+            ((1, "("), (3, "["), (5, "]"), (8, "{"), (9, "}"), (10, ")")),
+        )
+        self.assertEqual(result.end_state, LineState())
+
+    def test_unclosed_brackets(self):
+        """Test that unclosed brackets carry over to the next line."""
+        result = scan_line("f(a, [b,")
+        self.assertEqual(result.end_state, LineState(brackets="(["))
+
+    def test_closing_brackets_from_previous_line(self):
+        """Test closing brackets that were opened on an earlier line."""
+        result = scan_line("    b])", LineState(brackets="(["))
+        self.assertEqual(result.end_state, LineState())
+
+    def test_brackets_in_strings_and_comments_ignored(self):
+        """Test that brackets inside strings and comments are skipped."""
+        result = scan_line("""x = "(" + ')' # [""")
+        self.assertEqual(result.brackets, ())
+        self.assertEqual(result.end_state, LineState())
+
+    def test_escaped_quotes(self):
+        """Test that escaped quotes don't end a string."""
+        result = scan_line(r'x = "a\"(" + (')
+        self.assertEqual(result.brackets, ((13, "("),))
+
+    def test_unclosed_triple_quote(self):
+        """Test that an unclosed triple-quoted string carries over."""
+        result = scan_line('text = """hello (')
+        self.assertEqual(result.end_state, LineState(quote='"""'))
+        self.assertEqual(result.brackets, ())
+
+    def test_closing_triple_quote(self):
+        """Test closing a triple-quoted string opened on an earlier line."""
+        result = scan_line('world""" + (', LineState(quote='"""'))
+        self.assertEqual(result.end_state, LineState(brackets="("))
+        self.assertEqual(result.brackets, ((11, "("),))
+
+    def test_line_inside_triple_quote(self):
+        """Test a line entirely inside a triple-quoted string."""
+        state = LineState(brackets="(", quote="'''")
+        result = scan_line("still (inside)", state)
+        self.assertEqual(result.end_state, state)
+        self.assertEqual(result.brackets, ())
+
+    def test_unclosed_single_quote_does_not_carry_over(self):
+        """Test that an unterminated single-quoted string ends at the line."""
+        result = scan_line("x = 'oops")
+        self.assertEqual(result.end_state, LineState())
+
+
+class TestLineStates(unittest.TestCase):
+    def test_line_states(self):
+        """Test computing the starting state of every line."""
+        lines = ["x = f(", '    """doc', '    """)', "y = 1"]
+        self.assertEqual(
+            line_states(lines),
+            [
+                LineState(),
+                LineState(brackets="("),
+                LineState(brackets="(", quote='"""'),
+                LineState(),
+            ],
+        )
+
+
+class TestOpenBrackets(unittest.TestCase):
+    def test_open_brackets(self):
+        """Test finding the brackets open at a position."""
+        text = "f(a, [b], {c: g("
+        self.assertEqual(open_brackets(text, 2), [(1, "(")])
+        self.assertEqual(open_brackets(text, 7), [(1, "("), (5, "[")])
+        self.assertEqual(open_brackets(text, 9), [(1, "(")])
+        self.assertEqual(
+            open_brackets(text, len(text)),
+            [(1, "("), (10, "{"), (15, "(")],
+        )
+
+    def test_multiline_and_strings(self):
+        """Test that brackets span lines and brackets in strings are ignored."""
+        text = 'f(\n    "(", x,\n    y'
+        self.assertEqual(open_brackets(text, len(text)), [(1, "(")])
+
+    def test_no_brackets(self):
+        """Test text without open brackets."""
+        self.assertEqual(open_brackets("f(x)", 4), [])
+        self.assertEqual(open_brackets("", 0), [])
+
+
+class TestBracketIndex(unittest.TestCase):
+    def test_matches_skip_strings_and_comments(self):
+        """Test that brackets in strings and comments aren't matched."""
+        index = BracketIndex()
+        index.update("f(\"(\", [\n  '''\n)]'''],  # )\n)")
+
+        self.assertEqual(index.match(1), 28)
+        self.assertEqual(index.match(7), 20)
+        self.assertIsNone(index.match(3))
+        self.assertEqual(
+            index.brackets(),
+            [(1, "("), (7, "["), (20, "]"), (28, ")")],
+        )
+
+    def test_unmatched_brackets(self):
+        """Test that unmatched and mismatched brackets have no match."""
+        index = BracketIndex()
+        index.update("(]")
+        self.assertIsNone(index.match(0))
+        self.assertIsNone(index.match(1))
+        self.assertEqual(index.enclosing(1), [])
+
+    def test_updates_rescan_only_changed_lines(self):
+        """Test that editing one line doesn't rescan the unchanged lines."""
+        lines = [f"x{n} = f({n})" for n in range(1000)]
+        index = BracketIndex()
+        index.update("\n".join(lines))
+        lines[500] = "x500 = g(f(500))"
+
+        with patch.object(token_utils, "scan_line", wraps=scan_line) as scan:
+            index.update("\n".join(lines))
+
+        scan.assert_called_once_with("x500 = g(f(500))", LineState())
+        offset = sum(len(line) + 1 for line in lines[:500])
+        self.assertEqual(index.match(offset + 8), offset + 15)
+        self.assertEqual(index.match(offset + 10), offset + 14)
+
+    def test_state_changes_rescan_following_lines(self):
+        """Test that lines after an opened string are rescanned."""
+        index = BracketIndex()
+        index.update("a = 1\nf(x)\ng(y)")
+        self.assertEqual(index.match(7), 9)
+
+        index.update("a = '''\nf(x)\ng(y)")
+        self.assertEqual(index.brackets(), [])
+
+        index.update("a = 1\nf(x)\ng(y)\nh()")
+        self.assertEqual(index.match(12), 14)
+        self.assertEqual(index.match(17), 18)
+
+    def test_enclosing(self):
+        """Test finding the pairs around an offset, innermost first."""
+        index = BracketIndex()
+        index.update("f(a, [b], {c: (d)})")
+        self.assertEqual(index.enclosing(6), [(5, 7), (1, 18)])
+        self.assertEqual(index.enclosing(5), [(1, 18)])
+        self.assertEqual(index.enclosing(15), [(14, 16), (10, 17), (1, 18)])
+        self.assertEqual(index.enclosing(19), [])
@@ -0,0 +1,143 @@
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+from pyrepl_hacks._types import Command
+from pyrepl_hacks.commands import move_line_up, redo, undo
+from pyrepl_hacks.undo_utils import (
+    Change,
+    UndoHistory,
+    _record_change,
+    disable_undo,
+    enable_undo,
+)
+
+from .support import MockReader, start_patches
+
+
+class TestUndoHistory(unittest.TestCase):
+    def test_undo_and_redo(self):
+        """Test undoing and redoing changes, restoring the cursor."""
+        reader = MockReader("ab", pos=2)
+        history = UndoHistory("ab", 2)
+        reader.buffer[:] = list("abcd")
+        reader.pos = 4
+        history.record(reader.get_unicode(), reader.pos)
+
+        self.assertTrue(history.undo(reader))
+        self.assertEqual((reader.get_unicode(), reader.pos), ("ab", 2))
+        self.assertFalse(history.undo(reader))
+        self.assertTrue(history.redo(reader))
+        self.assertEqual((reader.get_unicode(), reader.pos), ("abcd", 4))
+        self.assertFalse(history.redo(reader))
+
+    def test_merges_consecutive_insertions(self):
+        """Test that typing a run of characters is stored as one change."""
+        history = UndoHistory()
+        for text in ["a", "ab", "abc"]:
+            history.record(text, len(text), merge=True)
+        history.record("abc", 0)  # Moving the cursor ends the run
+        history.record("xabc", 1, merge=True)
+        self.assertEqual(len(history), 2)
+        self.assertEqual(history._undo[0], Change(0, "", "abc", 0, 3))
+
+    def test_new_change_clears_redo(self):
+        """Test that changing the input after undoing forgets the redo."""
+        reader = MockReader("", pos=0)
+        history = UndoHistory()
+        history.record("a", 1)
+        history.undo(reader)
+        history.sync("", 0)
+        history.record("b", 1)
+        self.assertFalse(history.redo(reader))
+        self.assertEqual(history.size, history._undo[0].size)
+
+    def test_memory_budget(self):
+        """Test that the oldest changes are forgotten past the budget."""
+        history = UndoHistory(max_bytes=2 * sys.getsizeof("x" * 1000) + 200)
+        text = ""
+        for char in "abc":
+            text += char * 1000
+            history.record(text, len(text))
+        self.assertEqual(
+            [change.inserted[0] for change in history._undo],
+            ["b", "c"],
+        )
+
+
+class insert(Command):
+    def do(self):
+        self.reader.buffer[self.reader.pos : self.reader.pos] = self.event
+        self.reader.pos += len(self.event)
+
+
+class TestUndoCommands(unittest.TestCase):
+    def setUp(self):
+        self.reader = MockReader("", pos=0)
+        self.reader.error = MagicMock()
+        *_, self.add_input_hook, _ = start_patches(
+            self,
+            patch("pyrepl_hacks.undo_utils._histories", {}),
+            patch("pyrepl_hacks.undo_utils._get_reader", lambda: self.reader),
+            patch("pyrepl_hacks.undo_utils.add_command_hook", MagicMock()),
+            patch("pyrepl_hacks.undo_utils.remove_command_hook", MagicMock()),
+            patch("pyrepl_hacks.undo_utils.add_input_hook", MagicMock()),
+            patch("pyrepl_hacks.undo_utils.remove_input_hook", MagicMock()),
+        )
+
+    def run_command(self, command):
+        """Run a command like the reader does (then record its change)."""
+        command.do()
+        _record_change(self.reader, command)
+
+    def test_undo_commands(self):
+        """Test undoing typing and a command that rewrites the buffer."""
+        undo(self.reader)
+        self.reader.error.assert_called_once_with("undo isn't enabled")
+        enable_undo()
+        for char in "x = 1\ny = 2\n":
+            self.run_command(insert(self.reader, "self-insert", [char]))
+        self.reader.pos = 6
+        self.run_command(Command(self.reader, "up", []))  # A cursor motion
+        self.run_command(move_line_up.command_class(self.reader, "move-line-up", []))
+        self.assertEqual(self.reader.get_unicode(), "y = 2\nx = 1\n")
+
+        self.run_command(undo.command_class(self.reader, "undo", []))
+        self.assertEqual(self.reader.get_unicode(), "x = 1\ny = 2\n")
+        self.assertEqual(self.reader.pos, 6)
+        self.run_command(undo.command_class(self.reader, "undo", []))
+        self.assertEqual(self.reader.get_unicode(), "")
+        self.run_command(undo.command_class(self.reader, "undo", []))
+        self.reader.error.assert_called_with("nothing to undo")
+        self.run_command(redo.command_class(self.reader, "redo", []))
+        self.assertEqual(self.reader.get_unicode(), "x = 1\ny = 2\n")
+        self.assertEqual(self.reader.pos, 12)
+
+    def test_new_input_resets_history(self):
+        """Test that the next input (after accepting or Ctrl+C) starts afresh."""
+        enable_undo()
+        (hook,) = self.add_input_hook.call_args.args
+        for interrupted in [False, True]:
+            with self.subTest(interrupted=interrupted):
+                self.reader.error.reset_mock()
+                for char in "abc":
+                    self.run_command(insert(self.reader, "self-insert", [char]))
+                if not interrupted:  # Ctrl+C skips every command
+                    accept = Command(self.reader, "accept", [])
+                    accept.finish = True
+                    self.run_command(accept)
+                hook(self.reader)  # The next input starts
+                self.reader.buffer[:], self.reader.pos = [], 0
+                self.run_command(insert(self.reader, "self-insert", ["x"]))
+
+                undo(self.reader)
+                self.assertEqual(self.reader.get_unicode(), "")
+                undo(self.reader)
+                self.reader.error.assert_called_once_with("nothing to undo")
+
+    def test_disable_undo(self):
+        """Test that disabling undo forgets the history."""
+        enable_undo()
+        disable_undo()
+        undo(self.reader)
+        self.reader.error.assert_called_once_with("undo isn't enabled")